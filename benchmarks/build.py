@@ -0,0 +1,217 @@
+# coding=utf-8
+"""
+Usage:
+    python3 -m benchmarks.build --projects small,medium,huge --repeat 5 --output results.json
+    python3 -m benchmarks.build --baseline results.json --threshold 0.2
+
+    Times parse_manifest, stage_channel_for_compilation and archive_staged_content_to_out on synthetic channels.
+    The cold run is the first build of a freshly written channel, warm runs rebuild it unchanged. With --baseline
+    the run fails if any phase is slower than the baseline by more than the threshold.
+
+ToDos:
+"""
+# standard lib imports
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+# third party lib imports
+import click
+import yaml
+# project imports
+from benchmarks.synthetic import PROFILES, generate_channel
+from pyku.channel import Channel
+from pyku.constants import PKKU_CONFIG
+
+PHASES: List[str] = ['parse_manifest', 'stage_channel_for_compilation', 'archive_staged_content_to_out']
+# slowdowns under this many seconds are noise, not regressions
+MIN_REGRESSION_SECONDS: float = 0.005
+
+
+def set_staging_mode(root: Path, incremental: bool) -> None:
+    """
+    Switches a generated channel's config between incremental and full staging
+    """
+    config_file: Path = root / PKKU_CONFIG
+    with config_file.open('r') as config:
+        data: dict = yaml.full_load(config)
+    data['IncrementalStaging'] = incremental
+    with config_file.open('w') as config:
+        yaml.dump(data, config)
+
+
+def time_build(root: Path) -> Dict[str, float]:
+    """
+    Builds a channel's archive through staging, timing each phase
+    :param root: channel root
+    :return: phase -> seconds
+    """
+    channel: Channel = Channel(str(root))
+    steps: Dict[str, Callable] = {
+        'parse_manifest': channel.parse_manifest,
+        'stage_channel_for_compilation': channel.stage_channel_for_compilation,
+        'archive_staged_content_to_out': channel.archive_staged_content_to_out
+    }
+    timings: Dict[str, float] = {}
+    for phase in PHASES:
+        # staging reports what it copied, keep that out of the results output
+        with redirect_stdout(StringIO()):
+            start: float = time.perf_counter()
+            steps[phase]()
+            timings[phase] = time.perf_counter() - start
+
+    return timings
+
+
+def run_project(name: str, work_dir: Path, repeat: int, incremental: bool, seed: int) -> List[dict]:
+    """
+    Writes a project's channel, then times one cold and repeat warm builds of it
+    :param name: key of PROFILES
+    :param work_dir: dir channels are written to
+    :param repeat: number of warm builds
+    :param incremental: flag for incremental staging, else the staging dir is rebuilt each time
+    :param seed: synthetic channel seed
+    :return: one result per phase and run kind
+    """
+    root: Path = work_dir / name
+    if root.exists():
+        shutil.rmtree(str(root))
+    written: dict = generate_channel(root, PROFILES[name], seed)
+    set_staging_mode(root, incremental)
+
+    cold: Dict[str, float] = time_build(root)
+    warm: List[Dict[str, float]] = [time_build(root) for _ in range(repeat)]
+
+    results: List[dict] = []
+    for phase in PHASES:
+        for run, seconds in [('cold', [cold[phase]]), ('warm', [timings[phase] for timings in warm])]:
+            results.append({
+                'project': name,
+                'files': written['files'],
+                'bytes': written['bytes'],
+                'staging': 'incremental' if incremental else 'full',
+                'phase': phase,
+                'run': run,
+                'seconds': seconds,
+                'median': statistics.median(seconds),
+                'min': min(seconds)
+            })
+
+    return results
+
+
+def result_key(result: dict) -> tuple:
+    """
+    Identifies a result across runs
+    """
+    return result['project'], result['staging'], result['phase'], result['run']
+
+
+def find_regressions(results: List[dict], baseline: List[dict], threshold: float) -> List[str]:
+    """
+    Compares medians with a baseline run's
+    :param results: this run's results
+    :param baseline: an earlier run's results
+    :param threshold: allowed slowdown, 0.2 is 20%
+    :return: a description of each phase slower than allowed
+    """
+    baseline_medians: dict = {result_key(result): result['median'] for result in baseline}
+    regressions: List[str] = []
+    for result in results:
+        before: Union[None, float] = baseline_medians.get(result_key(result), None)
+        if before is None:
+            continue
+
+        slowdown: float = result['median'] - before
+        if slowdown > MIN_REGRESSION_SECONDS and slowdown > before * threshold:
+            regressions.append(
+                f'{" ".join(result_key(result))}: {before * 1000:.1f}ms -> {result["median"] * 1000:.1f}ms'
+            )
+
+    return regressions
+
+
+@click.command()
+@click.option('--projects', 'projects', help='Comma separated projects', type=str, default='small,medium,huge')
+@click.option('--repeat', 'repeat', help='Number of warm builds per project', type=int, default=5)
+@click.option('--full-staging', 'full_staging', help='Rebuild the staging dir each build', flag_value=True)
+@click.option('--seed', 'seed', help='Synthetic channel seed', type=int, default=0)
+@click.option('--work-dir', 'work_dir', help='Dir channels are written to, a temp dir by default',
+              type=click.Path(file_okay=False), default=None)
+@click.option('--output', 'output', help='File results are written to as JSON', type=click.Path(dir_okay=False),
+              default=None)
+@click.option('--baseline', 'baseline', help='Earlier results to compare with', type=click.Path(exists=True),
+              default=None)
+@click.option('--threshold', 'threshold', help='Allowed slowdown against the baseline', type=float, default=0.2)
+def main(
+    projects: str,
+    repeat: int,
+    full_staging: bool,
+    seed: int,
+    work_dir: Union[None, str],
+    output: Union[None, str],
+    baseline: Union[None, str],
+    threshold: float
+):
+    """
+    Runs the build benchmarks
+    """
+    names: List[str] = [name.strip() for name in projects.split(',') if name.strip()]
+    for name in names:
+        if name not in PROFILES:
+            raise click.BadParameter(f'unknown project {name}, one of {", ".join(PROFILES)}', param_hint='--projects')
+
+    temp_dir: Union[None, str] = None
+    if work_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix='pyku-bench-')
+        work_dir = temp_dir
+
+    results: List[dict] = []
+    try:
+        for name in names:
+            click.echo(f'{name}: {PROFILES[name].files} files', err=True)
+            results += run_project(name, Path(work_dir), repeat, not full_staging, seed)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    report: dict = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'repeat': repeat,
+        'seed': seed,
+        'results': results
+    }
+
+    for result in results:
+        click.echo(
+            f'{result["project"]:<8}{result["run"]:<6}{result["phase"]:<32}'
+            f'{result["median"] * 1000:>10.1f}ms median{result["min"] * 1000:>10.1f}ms min',
+            err=True
+        )
+
+    if output is not None:
+        with Path(output).open('w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        click.echo(json.dumps(report, indent=2))
+
+    if baseline is not None:
+        with Path(baseline).open('r') as baseline_file:
+            regressions: List[str] = find_regressions(results, json.load(baseline_file)['results'], threshold)
+        for regression in regressions:
+            click.echo(f'regression {regression}', err=True)
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
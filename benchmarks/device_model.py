@@ -0,0 +1,201 @@
+# coding=utf-8
+"""
+Usage:
+    python3 -m benchmarks.device_model --count 5000
+
+    Compares the memory and build time of holding a fleet of devices as Roku, DeviceRecord and DeviceHandle
+
+ToDos:
+"""
+# standard lib imports
+import gc
+import time
+import tracemalloc
+import xml.etree.ElementTree as ElementTree
+from typing import Callable, List, Tuple
+# third party lib imports
+import click
+# project imports
+from pyku.device import DeviceHandle, DeviceRecord
+from pyku.roku import Roku
+
+MODELS: List[Tuple[str, str, str]] = [
+    ('Roku Ultra', '4800X', 'false'),
+    ('Roku Express', '3930X', 'false'),
+    ('Roku Streaming Stick+', '3810X', 'false'),
+    ('TCL Roku TV', '7000X', 'true')
+]
+
+
+def synthetic_device_info(index: int) -> bytes:
+    """
+    Builds a device-info response shaped like a real device's
+    :param index: device number, keeps ids unique
+    :return: device-info xml
+    """
+    model_name, model_number, is_tv = MODELS[index % len(MODELS)]
+    fields: dict = {
+        'udn': f'29780001-5c00-1088-80{index:010x}',
+        'serial-number': f'YN{index:011d}',
+        'device-id': f'S0{index:010d}',
+        'advertising-id': f'1a{index:030x}',
+        'vendor-name': 'Roku',
+        'model-name': model_name,
+        'model-number': model_number,
+        'model-region': 'US',
+        'is-tv': is_tv,
+        'is-stick': 'false',
+        'supports-ethernet': 'true',
+        'wifi-mac': f'b0:a7:37:{index % 256:02x}:{index // 256 % 256:02x}:00',
+        'wifi-driver': 'realtek',
+        'network-type': 'wifi',
+        'friendly-device-name': f'Lab {index}',
+        'friendly-model-name': model_name,
+        'default-device-name': f'{model_name} - YN{index:011d}',
+        'user-device-name': f'Lab {index}',
+        'user-device-location': 'Lab',
+        'build-number': '469.30E04170A',
+        'software-version': '11.0.0',
+        'software-build': '4170',
+        'secure-device': 'true',
+        'language': 'en',
+        'country': 'US',
+        'locale': 'en_US',
+        'time-zone-auto': 'true',
+        'time-zone': 'US/Eastern',
+        'time-zone-name': 'United States/Eastern',
+        'time-zone-tz': 'America/New_York',
+        'time-zone-offset': '-240',
+        'clock-format': '12-hour',
+        'uptime': str(1000 + index),
+        'power-mode': 'PowerOn',
+        'supports-suspend': 'false',
+        'supports-find-remote': 'true',
+        'find-remote-is-possible': 'true',
+        'supports-audio-guide': 'true',
+        'supports-rva': 'true',
+        'developer-enabled': 'true',
+        'keyed-developer-id': f'{index:040x}',
+        'search-enabled': 'true',
+        'search-channels-enabled': 'true',
+        'voice-search-enabled': 'true',
+        'notifications-enabled': 'true',
+        'notifications-first-use': 'false',
+        'supports-private-listening': 'true',
+        'headphones-connected': 'false',
+        'supports-warm-standby': 'true',
+        'supports-wake-on-wlan': 'false',
+        'has-play-on-roku': 'true',
+        'has-mobile-screensaver': 'false',
+        'support-url': 'roku.com/support',
+        'grandcentral-version': '7.1.43',
+        'trc-version': '3.0',
+        'trc-channel-version': '4.2.4',
+        'davinci-version': '2.8.20',
+        'has-wifi-extender': 'false',
+        'has-wifi-5G-support': 'true',
+        'can-use-wifi-extender': 'true'
+    }
+    body: str = ''.join(f'<{key}>{value}</{key}>' for key, value in fields.items())
+
+    return f'<?xml version="1.0" encoding="UTF-8" ?><device-info>{body}</device-info>'.encode()
+
+
+def location(index: int) -> str:
+    """
+    Gives each synthetic device its own ip
+    """
+    return f'http://10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}:8060/'
+
+
+def build_roku(index: int, device_info: bytes) -> Roku:
+    """
+    Builds a Roku the way Roku.fetch_device_info does
+    """
+    roku: Roku = Roku(
+        location=location(index),
+        discovery_data={
+            'LOCATION': location(index),
+            'USN': f'uuid:roku:ecp:YN{index:011d}',
+            'Cache-Control': 'max-age=3600'
+        }
+    )
+    roku.load_device_info({field.tag: field.text for field in ElementTree.fromstring(device_info)})
+
+    return roku
+
+
+def build_record(index: int, device_info: bytes) -> DeviceRecord:
+    """
+    Builds a DeviceRecord, device-info stays undecoded
+    """
+    return DeviceRecord(location(index), device_info, f'uuid:roku:ecp:YN{index:011d}', 3600)
+
+
+def build_decoded_record(index: int, device_info: bytes) -> DeviceRecord:
+    """
+    Builds a DeviceRecord and reads a field, decoding its device-info
+    """
+    record: DeviceRecord = build_record(index, device_info)
+    record.decode()
+
+    return record
+
+
+def build_handle(index: int, device_info: bytes) -> DeviceHandle:
+    """
+    Builds a DeviceHandle, all keypress needs
+    """
+    return DeviceHandle(location(index), 'rokudev', '1234')
+
+
+def measure(build: Callable, count: int, traced: bool) -> float:
+    """
+    Builds one object per device from a freshly fetched device-info response, keeping them all alive. Responses
+    are built inside the measurement so models that keep them are charged for them.
+    :param build: builds an object from (index, device-info xml)
+    :param count: number of devices
+    :param traced: flag to return bytes allocated per device instead of seconds to build all
+    :return:
+    """
+    gc.collect()
+    if traced:
+        tracemalloc.start()
+    start: float = time.perf_counter()
+    fleet: list = [build(index, synthetic_device_info(index)) for index in range(count)]
+    elapsed: float = time.perf_counter() - start
+    if not traced:
+        return elapsed
+
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del fleet
+
+    return allocated / count
+
+
+@click.command()
+@click.option('--count', 'count', help='Number of devices in the fleet', type=int, default=5000)
+def main(count: int):
+    """
+    Prints memory per device and build time for each device model
+    :param count: number of devices in the fleet
+    """
+    models: List[Tuple[str, Callable]] = [
+        ('Roku', build_roku),
+        ('DeviceRecord (undecoded)', build_record),
+        ('DeviceRecord (decoded)', build_decoded_record),
+        ('DeviceHandle', build_handle)
+    ]
+
+    click.echo(f'{count} devices')
+    click.echo(f'{"model":<26}{"bytes/device":>14}{"build ms":>12}')
+    for name, build in models:
+        # timed separately, tracemalloc slows allocation heavy builds down
+        elapsed: float = measure(build, count, traced=False)
+        per_device: float = measure(build, count, traced=True)
+        click.echo(f'{name:<26}{per_device:>14,.0f}{elapsed * 1000:>12,.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+# coding=utf-8
+"""
+Usage:
+    python3 -m benchmarks.fleet --devices 1,10,50,100 --jobs 16 --latency 0.02 --bandwidth 50 --output fleet.json
+
+    Deploys a synthetic channel to fleets of simulated devices (benchmarks.simulator) of growing size and reports deploy
+    throughput and per device latency percentiles for each size
+
+ToDos:
+"""
+# standard lib imports
+import json
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import List, Union
+# third party lib imports
+import click
+# project imports
+from benchmarks.simulator import SimulatorFleet
+from benchmarks.synthetic import PROFILES, generate_channel
+from pyku.channel import Channel
+from pyku.profiling import PROFILER
+from pyku.roku import Roku
+from pyku.utils import deploy_archive_to_devices, deploy_succeeded
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Nearest rank percentile
+    :param values: samples
+    :param fraction: 0.5 is the median, 0.99 the 99th percentile
+    :return:
+    """
+    ordered: List[float] = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def run_fleet(
+    channel: Channel,
+    devices: int,
+    jobs: int,
+    latency: float,
+    bandwidth: float,
+    install_time: float
+) -> dict:
+    """
+    Deploys the channel's archive to a fresh fleet once
+    :param channel: Channel with a built archive
+    :param devices: fleet size
+    :param jobs: max concurrent deploys
+    :param latency: simulated seconds per response
+    :param bandwidth: simulated upload bytes per second per device, 0 is unlimited
+    :param install_time: simulated seconds per install
+    :return: throughput and latency percentiles
+    """
+    with SimulatorFleet(devices, latency, bandwidth, install_time) as fleet:
+        rokus: List[Roku] = fleet.rokus()
+
+        PROFILER.enable()
+        started_at: float = time.perf_counter()
+        # deploys echo each device's installer messages, keep them out of the report
+        with redirect_stdout(StringIO()):
+            results: list = deploy_archive_to_devices(channel, rokus, jobs)
+        wall: float = time.perf_counter() - started_at
+        PROFILER.enabled = False
+
+        received: int = sum(server.device.received_bytes for server in fleet.servers)
+
+    latencies: List[float] = [(span.end - span.start) / 1e9 for span in PROFILER.spans if span.name == 'deploy']
+    succeeded: int = sum(1 for _, result_msgs in results if deploy_succeeded(result_msgs))
+
+    return {
+        'devices': devices,
+        'jobs': jobs,
+        'succeeded': succeeded,
+        'wall_s': wall,
+        'devices_per_s': devices / wall,
+        'upload_mb_per_s': received / wall / 1024 / 1024,
+        'latency_s': {
+            'min': min(latencies),
+            'p50': percentile(latencies, 0.5),
+            'p90': percentile(latencies, 0.9),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies),
+            'mean': statistics.mean(latencies)
+        }
+    }
+
+
+@click.command()
+@click.option('--devices', 'devices', help='Comma separated fleet sizes', type=str, default='1,10,50,100')
+@click.option('-j', '--jobs', 'jobs', help='Max number of devices deployed to at once', type=int, default=4)
+@click.option('--project', 'project', help='Synthetic channel deployed', type=click.Choice(list(PROFILES)),
+              default='small')
+@click.option('--latency', 'latency', help='Simulated seconds per response', type=float, default=0.02)
+@click.option('--bandwidth', 'bandwidth', help='Simulated upload Mbit/s per device, 0 is unlimited', type=float,
+              default=50)
+@click.option('--install-time', 'install_time', help='Simulated seconds per install', type=float, default=0.5)
+@click.option('--output', 'output', help='File results are written to as JSON', type=click.Path(dir_okay=False),
+              default=None)
+def main(
+    devices: str,
+    jobs: int,
+    project: str,
+    latency: float,
+    bandwidth: float,
+    install_time: float,
+    output: Union[None, str]
+):
+    """
+    Runs the fleet deploy benchmark
+    """
+    sizes: List[int] = [int(size) for size in devices.split(',') if size.strip()]
+    work_dir: str = tempfile.mkdtemp(prefix='pyku-fleet-')
+    results: List[dict] = []
+    try:
+        root: Path = Path(work_dir) / project
+        generate_channel(root, PROFILES[project])
+        channel: Channel = Channel(str(root))
+        with redirect_stdout(StringIO()):
+            channel.build_channel_archive()
+        archive_size: int = channel.channel_archive.stat().st_size
+        click.echo(f'deploying {archive_size / 1024:.0f}KB archive', err=True)
+
+        for size in sizes:
+            result: dict = run_fleet(channel, size, jobs, latency, bandwidth * 1000 * 1000 / 8, install_time)
+            results.append(result)
+            click.echo(
+                f'{size:>5} devices {result["succeeded"]:>5} ok {result["wall_s"]:>8.2f}s '
+                f'{result["devices_per_s"]:>7.2f} devices/s {result["upload_mb_per_s"]:>7.2f}MB/s '
+                f'p50 {result["latency_s"]["p50"]:.2f}s p90 {result["latency_s"]["p90"]:.2f}s '
+                f'p99 {result["latency_s"]["p99"]:.2f}s',
+                err=True
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report: dict = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'project': project,
+        'archive_bytes': archive_size,
+        'latency': latency,
+        'bandwidth_mbit': bandwidth,
+        'install_time': install_time,
+        'results': results
+    }
+    if output is not None:
+        with Path(output).open('w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        click.echo(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,528 @@
+# coding=utf-8
+"""
+Usage:
+    python3 -m benchmarks.simulator --count 10 --latency 0.02 --bandwidth 20
+
+    Stand in Roku devices on loopback ports for load testing deploys without hardware. Each device serves the ECP
+    endpoints Roku uses (query/device-info, query/apps, query/active-app, query/media-player, keypress) and
+    /plugin_install with digest auth on one port, with configurable latency, upload bandwidth and install time.
+
+    with SimulatorFleet(100, latency=0.02) as fleet:
+        rokus = fleet.rokus()
+
+ToDos:
+"""
+# standard lib imports
+import hashlib
+import io
+import re
+import secrets
+import threading
+import time
+import zipfile
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple, Union
+from xml.sax.saxutils import escape
+# third party lib imports
+import click
+# project imports
+from pyku.roku import Roku
+
+SIMULATOR_HOST: str = '127.0.0.1'
+SIMULATOR_REALM: str = 'rokudev'
+SIMULATOR_READ_CHUNK: int = 64 * 1024
+# digest nonces a device still accepts, older ones are forgotten and answered with a fresh challenge
+SIMULATOR_NONCES: int = 64
+DIGEST_FIELD: re.Pattern = re.compile(r'(\w+)=(?:"([^"]*)"|([^\s,]+))')
+
+
+def installer_message(status: str, content: str) -> str:
+    """
+    One plugin installer message, in the markup parse_plugin_installer_output reads
+    """
+    return f"node.appendChild(Shell.create('Roku.Message').trigger('Set message type', '{status}')" \
+           f".trigger('Set message content', '{content}').trigger('Render', node));"
+
+
+def installer_page(messages: List[Tuple[str, str]]) -> bytes:
+    """
+    Plugin installer page holding messages
+    :param messages: (status, content) pairs
+    :return:
+    """
+    lines: List[str] = [installer_message(status, content) for status, content in messages]
+    script: str = '\n'.join(lines)
+
+    return f'<html><head><title>Roku Development Kit</title></head><body><div id="root"></div>' \
+           f'<script type="text/javascript">\nvar node = document.getElementById("root");\n{script}\n' \
+           f'</script></body></html>'.encode()
+
+
+def read_manifest(archive: bytes) -> Union[None, Dict[str, str]]:
+    """
+    Reads a channel archive's manifest
+    :param archive: zip bytes
+    :return: manifest key -> value, None if the archive isn't a zip with a manifest
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(archive)) as channel_zip:
+            manifest: str = channel_zip.read('manifest').decode('utf-8', 'replace')
+    except (zipfile.BadZipFile, KeyError):
+        return None
+
+    values: Dict[str, str] = {}
+    for line in manifest.splitlines():
+        key, separator, value = line.partition('=')
+        if separator and not key.startswith('#'):
+            values[key.strip()] = value.strip()
+
+    return values
+
+
+def multipart_fields(body: bytes, content_type: str) -> Dict[str, bytes]:
+    """
+    Splits a multipart/form-data body into its fields
+    :param body: request body
+    :param content_type: Content-Type header, holds the boundary
+    :return: field name -> value
+    """
+    boundary: Union[None, re.Match] = re.search(r'boundary=([^;]+)', content_type)
+    if boundary is None:
+        return {}
+
+    fields: Dict[str, bytes] = {}
+    for part in body.split(b'--' + boundary.group(1).strip('"').encode()):
+        head, separator, value = part.partition(b'\r\n\r\n')
+        name: Union[None, re.Match] = re.search(rb'name="([^"]*)"', head)
+        if separator and name is not None:
+            fields[name.group(1).decode()] = value[:-2] if value.endswith(b'\r\n') else value
+
+    return fields
+
+
+class SimulatedDevice:
+    """
+    State of one simulated device
+
+    *Attributes:
+        index (int): Device number in its fleet
+        serial_number (str): Device serial number
+        user_name (str): Dev user name
+        password (str): Dev password
+        is_tv (bool): If the device reports as a Roku TV
+        ui_resolution (str): Reported ui-resolution, e.g. 1080p, 720p
+        dev_app (Union[None, dict]): Installed dev channel's id, version and name
+        keys (List[str]): Keys pressed, in order
+        installs (int): Successful installs
+        received_bytes (int): Archive bytes received
+        nonces (deque): Last SIMULATOR_NONCES digest nonces handed out
+
+    *methods
+        device_info() -> bytes:
+
+        apps() -> bytes:
+
+        install(archive: bytes) -> List[Tuple[str, str]]:
+
+        delete() -> List[Tuple[str, str]]:
+    """
+    def __init__(
+        self,
+        index: int,
+        user_name: str = 'rokudev',
+        password: str = 'rokudev',
+        is_tv: bool = False,
+        ui_resolution: str = '1080p'
+    ):
+        self.index: int = index
+        self.serial_number: str = f'SIM{index:09d}'
+        self.user_name: str = user_name
+        self.password: str = password
+        self.is_tv: bool = is_tv
+        self.ui_resolution: str = ui_resolution
+        self.dev_app: Union[None, dict] = None
+        self.keys: List[str] = []
+        self.installs: int = 0
+        self.received_bytes: int = 0
+        self.nonces: deque = deque(maxlen=SIMULATOR_NONCES)
+        self.lock: threading.Lock = threading.Lock()
+
+    def device_info(self) -> bytes:
+        """
+        query/device-info response
+        """
+        fields: Dict[str, str] = {
+            'udn': f'29780001-5c00-1088-8000-{self.index:012x}',
+            'serial-number': self.serial_number,
+            'device-id': f'S{self.index:011d}',
+            'vendor-name': 'Roku',
+            'model-name': 'Roku TV' if self.is_tv else 'Roku Ultra',
+            'model-number': '7000X' if self.is_tv else '4800X',
+            'is-tv': str(self.is_tv).lower(),
+            'is-stick': 'false',
+            'ui-resolution': self.ui_resolution,
+            'friendly-device-name': f'Simulator {self.index}',
+            'friendly-model-name': 'Roku TV' if self.is_tv else 'Roku Ultra',
+            'user-device-name': f'Simulator {self.index}',
+            'software-version': '11.0.0',
+            'software-build': '4170',
+            'power-mode': 'PowerOn',
+            'find-remote-is-possible': 'false',
+            'developer-enabled': 'true'
+        }
+        body: str = ''.join(f'<{key}>{escape(value)}</{key}>' for key, value in fields.items())
+
+        return f'<?xml version="1.0" encoding="UTF-8" ?>\n<device-info>{body}</device-info>'.encode()
+
+    def apps(self) -> bytes:
+        """
+        query/apps response
+        """
+        apps: str = '<app id="12" type="appl" version="5.1.0">Netflix</app>'
+        with self.lock:
+            if self.dev_app is not None:
+                apps += f'<app id="dev" type="appl" version="{escape(self.dev_app["version"])}">' \
+                        f'{escape(self.dev_app["name"])}</app>'
+
+        return f'<?xml version="1.0" encoding="UTF-8" ?>\n<apps>{apps}</apps>'.encode()
+
+    def install(self, archive: bytes) -> List[Tuple[str, str]]:
+        """
+        Installs an archive as the dev channel, like Replace
+        :param archive: zip bytes
+        :return: installer messages
+        """
+        manifest: Union[None, Dict[str, str]] = read_manifest(archive)
+        if manifest is None:
+            return [('error', 'Install Failure: Compilation Failed.')]
+
+        version: str = '.'.join(
+            manifest.get(key, '0') for key in ['major_version', 'minor_version', 'build_version']
+        )
+        with self.lock:
+            self.dev_app = {'version': version, 'name': manifest.get('title', 'dev')}
+            self.installs += 1
+            self.received_bytes += len(archive)
+
+        return [('info', f'Received {len(archive)} bytes.'), ('success', 'Install Success.')]
+
+    def delete(self) -> List[Tuple[str, str]]:
+        """
+        Deletes the dev channel
+        :return: installer messages
+        """
+        with self.lock:
+            self.dev_app = None
+
+        return [('success', 'Delete Succeeded.')]
+
+
+class SimulatorRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves one simulated device's ECP and plugin installer requests, keeping connections alive like a device does
+    """
+    protocol_version: str = 'HTTP/1.1'
+    server: 'SimulatorServer'
+
+    def log_message(self, format: str, *args) -> None:
+        return None
+
+    def respond(self, status: int, body: bytes = b'', content_type: str = 'text/xml',
+                headers: Union[None, dict] = None) -> None:
+        """
+        Sends a response after the device's latency
+        """
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client gave up, e.g. a streamed upload whose archive failed to build
+            self.close_connection = True
+
+    def read_body(self) -> Union[None, bytes]:
+        """
+        Reads the request body, Content-Length or chunked, no faster than the device's bandwidth allows
+        :return: body, None when the connection closed before all of it arrived
+        """
+        chunks: List[bytes] = []
+        started_at: float = time.monotonic()
+        received: int = 0
+
+        def read(size: int) -> bytes:
+            nonlocal received
+            data: bytes = self.rfile.read(size)
+            received += len(data)
+            if self.server.bandwidth > 0:
+                behind: float = received / self.server.bandwidth - (time.monotonic() - started_at)
+                if behind > 0:
+                    time.sleep(behind)
+            return data
+
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size_line: bytes = self.rfile.readline()
+                if not size_line:
+                    return None
+                size: int = int(size_line.split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    # trailers end with an empty line
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                while size > 0:
+                    chunk: bytes = read(min(SIMULATOR_READ_CHUNK, size))
+                    if not chunk:
+                        return None
+                    chunks.append(chunk)
+                    size -= len(chunk)
+                self.rfile.readline()
+
+            return b''.join(chunks)
+
+        remaining: int = int(self.headers.get('Content-Length', 0) or 0)
+        while remaining > 0:
+            chunk = read(min(SIMULATOR_READ_CHUNK, remaining))
+            if not chunk:
+                return None
+            chunks.append(chunk)
+            remaining -= len(chunk)
+
+        return b''.join(chunks)
+
+    def authorized(self) -> bool:
+        """
+        Checks the request's digest auth, qop=auth with MD5 as real devices use
+        """
+        header: str = self.headers.get('Authorization', '')
+        if not header.startswith('Digest '):
+            return False
+
+        fields: Dict[str, str] = {key: quoted or bare for key, quoted, bare in DIGEST_FIELD.findall(header)}
+        device: SimulatedDevice = self.server.device
+        if fields.get('username') != device.user_name or fields.get('nonce') not in device.nonces:
+            return False
+
+        def md5(value: str) -> str:
+            return hashlib.md5(value.encode()).hexdigest()
+
+        ha1: str = md5(f'{device.user_name}:{SIMULATOR_REALM}:{device.password}')
+        ha2: str = md5(f'{self.command}:{fields.get("uri", "")}')
+        if fields.get('qop') == 'auth':
+            expected: str = md5(f'{ha1}:{fields["nonce"]}:{fields.get("nc", "")}:{fields.get("cnonce", "")}:auth:{ha2}')
+        else:
+            expected = md5(f'{ha1}:{fields["nonce"]}:{ha2}')
+
+        return secrets.compare_digest(expected, fields.get('response', ''))
+
+    def challenge(self) -> None:
+        """
+        Answers a request without valid credentials with a fresh digest challenge
+        """
+        nonce: str = secrets.token_hex(16)
+        self.server.device.nonces.append(nonce)
+        self.respond(
+            401,
+            b'<html><body>401 Unauthorized</body></html>',
+            'text/html',
+            {'WWW-Authenticate': f'Digest realm="{SIMULATOR_REALM}", nonce="{nonce}", qop="auth"'}
+        )
+
+    def do_GET(self) -> None:
+        device: SimulatedDevice = self.server.device
+        if self.path == '/query/device-info':
+            self.respond(200, device.device_info())
+        elif self.path == '/query/apps':
+            self.respond(200, device.apps())
+        elif self.path == '/query/active-app':
+            self.respond(200, b'<?xml version="1.0" encoding="UTF-8" ?>\n<active-app><app>Roku</app></active-app>')
+        elif self.path == '/query/media-player':
+            self.respond(200, b'<?xml version="1.0" encoding="UTF-8" ?>\n<player error="false" state="close" />')
+        elif self.path == '/plugin_install':
+            if not self.authorized():
+                self.challenge()
+                return
+            self.respond(200, installer_page([]), 'text/html')
+        else:
+            self.respond(404)
+
+    def do_POST(self) -> None:
+        device: SimulatedDevice = self.server.device
+        body: Union[None, bytes] = self.read_body()
+        if body is None:
+            # the client went away mid upload, a device installs nothing
+            self.close_connection = True
+            return
+        if self.path.startswith('/keypress/'):
+            with device.lock:
+                device.keys.append(self.path[len('/keypress/'):])
+            self.respond(200)
+        elif self.path == '/plugin_install':
+            if not self.authorized():
+                self.challenge()
+                return
+
+            fields: Dict[str, bytes] = multipart_fields(body, self.headers.get('Content-Type', ''))
+            mysubmit: str = fields.get('mysubmit', b'').decode()
+            if mysubmit in ['Replace', 'Install']:
+                if self.server.install_time > 0:
+                    time.sleep(self.server.install_time)
+                messages: List[Tuple[str, str]] = device.install(fields.get('archive', b''))
+            elif mysubmit == 'Delete':
+                messages = device.delete()
+            else:
+                messages = [('error', f'Unknown action {mysubmit}.')]
+            self.respond(200, installer_page(messages), 'text/html')
+        else:
+            self.respond(404)
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """
+    HTTP server for one simulated device
+
+    *Attributes:
+        device (SimulatedDevice): Device state
+        latency (float): Seconds added before every response
+        bandwidth (float): Upload bytes per second per connection, 0 is unlimited
+        install_time (float): Seconds an install takes once the archive is received
+    """
+    daemon_threads: bool = True
+
+    def __init__(
+        self,
+        device: SimulatedDevice,
+        host: str = SIMULATOR_HOST,
+        port: int = 0,
+        latency: float = 0,
+        bandwidth: float = 0,
+        install_time: float = 0
+    ):
+        super().__init__((host, port), SimulatorRequestHandler)
+        self.device: SimulatedDevice = device
+        self.latency: float = latency
+        self.bandwidth: float = bandwidth
+        self.install_time: float = install_time
+
+    @property
+    def location(self) -> str:
+        """
+        Device's ECP location
+        """
+        return f'http://{self.server_address[0]}:{self.server_address[1]}/'
+
+
+class SimulatorFleet:
+    """
+    N simulated devices, each on its own loopback port serving ECP and the plugin installer
+
+    *Attributes:
+        servers (List[SimulatorServer]): Server per device
+        threads (List[threading.Thread]): Thread serving each server
+
+    *methods
+        start() -> None:
+
+        stop() -> None:
+
+        rokus() -> List[Roku]:
+    """
+    def __init__(
+        self,
+        count: int,
+        latency: float = 0,
+        bandwidth: float = 0,
+        install_time: float = 0,
+        user_name: str = 'rokudev',
+        password: str = 'rokudev',
+        host: str = SIMULATOR_HOST
+    ):
+        self.servers: List[SimulatorServer] = [
+            SimulatorServer(
+                SimulatedDevice(index, user_name, password, is_tv=index % 4 == 3),
+                host,
+                0,
+                latency,
+                bandwidth,
+                install_time
+            )
+            for index in range(count)
+        ]
+        self.threads: List[threading.Thread] = []
+
+    def __enter__(self) -> 'SimulatorFleet':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """
+        Starts serving every device
+        """
+        for server in self.servers:
+            thread: threading.Thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self) -> None:
+        """
+        Stops every device
+        """
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def rokus(self) -> List[Roku]:
+        """
+        Roku objects pointed at the fleet, with device-info loaded and credentials set as a config would
+        :return:
+        """
+        rokus: List[Roku] = []
+        for server in self.servers:
+            roku: Roku = Roku(location=server.location, discovery_data={'LOCATION': server.location})
+            roku.installer_port = server.server_address[1]
+            roku.fetch_device_info()
+            roku.user_name = server.device.user_name
+            roku.password = server.device.password
+            roku.selected = True
+            rokus.append(roku)
+
+        return rokus
+
+
+@click.command()
+@click.option('--count', 'count', help='Number of devices', type=int, default=1)
+@click.option('--latency', 'latency', help='Seconds added before every response', type=float, default=0)
+@click.option('--bandwidth', 'bandwidth', help='Upload Mbit/s per connection, 0 is unlimited', type=float, default=0)
+@click.option('--install-time', 'install_time', help='Seconds each install takes', type=float, default=0)
+@click.option('--password', 'password', help='Dev password', type=str, default='rokudev')
+def main(count: int, latency: float, bandwidth: float, install_time: float, password: str):
+    """
+    Runs simulated devices until ctrl+c
+    """
+    with SimulatorFleet(count, latency, bandwidth * 1000 * 1000 / 8, install_time, password=password) as fleet:
+        for server in fleet.servers:
+            click.echo(f'{server.device.serial_number} @ {server.location}')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
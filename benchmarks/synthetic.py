@@ -0,0 +1,172 @@
+# coding=utf-8
+"""
+Usage:
+    python3 -m benchmarks.synthetic {{dir}} --files 500 --sizes mixed --assets brs=4,xml=3,png=2,jpg=1
+
+    Writes a synthetic channel, with a manifest and pyku_config.yml, shaped like a real one: BrightScript and
+    SceneGraph xml in nested component dirs, images beside them. Content is seeded so runs are repeatable.
+
+ToDos:
+"""
+# standard lib imports
+import copy
+import math
+import random
+from pathlib import Path
+from typing import Dict, NamedTuple, Tuple
+# third party lib imports
+import click
+import yaml
+# project imports
+from pyku.constants import PKKU_CONFIG, STANDARD_CONFIG
+
+# (min, max) bytes, sizes are drawn log-uniformly between them
+SIZE_DISTRIBUTIONS: Dict[str, Tuple[int, int]] = {
+    'small': (200, 8 * 1024),
+    'medium': (200, 64 * 1024),
+    'mixed': (200, 512 * 1024),
+    'large': (64 * 1024, 4 * 1024 * 1024)
+}
+# asset type -> (dir, extension, compressible)
+ASSET_TYPES: Dict[str, Tuple[str, str, bool]] = {
+    'brs': ('components', 'brs', True),
+    'xml': ('components', 'xml', True),
+    'json': ('source', 'json', True),
+    'png': ('images', 'png', False),
+    'jpg': ('images', 'jpg', False),
+    'ttf': ('fonts', 'ttf', False)
+}
+DEFAULT_ASSETS: Dict[str, int] = {'brs': 4, 'xml': 3, 'json': 1, 'png': 2, 'jpg': 1}
+BRIGHTSCRIPT_LINES: Tuple[str, ...] = (
+    'sub init()',
+    '    m.top.observeField("content", "onContentChanged")',
+    '    m.list = m.top.findNode("rowList")',
+    'end sub',
+    'function onKeyEvent(key as String, press as Boolean) as Boolean',
+    '    if press and key = "back" then return false',
+    '    return true',
+    'end function',
+    '\' fetches the next page of rows',
+    'm.global.addFields({ theme: "dark" })'
+)
+
+
+class ChannelProfile(NamedTuple):
+    """
+    A synthetic channel's shape
+
+    *Attributes:
+        name (str): Profile name
+        files (int): Number of content files, besides the manifest
+        sizes (str): Key of SIZE_DISTRIBUTIONS
+        assets (Dict[str, int]): Asset type -> relative weight
+    """
+    name: str
+    files: int
+    sizes: str
+    assets: Dict[str, int]
+
+
+PROFILES: Dict[str, ChannelProfile] = {
+    'small': ChannelProfile('small', 50, 'small', DEFAULT_ASSETS),
+    'medium': ChannelProfile('medium', 500, 'mixed', DEFAULT_ASSETS),
+    'huge': ChannelProfile('huge', 5000, 'medium', {**DEFAULT_ASSETS, 'png': 4, 'jpg': 2})
+}
+
+
+def compressible_content(rng: random.Random, size: int) -> bytes:
+    """
+    Source-like text of about size bytes
+    """
+    lines: list = []
+    length: int = 0
+    while length < size:
+        line: str = rng.choice(BRIGHTSCRIPT_LINES) + f' \' {rng.randrange(1 << 30):x}\n'
+        lines.append(line)
+        length += len(line)
+
+    return ''.join(lines).encode()[:size]
+
+
+def incompressible_content(rng: random.Random, size: int) -> bytes:
+    """
+    Random bytes of size, like already compressed images
+    """
+    return rng.getrandbits(size * 8).to_bytes(size, 'little') if size > 0 else b''
+
+
+def generate_channel(root: Path, profile: ChannelProfile, seed: int = 0) -> dict:
+    """
+    Writes a synthetic channel
+    :param root: channel root dir, created if missing
+    :param profile: channel shape
+    :param seed: random seed, the same seed writes the same channel
+    :return: {'files': int, 'bytes': int} of the written content, manifest included
+    """
+    rng: random.Random = random.Random(seed)
+    low, high = SIZE_DISTRIBUTIONS[profile.sizes]
+    types: list = list(profile.assets.keys())
+    weights: list = [profile.assets[asset_type] for asset_type in types]
+    total_bytes: int = 0
+
+    root.mkdir(parents=True, exist_ok=True)
+    manifest: str = f'title=Synthetic {profile.name}\nmajor_version=1\nminor_version=0\nbuild_version={seed}\n' \
+                    f'ui_resolutions=hd\n'
+    (root / 'manifest').write_text(manifest)
+    total_bytes += len(manifest)
+
+    for index in range(profile.files):
+        asset_type: str = rng.choices(types, weights)[0]
+        directory, extension, compressible = ASSET_TYPES[asset_type]
+        size: int = int(math.exp(rng.uniform(math.log(low), math.log(high))))
+        if directory == 'components':
+            # spread components over nested feature dirs
+            directory = f'components/feature{index % 17}/view{index % 5}'
+        target: Path = root / directory / f'{asset_type}_{index}.{extension}'
+        target.parent.mkdir(parents=True, exist_ok=True)
+        content: bytes = compressible_content(rng, size) if compressible else incompressible_content(rng, size)
+        target.write_bytes(content)
+        total_bytes += len(content)
+
+    config: dict = copy.deepcopy(STANDARD_CONFIG)
+    config['Root'] = str(root)
+    config['OutDir'] = str(root / 'out')
+    config['Files'] = config['Files'] + ['fonts/*']
+    with (root / PKKU_CONFIG).open('w') as config_file:
+        yaml.dump(config, config_file)
+
+    return {'files': profile.files + 1, 'bytes': total_bytes}
+
+
+def parse_assets(value: str) -> Dict[str, int]:
+    """
+    Parses --assets, e.g. brs=4,xml=3,png=2
+    """
+    assets: Dict[str, int] = {}
+    for pair in value.split(','):
+        asset_type, _, weight = pair.partition('=')
+        if asset_type not in ASSET_TYPES:
+            raise click.BadParameter(f'unknown asset type {asset_type}, one of {", ".join(ASSET_TYPES)}')
+        assets[asset_type] = int(weight or 1)
+
+    return assets
+
+
+@click.command()
+@click.argument('root', type=click.Path(file_okay=False))
+@click.option('--files', 'files', help='Number of content files', type=int, default=500)
+@click.option('--sizes', 'sizes', help='File size distribution', type=click.Choice(list(SIZE_DISTRIBUTIONS)),
+              default='mixed')
+@click.option('--assets', 'assets', help='Asset type weights, e.g. brs=4,xml=3,png=2', type=str,
+              default=','.join(f'{key}={value}' for key, value in DEFAULT_ASSETS.items()))
+@click.option('--seed', 'seed', help='Random seed', type=int, default=0)
+def main(root: str, files: int, sizes: str, assets: str, seed: int):
+    """
+    Writes a synthetic channel to ROOT
+    """
+    written: dict = generate_channel(Path(root), ChannelProfile('custom', files, sizes, parse_assets(assets)), seed)
+    click.echo(f'wrote {written["files"]} files, {written["bytes"] / 1024 / 1024:.1f}MB to {root}')
+
+
+if __name__ == '__main__':
+    main()
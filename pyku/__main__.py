@@ -4,28 +4,72 @@ Usage:
     python3 -m pyku
 
 Commands:
-    deploy - create and deploys a channel archive to Roku(s)
+    deploy - create and deploys a channel archive to Roku(s), the archive builds while devices are discovered
 
     Flags:
-        -c, --channel - Path to channel to be deployed, REQUIRED
+        -c, --channel - Path to channel to be deployed, repeatable, several channels build in parallel processes and
+            each deploys to the devices in its own config
+        -w, --workspace - pyku_workspace.yml, or its dir, listing channels to deploy together, see pyku/workspace.py
         --skip-discovery - skip device discovery and use only device designated in config
+        --debugger - stream every device's debug console, tagged per device and logged to OutDir/logs
+        -j, --jobs - max number of devices deployed to at once, defaults to 4
+        --force - upload even to devices that already run the archive
+        --refresh-devices - rescan instead of using cached devices
+        -d, --device - ip address, serial number or name of a device to use without prompting, repeatable
+        --profile - write phase timings and a Chrome trace to OutDir/profile
+        --no-daemon - run here even when pyku serve is running
 
-    keypress - simulates a remote keypress
+    watch - rebuilds and redeploys a channel whenever its files change
 
     Flags:
-        -b, --button - Button pressed, REQUIRED
-        -c, --channel - Path to channel to be deployed, REQUIRED
+        -c, --channel - Path to channel to be watched, REQUIRED
         --skip-discovery - skip device discovery and use only device designated in config
+        --debounce - seconds of quiet before rebuilding, defaults to 0.3
+        --poll - poll for changes instead of using inotify
+        -j, --jobs - max number of devices deployed to at once, defaults to 4
+        --refresh-devices - rescan instead of using cached devices
+        -d, --device - ip address, serial number or name of a device to use without prompting, repeatable
+
+    keypress - simulates remote keypresses, keys from button, script and text are sent in that order
+
+    Flags:
+        -b, --button - Button pressed
+        -s, --script - Key script, @path reads it from a file, see pyku/ecp.py for the syntax
+        -t, --text - Text typed as Lit_ keys
+        --delay - seconds between keys, defaults to 0.1
+        -c, --channel - Path to channel whose config lists devices, defaults to the current dir
+        --skip-discovery - skip device discovery and use only device designated in config
+        --refresh-devices - rescan instead of using cached devices
+        -d, --device - ip address, serial number or name of a device to use without prompting, repeatable
+        --no-daemon - run here even when pyku serve is running
+
+    analyze - reports raw and compressed size per file and dir, duplicate files and assets no code references, exits
+    non-zero when the archive would be over the config's SizeBudget
+
+    Flags:
+        -c, --channel - Path to channel to be analyzed, REQUIRED
+        --top - number of files and dirs listed, defaults to 15
+        --output - write the full report as JSON
+
+    serve - daemon keeping channels, devices and their sessions warm, deploy and keypress runs that don't prompt
+    are handed to it automatically
+
+    Flags:
+        --socket - Unix socket path, defaults to $XDG_RUNTIME_DIR/pyku/pyku.sock
+        --status - show what a running daemon holds
+        --stop - stop a running daemon
 ToDos:
 """
 # standard lib imports
+import sys
+import time
+from pathlib import Path
 from typing import Union
 # third party lib imports
 import click
 # project imports
-from pyku.channel import Channel
-from pyku.roku import Roku
-import pyku.utils as utils
+from pyku.constants import DEPLOY_STATE, ECP_KEY_DELAY, PKKU_CONFIG, WORKSPACE_FILE
+# commands import the rest of pyku when they run, so each one only pays for the modules it uses
 
 
 @click.group()
@@ -41,20 +85,105 @@ def cli():
 @click.option(
     '-c',
     '--channel',
-    'channel_path',
-    help='Path to channel project\'s root dir',
+    'channel_paths',
+    help='Path to channel project\'s root dir, repeatable',
     type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=False, readable=True),
-    required=True
+    multiple=True
+)
+@click.option(
+    '-w',
+    '--workspace',
+    'workspace_file',
+    help='Workspace file listing channels deployed together, or the dir holding pyku_workspace.yml',
+    type=click.Path(exists=True, file_okay=True, dir_okay=True, readable=True)
 )
 @click.option('--skip-discovery', 'skip_discovery', flag_value=True)
-@click.option('--debugger', 'debugger', flag_value=True)
-def deploy(channel_path: str, skip_discovery: bool, debugger: bool):
+@click.option('--debugger', 'debugger', help='Stream the devices\' debug consoles', flag_value=True)
+@click.option('-j', '--jobs', 'jobs', help='Max number of devices deployed to at once', type=int, default=4)
+@click.option('--force', 'force', help='Upload even to devices that already run the archive', flag_value=True)
+@click.option('--refresh-devices', 'refresh_devices', help='Rescan instead of using cached devices', flag_value=True)
+@click.option(
+    '-d',
+    '--device',
+    'devices',
+    help='Ip address, serial number or name of a device to use without prompting, repeatable',
+    multiple=True
+)
+@click.option('--profile', 'profile', help='Write phase timings and a Chrome trace to OutDir/profile', flag_value=True)
+@click.option('--no-daemon', 'no_daemon', help='Run here even when pyku serve is running', flag_value=True)
+def deploy(
+    channel_paths: tuple,
+    workspace_file: Union[None, str],
+    skip_discovery: bool,
+    debugger: bool,
+    jobs: int,
+    force: bool,
+    refresh_devices: bool,
+    devices: tuple,
+    profile: bool,
+    no_daemon: bool
+):
     """
     Deploy Command
-    :param channel_path: Path to channel project's root dir
+    :param channel_paths: Paths to channel projects' root dirs
+    :param workspace_file: Path to a workspace file listing channels
     :param skip_discovery: falg to skip device discovery and use config rokus
+    :param debugger: flag to stream the devices' debug consoles
+    :param jobs: max number of devices deployed to at once
+    :param force: flag to upload even to devices that already run the archive
+    :param refresh_devices: flag to rescan instead of using cached devices
+    :param devices: ip addresses, serial numbers or names of devices to use without prompting
+    :param profile: flag to write phase timings and a Chrome trace
+    :param no_daemon: flag to run here even when pyku serve is running
     """
+    if len(channel_paths) == 0 and workspace_file is None:
+        raise click.UsageError('Missing option \'-c\' / \'--channel\' or \'-w\' / \'--workspace\'.')
+
+    # several channels build in a process pool and deploy to the devices in their own configs, without prompting
+    if workspace_file is not None or len(channel_paths) > 1:
+        if debugger or profile:
+            raise click.UsageError('--debugger and --profile deploy one channel at a time')
+        from pyku.workspace import Workspace, deploy_workspace
+
+        workspace: Workspace = Workspace([Path(channel_path) for channel_path in channel_paths])
+        if workspace_file is not None:
+            workspace_path: Path = Path(workspace_file)
+            if workspace_path.is_dir():
+                workspace_path = workspace_path / WORKSPACE_FILE
+            if not workspace_path.is_file():
+                raise click.UsageError(f'no {WORKSPACE_FILE} in {workspace_file}')
+            listed: Workspace = Workspace.from_file(workspace_path)
+            workspace = Workspace(workspace.channel_paths + listed.channel_paths, listed.build_workers, listed.file)
+        click.echo('deploy')
+        if not deploy_workspace(workspace, jobs, force, refresh_devices, list(devices)):
+            sys.exit(1)
+        return
+
+    channel_path: str = channel_paths[0]
+    # runs that don't prompt go to the daemon when one is running, --debugger and --profile stay here
+    if not no_daemon and not debugger and not profile and (skip_discovery or len(devices) > 0) and \
+            (Path(channel_path) / PKKU_CONFIG).exists():
+        from pyku.client import DaemonClient
+
+        exit_code: Union[None, int] = DaemonClient().request('deploy', {
+            'channel': str(Path(channel_path).resolve()),
+            'jobs': jobs,
+            'force': bool(force),
+            'refresh_devices': bool(refresh_devices),
+            'devices': list(devices)
+        })
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    from pyku.channel import Channel
+    from pyku.device_cache import DeviceCache
+    from pyku.pipeline import BackgroundBuild
+    from pyku.profiling import PROFILER
+    import pyku.utils as utils
+
     click.echo('deploy')
+    if profile:
+        PROFILER.enable()
     channel: Channel = Channel(channel_path)
     # Checking for channel config
     if not channel.has_config:
@@ -73,29 +202,166 @@ def deploy(channel_path: str, skip_discovery: bool, debugger: bool):
                 prompt_suffix='?'
             )
 
-    # Create channel archive
-    click.echo('staging channel')
-    channel.stage_channel_for_compilation()
+    # Create channel archive while devices are discovered and selected, or while uploading it with StreamUpload
     click.echo('creating archive')
-    channel.archive_staged_content_to_out()
+    build: Union[None, BackgroundBuild] = None
+    if not channel.channel_config.stream_upload:
+        build = BackgroundBuild(channel)
+        build.start()
     selected_devices: list = []
-    deploy_status: str = "false"
+    all_succeeded: bool = False
 
-    if not skip_discovery:
-        selected_devices = utils.run_device_discovery(channel)
-    else:
-        selected_devices = utils.get_selected_from_config(channel)
+    device_cache: DeviceCache = DeviceCache()
+
+    try:
+        if not skip_discovery and len(devices) == 0:
+            selected_devices = utils.run_device_discovery(channel, device_cache, refresh_devices)
+        else:
+            selected_devices = utils.get_selected_from_config(channel, device_cache, refresh_devices, list(devices))
+    finally:
+        if build is not None:
+            build.wait()
+    if channel.archive_from_cache:
+        click.echo(f'reusing cached archive {str(channel.channel_archive)}')
+
+    streamer: Union[None, 'DebugConsoleStreamer'] = None
+    if debugger and len(selected_devices) > 0:
+        from pyku.debugger import DebugConsoleStreamer
 
-    # loop through selected rokus and deploy archives
+        # connect before uploading so launch and compile output is captured
+        streamer = DebugConsoleStreamer(selected_devices, channel.channel_config.out_dir / 'logs')
+        streamer.start()
+
+    # deploy the archive to every selected roku, jobs at a time
     if len(selected_devices) > 0:
-        for selected in selected_devices:
-            result_msgs: list = selected.deploy_archive(channel.channel_archive)
-            for msg in result_msgs:
-                deploy_status = msg["status"]
-                click.echo(f'{selected.friendly_model_name} | Status {deploy_status} | {msg["msg"]}')
+        from pyku.planner import DeployPlanner
+
+        planner: Union[None, DeployPlanner] = None
+        if not force:
+            planner = DeployPlanner(channel.channel_config.cache_dir / DEPLOY_STATE)
+        results: list = utils.deploy_channel_to_devices(channel, selected_devices, jobs, planner)
+        all_succeeded = utils.echo_deploy_summary(results)
+    elif channel.channel_config.stream_upload:
+        channel.build_channel_archive()
+
+    device_cache.finish()
+
+    if profile:
+        for profile_file in PROFILER.write(channel.channel_config.out_dir / 'profile', 'deploy'):
+            click.echo(f'wrote {str(profile_file)}')
+        for phase, timing in PROFILER.summary()['phases'].items():
+            click.echo(f'{phase} | {timing["count"]}x | {timing["total_ms"]:.0f}ms')
 
-    if deploy_status == "success" and debugger:
-        print("run debugger")
+    if streamer is not None:
+        click.echo(f'streaming debug console to {str(channel.channel_config.out_dir / "logs")}, ctrl+c to stop')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            click.echo('stopped debugger')
+        finally:
+            streamer.stop()
+
+    if not all_succeeded:
+        sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    '-c',
+    '--channel',
+    'channel_path',
+    help='Path to channel project\'s root dir',
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=False, readable=True),
+    required=True
+)
+@click.option('--skip-discovery', 'skip_discovery', flag_value=True)
+@click.option('--debounce', 'debounce', help='Seconds of quiet before rebuilding', type=float, default=0.3)
+@click.option('--poll', 'poll', help='Poll for changes instead of using inotify', flag_value=True)
+@click.option('-j', '--jobs', 'jobs', help='Max number of devices deployed to at once', type=int, default=4)
+@click.option('--refresh-devices', 'refresh_devices', help='Rescan instead of using cached devices', flag_value=True)
+@click.option(
+    '-d',
+    '--device',
+    'devices',
+    help='Ip address, serial number or name of a device to use without prompting, repeatable',
+    multiple=True
+)
+def watch(
+    channel_path: str,
+    skip_discovery: bool,
+    debounce: float,
+    poll: bool,
+    jobs: int,
+    refresh_devices: bool,
+    devices: tuple
+):
+    """
+    Watch Command, rebuilds and redeploys the channel whenever its files change
+    :param channel_path: Path to channel project's root dir
+    :param skip_discovery: flag to skip device discovery and use config rokus
+    :param debounce: seconds of quiet required before rebuilding
+    :param poll: flag to poll for changes instead of using inotify
+    :param jobs: max number of devices deployed to at once
+    :param refresh_devices: flag to rescan instead of using cached devices
+    :param devices: ip addresses, serial numbers or names of devices to use without prompting
+    """
+    from pyku.channel import Channel
+    from pyku.device_cache import DeviceCache
+    from pyku.planner import DeployPlanner
+    from pyku.watch import ChannelWatcher
+    import pyku.utils as utils
+
+    click.echo('watch')
+    channel: Channel = Channel(channel_path)
+    if not channel.has_config:
+        click.echo('cannot watch a channel without pyku_config.yml, run deploy first')
+        exit()
+
+    # keep compressed entries between builds so only changed files are recompressed
+    channel.entry_cache = {}
+    stream_upload: bool = channel.channel_config.stream_upload
+    if not stream_upload:
+        channel.build_channel_archive()
+    deployed_key: Union[None, str] = channel.archive_key
+
+    device_cache: DeviceCache = DeviceCache()
+    if not skip_discovery and len(devices) == 0:
+        selected_devices: list = utils.run_device_discovery(channel, device_cache, refresh_devices)
+    else:
+        selected_devices = utils.get_selected_from_config(channel, device_cache, refresh_devices, list(devices))
+    device_cache.finish()
+
+    # deploys go through the same path as deploy, so StreamUpload, ImageProfile auto and the planner apply
+    planner: DeployPlanner = DeployPlanner(channel.channel_config.cache_dir / DEPLOY_STATE)
+    utils.deploy_channel_to_devices(channel, selected_devices, jobs, planner)
+    watcher: ChannelWatcher = ChannelWatcher(channel, debounce=debounce, polling=poll)
+    click.echo('watching for changes, ctrl+c to stop')
+
+    try:
+        while True:
+            changed: list = watcher.wait_for_changes()
+            click.echo(f'changed {", ".join(changed[:5])}{" ..." if len(changed) > 5 else ""}')
+            try:
+                # a streamed build is the deploy, an unchanged archive is then served from the cache and the
+                # planner skips the devices already running it
+                built_key: Union[None, str] = None
+                if not stream_upload:
+                    channel.build_channel_archive()
+                    built_key = channel.archive_key
+                    if built_key is not None and built_key == deployed_key:
+                        click.echo('archive unchanged, skipping deploy')
+                        continue
+
+                utils.deploy_channel_to_devices(channel, selected_devices, jobs, planner)
+                deployed_key = built_key
+            except click.ClickException as error:
+                # e.g. over the SizeBudget, keep watching for the fix
+                click.echo(f'Error: {error.format_message()}')
+    except KeyboardInterrupt:
+        click.echo('stopped watching')
+    finally:
+        watcher.close()
 
 
 @cli.command()
@@ -104,8 +370,18 @@ def deploy(channel_path: str, skip_discovery: bool, debugger: bool):
     '--button',
     help='Simulated button pressed',
     type=str,
-    required=True
+    required=False
+)
+@click.option(
+    '-s',
+    '--script',
+    'script',
+    help='Key script, e.g. \'down*3 select "search text" wait:2 back\', @path reads it from a file',
+    type=str,
+    required=False
 )
+@click.option('-t', '--text', 'text', help='Text typed as Lit_ keys', type=str, required=False)
+@click.option('--delay', 'delay', help='Seconds between keys', type=float, default=ECP_KEY_DELAY)
 @click.option(
     '-c',
     '--channel',
@@ -115,19 +391,202 @@ def deploy(channel_path: str, skip_discovery: bool, debugger: bool):
     required=False
 )
 @click.option('--skip-discovery', 'skip_discovery', flag_value=True)
-def keypress(button: str, channel_path: str, skip_discovery: bool):
+@click.option('--refresh-devices', 'refresh_devices', help='Rescan instead of using cached devices', flag_value=True)
+@click.option(
+    '-d',
+    '--device',
+    'devices',
+    help='Ip address, serial number or name of a device to use without prompting, repeatable',
+    multiple=True
+)
+@click.option('--no-daemon', 'no_daemon', help='Run here even when pyku serve is running', flag_value=True)
+def keypress(
+    button: str,
+    script: str,
+    text: str,
+    delay: float,
+    channel_path: str,
+    skip_discovery: bool,
+    refresh_devices: bool,
+    devices: tuple,
+    no_daemon: bool
+):
+    """
+    Keypress Command
+    :param button: key to press
+    :param script: key script, or @path of a file holding one
+    :param text: text typed as Lit_ keys
+    :param delay: seconds between keys
+    :param channel_path: Path to channel project's root dir, its config supplies devices
+    :param skip_discovery: flag to skip device discovery and use config rokus
+    :param refresh_devices: flag to rescan instead of using cached devices
+    :param devices: ip addresses, serial numbers or names of devices to use without prompting
+    :param no_daemon: flag to run here even when pyku serve is running
+    """
+    if script and script.startswith('@'):
+        script = Path(script[1:]).read_text()
+    if not button and not script and not text:
+        raise click.UsageError('one of --button, --script or --text is required')
+
+    # runs that don't prompt go to the daemon when one is running, it holds the devices' ECP sessions open
+    if not no_daemon and (skip_discovery or len(devices) > 0):
+        from pyku.client import DaemonClient
+
+        exit_code: Union[None, int] = DaemonClient().request('keypress', {
+            'channel': str(Path(channel_path or '.').resolve()),
+            'button': button,
+            'script': script,
+            'text': text,
+            'delay': delay,
+            'refresh_devices': bool(refresh_devices),
+            'devices': list(devices)
+        })
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    from pyku.channel import Channel
+    from pyku.device import DeviceHandle
+    from pyku.device_cache import DeviceCache
+    from pyku.ecp import parse_key_script, text_to_keys
+    import pyku.utils as utils
+
     click.echo('key press')
-    channel: Channel = Channel(channel_path)
+    keys: list = []
+    if button:
+        keys.append(button)
+    if script:
+        try:
+            keys += parse_key_script(script)
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint='--script')
+    if text:
+        keys += text_to_keys(text)
+    if len(keys) == 0:
+        raise click.UsageError('one of --button, --script or --text is required')
+
+    channel: Channel = Channel(channel_path or '.')
     selected_devices: list = []
+    device_cache: DeviceCache = DeviceCache()
 
-    if not skip_discovery:
-        selected_devices.append(utils.run_device_discovery(channel))
+    if not skip_discovery and len(devices) == 0:
+        selected_devices += utils.run_device_discovery(channel, device_cache, refresh_devices, require_password=False)
     else:
-        selected_devices.append(utils.get_selected_from_config(channel))
+        selected_devices += utils.get_selected_from_config(
+            channel,
+            device_cache,
+            refresh_devices,
+            list(devices),
+            require_password=False
+        )
+    device_cache.finish()
 
     if len(selected_devices) > 0:
-        for selected in selected_devices:
-            selected.send_remote_command(button)
+        handles: list = [DeviceHandle.from_roku(selected) for selected in selected_devices]
+        results: list = utils.send_keys_to_devices(handles, keys, delay)
+        if any(error is not None for _, error in results):
+            sys.exit(1)
+
+
+@cli.command()
+@click.option(
+    '-c',
+    '--channel',
+    'channel_path',
+    help='Path to channel project\'s root dir',
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, writable=False, readable=True),
+    required=True
+)
+@click.option('--top', 'top', help='Number of files and dirs listed', type=int, default=15)
+@click.option('--output', 'output', help='Write the full report as JSON', type=click.Path(dir_okay=False))
+def analyze(channel_path: str, top: int, output: Union[None, str]):
+    """
+    Analyze Command, reports what takes the space in a channel's archive
+    :param channel_path: Path to channel project's root dir
+    :param top: number of files and dirs listed
+    :param output: path to write the full report to as JSON
+    """
+    import json
+    from pyku.analyze import ArchiveAnalysis, analyze_channel, format_size
+    from pyku.channel import Channel
+
+    channel: Channel = Channel(channel_path)
+    if not channel.has_config:
+        raise click.ClickException('cannot analyze a channel without pyku_config.yml, run deploy first')
+
+    analysis: ArchiveAnalysis = analyze_channel(channel)
+    if analysis.image_profile is not None:
+        click.echo(f'images as transcoded for ImageProfile {analysis.image_profile}')
+    click.echo(f'{len(analysis.files)} files | {format_size(analysis.raw_size())} raw | '
+               f'{format_size(analysis.compressed_size())} compressed | '
+               f'archive ~{format_size(analysis.archive_size())}')
+
+    click.echo('largest files')
+    for report in sorted(analysis.files, key=lambda file_report: -file_report.compressed)[:top]:
+        click.echo(f'{format_size(report.compressed):>9} {format_size(report.size):>9} raw | {report.relative}')
+
+    click.echo('dirs')
+    for directory, count, raw, compressed in analysis.by_directory()[:top]:
+        click.echo(f'{format_size(compressed):>9} {format_size(raw):>9} raw | {count} files | {directory}')
+
+    duplicates: list = analysis.duplicates()
+    click.echo(f'duplicates | {len(duplicates)} groups | {format_size(analysis.duplicate_bytes())} to save')
+    for group in duplicates[:top]:
+        click.echo(f'{format_size(group[0].compressed):>9} x{len(group)} | '
+                   f'{", ".join(report.relative for report in group)}')
+
+    unreferenced_size: int = sum(report.compressed for report in analysis.unreferenced)
+    click.echo(f'unreferenced | {len(analysis.unreferenced)} files | {format_size(unreferenced_size)} | '
+               f'no code mentions their path or file name')
+    for report in analysis.unreferenced[:top]:
+        click.echo(f'{format_size(report.compressed):>9} | {report.relative}')
+
+    if output:
+        with Path(output).open('w') as report_file:
+            json.dump(analysis.to_dict(), report_file, indent=2)
+        click.echo(f'wrote {output}')
+
+    size_budget: int = channel.channel_config.size_budget
+    if size_budget > 0:
+        click.echo(f'budget | ~{format_size(analysis.archive_size())} of {format_size(size_budget)}')
+        if analysis.archive_size() > size_budget:
+            raise click.ClickException(f'archive is ~{analysis.archive_size() - size_budget} bytes over the '
+                                       f'SizeBudget of {size_budget}')
+
+
+@cli.command()
+@click.option('--socket', 'socket_path', help='Unix socket path', type=click.Path(dir_okay=False), default=None)
+@click.option('--status', 'status', help='Show what a running daemon holds', flag_value=True)
+@click.option('--stop', 'stop', help='Stop a running daemon', flag_value=True)
+def serve(socket_path: Union[None, str], status: bool, stop: bool):
+    """
+    Serve Command, keeps channels, devices and their sessions warm between deploy and keypress runs
+    :param socket_path: Unix socket path
+    :param status: flag to show what a running daemon holds
+    :param stop: flag to stop a running daemon
+    """
+    from pyku.client import DaemonClient, default_socket_path
+
+    path: Path = Path(socket_path) if socket_path else default_socket_path()
+    if status or stop:
+        client: DaemonClient = DaemonClient(path)
+        daemon_status: Union[None, dict] = client.status()
+        if daemon_status is None:
+            click.echo(f'pyku serve is not running on {str(path)}')
+            sys.exit(1)
+        if stop:
+            client.stop()
+            click.echo(f'stopped pyku serve, pid {daemon_status["pid"]}')
+            return
+        click.echo(f'pid {daemon_status["pid"]} | {daemon_status["requests"]} request(s)')
+        for channel_root in daemon_status['channels']:
+            click.echo(f'channel {channel_root}')
+        for location in daemon_status['devices']:
+            click.echo(f'device {location}')
+        return
+
+    from pyku.daemon import serve as serve_daemon
+
+    serve_daemon(path)
 
 
 if __name__ == '__main__':
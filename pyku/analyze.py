@@ -0,0 +1,226 @@
+# coding=utf-8
+"""
+Usage:
+    python3 -m pyku analyze -c {{path_to_channel}}
+
+    Reports what makes up a channel's archive: raw and compressed size per file and per dir, files with identical
+    content stored under different paths, and assets no code mentions by name. Compressed sizes come from the same
+    ArchiveEngine and levels the build uses, no archive is written. With an ImageProfile active, images are measured
+    as transcoded for it, as the build would ship them.
+
+ToDos:
+"""
+# standard lib imports
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Tuple, Union
+# project imports
+from pyku.archive import ArchiveEngine, ArchiveEntry
+from pyku.channel import Channel
+from pyku.fileset import ChannelFile
+from pyku.staging import file_digest
+
+# extensions of files the device compiles or reads as text, the files that reference assets
+CODE_EXTENSIONS: list = ['.brs', '.bs', '.xml', '.json']
+# zip local header and central directory record sizes, without the entry name
+ZIP_ENTRY_OVERHEAD: int = 30 + 46
+ZIP_END_RECORD: int = 22
+
+
+class FileReport(NamedTuple):
+    """
+    Sizes and content hash of one channel file
+
+    *Attributes:
+        relative (str): Posix path relative to the channel root
+        size (int): Raw size in bytes
+        compressed (int): Size in the archive, deflated or stored
+        digest (str): Content hash
+    """
+    relative: str
+    size: int
+    compressed: int
+    digest: str
+
+
+def format_size(size: float) -> str:
+    """
+    Formats a byte count for output, e.g. 1.2MB
+    """
+    for unit in ['B', 'KB', 'MB']:
+        if abs(size) < 1024:
+            return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+        size /= 1024
+
+    return f'{size:.1f}GB'
+
+
+def is_code_file(relative: str) -> bool:
+    """
+    Checks if a file is code or the manifest, which the device loads without being referenced
+    """
+    return relative == 'manifest' or os.path.splitext(relative)[1].lower() in CODE_EXTENSIONS
+
+
+class ArchiveAnalysis:
+    """
+    Per file sizes of a channel's archive and what can be read from them
+
+    *Attributes:
+        files (List[FileReport]): Files in the archive, sorted by path
+        unreferenced (List[FileReport]): Assets whose path or file name no code file mentions
+        image_profile (str, None): ImageProfile the images were measured transcoded for, None when left as designed
+
+    *methods
+        raw_size() -> int:
+
+        compressed_size() -> int:
+
+        archive_size() -> int:
+
+        by_directory() -> List[Tuple[str, int, int, int]]:
+
+        duplicates() -> List[List[FileReport]]:
+
+        duplicate_bytes() -> int:
+
+        to_dict() -> dict:
+    """
+    def __init__(self, files: List[FileReport], unreferenced: List[FileReport], image_profile: Union[None, str] = None):
+        self.files: List[FileReport] = files
+        self.unreferenced: List[FileReport] = unreferenced
+        self.image_profile: Union[None, str] = image_profile
+
+    def raw_size(self) -> int:
+        """
+        Total size of the files before compression
+        """
+        return sum(report.size for report in self.files)
+
+    def compressed_size(self) -> int:
+        """
+        Total size of the entries' data in the archive, without zip headers
+        """
+        return sum(report.compressed for report in self.files)
+
+    def archive_size(self) -> int:
+        """
+        Estimated archive size, compressed entries plus their zip headers
+        """
+        headers: int = sum(ZIP_ENTRY_OVERHEAD + 2 * len(report.relative.encode()) for report in self.files)
+
+        return self.compressed_size() + headers + ZIP_END_RECORD
+
+    def by_directory(self) -> List[Tuple[str, int, int, int]]:
+        """
+        Totals per dir, files count toward their dir and every dir above it
+        :return: (dir, files, raw, compressed) sorted by compressed size, largest first
+        """
+        totals: Dict[str, list] = defaultdict(lambda: [0, 0, 0])
+        for report in self.files:
+            parts: List[str] = report.relative.split('/')[:-1]
+            for depth in range(len(parts) + 1):
+                total: list = totals['/'.join(parts[:depth]) or '.']
+                total[0] += 1
+                total[1] += report.size
+                total[2] += report.compressed
+
+        return sorted(
+            [(directory, total[0], total[1], total[2]) for directory, total in totals.items()],
+            key=lambda directory_total: (-directory_total[3], directory_total[0])
+        )
+
+    def duplicates(self) -> List[List[FileReport]]:
+        """
+        Groups of files with identical content
+        :return: groups sorted by the bytes they waste, largest first
+        """
+        groups: Dict[str, List[FileReport]] = defaultdict(list)
+        for report in self.files:
+            groups[report.digest].append(report)
+
+        return sorted(
+            [group for group in groups.values() if len(group) > 1],
+            key=lambda group: (-group[0].compressed * (len(group) - 1), group[0].relative)
+        )
+
+    def duplicate_bytes(self) -> int:
+        """
+        Compressed bytes the archive would lose keeping one copy of each duplicate
+        """
+        return sum(group[0].compressed * (len(group) - 1) for group in self.duplicates())
+
+    def to_dict(self) -> dict:
+        """
+        The full report as JSON serializable data, for --output
+        """
+        return {
+            'image_profile': self.image_profile,
+            'files': [report._asdict() for report in self.files],
+            'raw_size': self.raw_size(),
+            'compressed_size': self.compressed_size(),
+            'archive_size': self.archive_size(),
+            'directories': [
+                {'dir': directory, 'files': count, 'size': raw, 'compressed': compressed}
+                for directory, count, raw, compressed in self.by_directory()
+            ],
+            'duplicates': [[report.relative for report in group] for group in self.duplicates()],
+            'duplicate_bytes': self.duplicate_bytes(),
+            'unreferenced': [report.relative for report in self.unreferenced]
+        }
+
+
+def analyze_file(engine: ArchiveEngine, channel_file: ChannelFile) -> FileReport:
+    """
+    Compresses a file the way the build would and hashes it
+    :param engine: ArchiveEngine with the channel's compression levels
+    :param channel_file: ChannelFile - file to analyze
+    :return:
+    """
+    entry: ArchiveEntry = engine.prepare_entry(channel_file)
+    compressed: int = entry.info.compress_size if entry.payload is not None else channel_file.size
+
+    return FileReport(channel_file.relative, channel_file.size, compressed, file_digest(channel_file.path))
+
+
+def find_unreferenced(channel_files: List[ChannelFile], reports: List[FileReport]) -> List[FileReport]:
+    """
+    Finds assets whose path or file name appears in no code file. Paths built at runtime aren't seen, so these are
+    candidates to check rather than files that are certainly unused.
+    :param channel_files: resolved channel files
+    :param reports: FileReport per channel file
+    :return: unreferenced assets, sorted by compressed size, largest first
+    """
+    code: List[str] = []
+    for channel_file in channel_files:
+        if is_code_file(channel_file.relative):
+            with channel_file.path.open('r', encoding='utf-8', errors='ignore') as code_file:
+                code.append(code_file.read().lower())
+    code_text: str = '\n'.join(code)
+
+    unreferenced: List[FileReport] = [
+        report for report in reports
+        if not is_code_file(report.relative) and
+        report.relative.lower() not in code_text and
+        report.relative.rsplit('/', 1)[-1].lower() not in code_text
+    ]
+
+    return sorted(unreferenced, key=lambda report: (-report.compressed, report.relative))
+
+
+def analyze_channel(channel: Channel) -> ArchiveAnalysis:
+    """
+    Analyzes the files the channel's archive is built from, resolved the way staging resolves them and with images
+    transcoded for the active ImageProfile
+    :param channel: Channel with a config
+    :return:
+    """
+    channel_files: List[ChannelFile] = channel.transcode_images(channel.collect_channel_files())
+    engine: ArchiveEngine = channel.create_archive_engine()
+
+    with ThreadPoolExecutor(max_workers=engine.workers) as executor:
+        reports: List[FileReport] = list(executor.map(lambda channel_file: analyze_file(engine, channel_file),
+                                                      channel_files))
+
+    return ArchiveAnalysis(reports, find_unreferenced(channel_files, reports), channel.active_image_profile())
@@ -0,0 +1,200 @@
+# coding=utf-8
+"""
+Usage:
+    Writes channel archives from a list of channel files, deflating entries on a thread pool
+
+ToDos:
+"""
+# standard lib imports
+import os
+import shutil
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Deque, Dict, List, Union
+from zipfile import ZIP64_LIMIT, ZIP_DEFLATED, ZIP_STORED, ZipFile, ZipInfo
+# project imports
+from pyku.constants import DEFAULT_COMPRESSION_LEVEL, STORED_EXTENSIONS
+from pyku.fileset import ChannelFile
+
+COPY_BUFFER_SIZE: int = 1024 * 1024
+# fixed entry metadata so identical sources always produce identical archives
+ZIP_EPOCH: tuple = (1980, 1, 1, 0, 0, 0)
+ZIP_FILE_MODE: int = 0o100644
+ZIP_CREATE_SYSTEM_UNIX: int = 3
+# ZipFile internals write_entry drives to append already compressed entries
+ZIPFILE_INTERNALS: List[str] = ['fp', 'filelist', 'NameToInfo', 'start_dir', '_didModify', '_writecheck']
+
+
+class ArchiveEntry:
+    """
+    A channel file ready to be written to an archive
+
+    *Attributes:
+        source (Path): File on disk
+        info (ZipInfo): Zip header info, sizes and crc are set when payload is not None
+        payload (bytes, None): Deflated or raw bytes, None when the file is streamed from disk as stored
+    """
+    def __init__(self, source: Path, info: ZipInfo, payload: Union[None, bytes] = None):
+        self.source: Path = source
+        self.info: ZipInfo = info
+        self.payload: Union[None, bytes] = payload
+
+
+class ArchiveEngine:
+    """
+    Builds zip archives compressing entries concurrently with a per extension deflate level
+
+    *Attributes:
+        levels (dict): Lower case extension -> deflate level 0-9, 0 stores the entry
+        default_level (int): Deflate level for extensions not in levels
+        workers (int): Size of the compression thread pool
+        entry_cache (dict, None): relative -> (size, mtime, level) and the deflated entry, reused across builds
+
+    *methods
+        compression_level(relative: str) -> int:
+
+        prepare_entry(channel_file: ChannelFile) -> ArchiveEntry:
+
+        write_archive(channel_files: List[ChannelFile], target: Union[Path, BinaryIO]) -> None:
+    """
+    def __init__(
+        self,
+        levels: Union[None, Dict[str, int]] = None,
+        workers: int = 0,
+        entry_cache: Union[None, dict] = None
+    ):
+        self.levels: Dict[str, int] = {extension: 0 for extension in STORED_EXTENSIONS}
+        self.default_level: int = DEFAULT_COMPRESSION_LEVEL
+
+        for extension, level in (levels or {}).items():
+            if extension.lower() == 'default':
+                self.default_level = int(level)
+            else:
+                extension = extension.lower() if extension.startswith('.') else f'.{extension.lower()}'
+                self.levels[extension] = int(level)
+
+        self.workers: int = workers if workers > 0 else (os.cpu_count() or 1)
+        self.entry_cache: Union[None, dict] = entry_cache
+
+    def compression_level(self, relative: str) -> int:
+        """
+        Returns the deflate level to use for a file
+        :param relative: posix path relative to the channel root
+        :return: 0-9, 0 meaning the entry is stored
+        """
+        return self.levels.get(os.path.splitext(relative)[1].lower(), self.default_level)
+
+    def prepare_entry(self, channel_file: ChannelFile) -> ArchiveEntry:
+        """
+        Reads and deflates a file, entries that don't shrink are kept raw and stored
+        :param channel_file: ChannelFile - file to add
+        :return:
+        """
+        source: Path = channel_file.path
+        info: ZipInfo = ZipInfo(channel_file.relative, date_time=ZIP_EPOCH)
+        info.create_system = ZIP_CREATE_SYSTEM_UNIX
+        info.external_attr = ZIP_FILE_MODE << 16
+        info.file_size = channel_file.size
+        level: int = self.compression_level(channel_file.relative)
+
+        if level == 0:
+            info.compress_type = ZIP_STORED
+            return ArchiveEntry(source, info)
+
+        signature: tuple = (channel_file.size, channel_file.mtime, level)
+        cached: Union[None, tuple] = self.entry_cache.get(channel_file.relative, None) \
+            if self.entry_cache is not None else None
+        if cached is not None and cached[0] == signature:
+            info.compress_type, info.CRC, info.compress_size, payload = cached[1:]
+            return ArchiveEntry(source, info, payload)
+
+        with source.open('rb') as file:
+            data: bytes = file.read()
+
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        payload: bytes = compressor.compress(data) + compressor.flush()
+        info.file_size = len(data)
+        info.CRC = zlib.crc32(data)
+
+        if len(payload) < len(data):
+            info.compress_type = ZIP_DEFLATED
+        else:
+            info.compress_type = ZIP_STORED
+            payload = data
+        info.compress_size = len(payload)
+
+        if self.entry_cache is not None:
+            # one entry per path, a changed file replaces its old payload
+            self.entry_cache[channel_file.relative] = (signature, info.compress_type, info.CRC, info.compress_size,
+                                                       payload)
+
+        return ArchiveEntry(source, info, payload)
+
+    def write_archive(self, channel_files: List[ChannelFile], target: Union[Path, BinaryIO]) -> None:
+        """
+        Zips channel files, each under its path relative to the channel root, sorted by that path
+        with fixed timestamps and permissions so builds are reproducible
+        :param channel_files: resolved channel files
+        :param target: Path of the zip to write or a writable binary file object
+        """
+        if isinstance(target, Path):
+            temp_target: Path = target.with_name(f'{target.name}.tmp')
+            with temp_target.open('wb') as archive_file:
+                self.write_archive(channel_files, archive_file)
+            os.replace(str(temp_target), str(target))
+            return
+
+        # keep a bounded window of entries in flight so memory doesn't grow with the channel size
+        window: int = self.workers * 4
+        pending: Deque[Future] = deque()
+
+        with ZipFile(target, 'w') as archive, ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for channel_file in sorted(channel_files, key=lambda channel_file: channel_file.relative):
+                pending.append(executor.submit(self.prepare_entry, channel_file))
+                if len(pending) >= window:
+                    write_entry(archive, pending.popleft().result())
+
+            while pending:
+                write_entry(archive, pending.popleft().result())
+
+        if self.entry_cache is not None:
+            # drop entries for files that left the file set, changed files were replaced as they were compressed
+            current: set = {channel_file.relative for channel_file in channel_files}
+            for relative in [relative for relative in self.entry_cache if relative not in current]:
+                del self.entry_cache[relative]
+
+
+def write_entry(archive: ZipFile, entry: ArchiveEntry) -> None:
+    """
+    Appends an entry to an open archive
+    :param archive: ZipFile opened for writing
+    :param entry: ArchiveEntry - prepared entry
+    """
+    if entry.payload is None:
+        force_zip64: bool = entry.info.file_size > ZIP64_LIMIT
+        with entry.source.open('rb') as source, archive.open(entry.info, 'w', force_zip64=force_zip64) as dest:
+            shutil.copyfileobj(source, dest, COPY_BUFFER_SIZE)
+        return
+
+    info: ZipInfo = entry.info
+    if not all(hasattr(archive, name) for name in ZIPFILE_INTERNALS):
+        # a zipfile without the internals below, the payload is written through the public api instead,
+        # compressed again by ZipFile
+        data: bytes = zlib.decompress(entry.payload, -zlib.MAX_WBITS) if info.compress_type == ZIP_DEFLATED \
+            else entry.payload
+        archive.writestr(info, data)
+        return
+
+    # ZipFile has no public api for already compressed data, so the local header and payload are
+    # written the same way ZipFile.writestr does and the entry is registered for the central directory
+    zip64: bool = info.file_size > ZIP64_LIMIT or info.compress_size > ZIP64_LIMIT
+    info.header_offset = archive.fp.tell()
+    archive._writecheck(info)
+    archive._didModify = True
+    archive.fp.write(info.FileHeader(zip64))
+    archive.fp.write(entry.payload)
+    archive.filelist.append(info)
+    archive.NameToInfo[info.filename] = info
+    archive.start_dir = archive.fp.tell()
@@ -0,0 +1,128 @@
+# coding=utf-8
+"""
+Usage:
+    Content addressed cache of built channel archives kept in the channel's out dir
+
+ToDos:
+"""
+# standard lib imports
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import List, Union
+# project imports
+from pyku.constants import ARCHIVE_CACHE_SIZE
+from pyku.fileset import ChannelFile
+from pyku.staging import FileIndex
+
+# bump when the archive layout changes so stale archives aren't reused
+ARCHIVE_FORMAT_VERSION: int = 1
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """
+    Atomically puts a hardlink of source at target, copying when hardlinks aren't possible
+    :param source: Path - existing file
+    :param target: Path - destination, replaced if it exists
+    """
+    temp_target: Path = target.with_name(f'{target.name}.tmp')
+    if temp_target.exists():
+        temp_target.unlink()
+
+    try:
+        os.link(str(source), str(temp_target))
+    except OSError:
+        shutil.copyfile(str(source), str(temp_target))
+
+    os.replace(str(temp_target), str(target))
+
+
+class ArchiveCache:
+    """
+    Archives keyed by a hash of everything that goes into them
+
+    *Attributes:
+        archives_dir (Path): Dir holding cached archives named {key}.zip
+        source_index (FileIndex): Index of source file hashes, re-hashing only files whose stat changed
+        max_entries (int): Number of archives kept before the oldest are pruned
+
+    *methods
+        inputs_key(channel_files: List[ChannelFile], settings: dict) -> str:
+
+        lookup(key: str) -> Union[None, Path]:
+
+        restore(key: str, target: Path) -> bool:
+
+        store(key: str, archive: Path) -> None:
+
+        prune() -> None:
+    """
+    def __init__(self, cache_dir: Path, max_entries: int = ARCHIVE_CACHE_SIZE):
+        self.archives_dir: Path = cache_dir / 'archives'
+        self.source_index: FileIndex = FileIndex(cache_dir / 'source_index.json')
+        self.max_entries: int = max_entries
+
+    def inputs_key(self, channel_files: List[ChannelFile], settings: dict) -> str:
+        """
+        Hashes the resolved channel files and archive settings
+        :param channel_files: resolved channel files
+        :param settings: json serializable archive settings, e.g. archive name and compression levels
+        :return: hex digest identifying the archive these inputs produce
+        """
+        key = hashlib.blake2b(digest_size=20)
+        key.update(json.dumps({'version': ARCHIVE_FORMAT_VERSION, **settings}, sort_keys=True).encode())
+
+        for channel_file in sorted(channel_files, key=lambda channel_file: channel_file.relative):
+            digest: str = self.source_index.digest(channel_file)
+            key.update(f'{channel_file.relative}\0{digest}\n'.encode())
+
+        self.source_index.save()
+
+        return key.hexdigest()
+
+    def lookup(self, key: str) -> Union[None, Path]:
+        """
+        Returns the cached archive for a key if there is one
+        """
+        archive: Path = self.archives_dir / f'{key}.zip'
+
+        return archive if archive.exists() else None
+
+    def restore(self, key: str, target: Path) -> bool:
+        """
+        Puts the cached archive for a key at target
+        :return: False on a cache miss
+        """
+        cached: Union[None, Path] = self.lookup(key)
+        if cached is None:
+            return False
+
+        if not (target.exists() and os.path.samefile(str(cached), str(target))):
+            link_or_copy(cached, target)
+        os.utime(str(cached))
+
+        return True
+
+    def store(self, key: str, archive: Path) -> None:
+        """
+        Adds a freshly built archive to the cache
+        """
+        if not self.archives_dir.exists():
+            self.archives_dir.mkdir(parents=True)
+
+        link_or_copy(archive, self.archives_dir / f'{key}.zip')
+        self.prune()
+
+    def prune(self) -> None:
+        """
+        Removes the least recently used archives beyond max_entries
+        """
+        archives: List[Path] = sorted(
+            self.archives_dir.glob('*.zip'),
+            key=lambda archive: archive.stat().st_mtime,
+            reverse=True
+        )
+        for archive in archives[self.max_entries:]:
+            archive.unlink()
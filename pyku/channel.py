@@ -1,18 +1,21 @@
 # coding=utf-8
 # standard lib imports
-import glob
 import os
 import shutil
-from datetime import datetime
-from distutils.dir_util import copy_tree
 from pathlib import Path
-from typing import Union
-from zipfile import ZIP_DEFLATED, ZipFile
+from typing import List, Union
 # third party lib imports
 import click
 import yaml
 # project imports
-from pyku.constants import STANDARD_CONFIG, PKKU_CONFIG
+from pyku.archive import ArchiveEngine
+from pyku.cache import ArchiveCache
+from pyku.constants import IMAGE_PROFILES, STANDARD_CONFIG, PKKU_CONFIG, PYKU_CACHE_DIR, STAGING_INDEX
+from pyku.fileset import ChannelFile, FileSetResolver
+from pyku.images import ImageTranscoder, design_height
+from pyku.profiling import profiled, span
+from pyku.staging import FileIndex, file_digest, list_dir_files, place_file, sync_staging_dir
+from pyku.streaming import ArchiveBroadcast, BroadcastLimitExceeded
 
 
 class ChannelConfig:
@@ -22,23 +25,51 @@ class ChannelConfig:
     *Attributes:
         file (Path): Path object to the config file in the channel project
         files (list): List of file glob paths to be zipped unpon deployment
+        exclude (list): List of file glob paths left out even when matched by files
         retain_staging_dir (bool): Bool for retaining the zip after deployment
+        incremental_staging (bool): Only restage changed files, implies retaining the staging dir
+        staging_link_mode (str): How changed files are staged, copy | hardlink | reflink
+        direct_build (bool): Zip straight from the channel root, only staging when retain_staging_dir is set
+        compression_levels (dict): Extension -> deflate level, 0 stores, 'default' for everything else
+        archive_workers (int): Threads compressing archive entries, 0 uses the cpu count
+        cache_archives (bool): Reuse a previously built archive when none of its inputs changed
+        stream_upload (bool): Upload the archive to devices while it's being written
+        size_budget (int): Max archive size in bytes, builds over it fail, 0 for no limit
+        image_profile (str): Resolution images are transcoded for, fhd | hd | sd, auto picks it per device, none
+        image_quality (int): JPEG quality of transcoded images
         root (Path): Root path to channel
         out_dir (Path): Path object to the out dir
+        cache_dir (Path): Path object to pyku's cache dir inside the out dir
         rokus (list): List of roku configs
     """
+    @profiled('config load')
     def __init__(self, config_file: Path):
         with config_file.open('r') as config:
             data: dict = yaml.full_load(config)
 
         self.file: Path = config_file
         self.files: list = data.get('Files', [])
+        self.exclude: list = data.get('Exclude', [])
         self.retain_staging_dir: bool = data.get('RetainStagingDir', False)
+        self.incremental_staging: bool = data.get('IncrementalStaging', False)
+        self.staging_link_mode: str = data.get('StagingLinkMode', 'copy')
+        self.direct_build: bool = data.get('DirectBuild', False)
+        self.compression_levels: dict = data.get('CompressionLevels', {})
+        self.archive_workers: int = data.get('ArchiveWorkers', 0)
+        self.cache_archives: bool = data.get('CacheArchives', True)
+        self.stream_upload: bool = data.get('StreamUpload', False)
+        self.size_budget: int = int(data.get('SizeBudget', 0) or 0)
+        self.image_profile: str = str(data.get('ImageProfile', 'none')).lower()
+        self.image_quality: int = data.get('ImageQuality', 85)
+        if self.image_profile == 'auto':
+            # an archive is built per device resolution once devices are known, there's no single one to stream
+            self.stream_upload = False
         self.root: Path = Path(data.get('Root', ''))
         self.out_dir: Path = Path(data.get('OutDir', ''))
         self.rokus: list = data.get('Rokus', [])
         if not self.out_dir.is_absolute():
             self.out_dir = self.root / self.out_dir
+        self.cache_dir: Path = self.out_dir / PYKU_CACHE_DIR
 
 
 class Channel:
@@ -49,6 +80,10 @@ class Channel:
         channel_config (ChannelConfig, None): Channel config read in
         staging_dir (Path, None): Staging dir to be used
         channel_archive (Path, None): Channel archive
+        archive_key (str, None): Hash of the inputs the channel archive was built from
+        archive_from_cache (bool): If the last build reused a cached archive
+        entry_cache (dict, None): Compressed archive entries kept in memory between builds, e.g. by watch
+        image_profile (str, None): Image profile of the next build, overrides the config's, e.g. per device
         manifest_data (dict, None): Parsed manifest data
         channel_path (Path):
         config_file (Path):
@@ -57,18 +92,49 @@ class Channel:
     *methods
         create_config() -> None:
 
+        reload_config() -> None:
+
         parse_manifest() -> None:
 
-        stage_channel_for_compilation() -> None:
+        collect_channel_files() -> List[ChannelFile]:
+
+        create_archive_engine() -> ArchiveEngine:
+
+        active_image_profile() -> Union[None, str]:
+
+        archive_file_name() -> str:
+
+        transcode_images(channel_files: List[ChannelFile]) -> List[ChannelFile]:
+
+        stage_channel_for_compilation(channel_files: List[ChannelFile]) -> None:
 
         archive_staged_content_to_out() -> None:
 
+        build_archive_from_source(channel_files: List[ChannelFile]) -> None:
+
+        restore_cached_archive(channel_files: List[ChannelFile]) -> Union[None, ArchiveCache]:
+
+        build_channel_archive() -> None:
+
+        stream_channel_archive(broadcast: ArchiveBroadcast, channel_files: List[ChannelFile], cache) -> None:
+
+        archive_digest() -> str:
+
+        check_size_budget() -> None:
+
+        size_budget_error(size_text: str, size_budget: int) -> click.ClickException:
+
         empty_dir(dir_to_empty: Path) -> None:
     """
     def __init__(self, channel_path: str):
         self.channel_config: Union[None, ChannelConfig] = None
         self.staging_dir: Union[None, Path] = None
         self.channel_archive: Union[None, Path] = None
+        self.archive_key: Union[None, str] = None
+        self.archive_from_cache: bool = False
+        self._archive_digest: Union[None, tuple] = None
+        self.entry_cache: Union[None, dict] = None
+        self.image_profile: Union[None, str] = None
         self.manifest_data: Union[None, dict] = None
         self.channel_path: Path = Path(channel_path)
         self.config_file: Path = self.channel_path / PKKU_CONFIG
@@ -90,7 +156,7 @@ class Channel:
                        f'{self.manifest_data["minor_version"]}.' \
                        f'{self.manifest_data["build_version"]}'
 
-        return f'Channel_{datetime.now()}'
+        return f'Channel_{self.channel_path.resolve().name}'
 
     def create_config(self) -> None:
         """
@@ -106,6 +172,16 @@ class Channel:
             self.channel_config = ChannelConfig(self.config_file)
             self.parse_manifest()
 
+    def reload_config(self) -> None:
+        """
+        Re-reads the channel config and manifest
+        """
+        if self.config_file.exists():
+            self.has_config = True
+            self.channel_config = ChannelConfig(self.config_file)
+            self.parse_manifest()
+
+    @profiled('manifest parse')
     def parse_manifest(self) -> None:
         """
         Parses channel manifest for data
@@ -122,56 +198,314 @@ class Channel:
                             manifest_data = {**manifest_data, **{key: value}}
             self.manifest_data = manifest_data
 
-    def stage_channel_for_compilation(self) -> None:
+    @profiled('resolve files')
+    def collect_channel_files(self) -> List[ChannelFile]:
+        """
+        Resolves the config's file globs into the files to be staged with a single walk of the root,
+        leaving out the staging and out dirs
+        :return: files sorted by relative path
+        """
+        if self.channel_config is None:
+            return []
+
+        excludes: list = list(self.channel_config.exclude) + ['staging']
+        try:
+            excludes.append(self.channel_config.out_dir.relative_to(self.channel_config.root).as_posix())
+        except ValueError:
+            pass
+
+        return FileSetResolver(self.channel_config.root, self.channel_config.files, excludes).resolve()
+
+    def create_archive_engine(self) -> ArchiveEngine:
+        """
+        Creates the archive engine configured for this channel
+        """
+        if self.channel_config is not None:
+            return ArchiveEngine(
+                self.channel_config.compression_levels,
+                self.channel_config.archive_workers,
+                self.entry_cache
+            )
+
+        return ArchiveEngine(entry_cache=self.entry_cache)
+
+    def active_image_profile(self) -> Union[None, str]:
+        """
+        Returns the image profile the next build transcodes for
+        :return: profile name, None when images are left as designed
+        """
+        profile: Union[None, str] = self.image_profile
+        if profile is None and self.channel_config is not None:
+            profile = self.channel_config.image_profile
+        if profile not in IMAGE_PROFILES or IMAGE_PROFILES[profile] >= design_height(self.manifest_data):
+            return None
+
+        return profile
+
+    def archive_file_name(self) -> str:
+        """
+        Returns the archive's file name, suffixed with the image profile when images are transcoded
+        """
+        profile: Union[None, str] = self.active_image_profile()
+
+        return f'{self.__str__()}_{profile}.zip' if profile is not None else f'{self.__str__()}.zip'
+
+    @profiled('images')
+    def transcode_images(self, channel_files: List[ChannelFile]) -> List[ChannelFile]:
+        """
+        Swaps images for copies transcoded for the active image profile
+        :param channel_files: resolved channel files
+        :return: channel files, unchanged when no profile is active
+        """
+        profile: Union[None, str] = self.active_image_profile()
+        if profile is None or self.channel_config is None:
+            return channel_files
+
+        return ImageTranscoder(
+            self.channel_config.cache_dir,
+            profile,
+            design_height(self.manifest_data),
+            self.channel_config.image_quality,
+            self.channel_config.archive_workers
+        ).transcode(channel_files)
+
+    @profiled('staging')
+    def stage_channel_for_compilation(self, channel_files: Union[None, List[ChannelFile]] = None) -> None:
         """
         Stages channel content in staging dir
+        :param channel_files: already resolved channel files, resolved from the config when None
         """
         if self.channel_config is not None:
             self.staging_dir = self.channel_config.root / 'staging'
             if not self.staging_dir.exists():
                 self.staging_dir.mkdir()
 
+            if channel_files is None:
+                channel_files = self.collect_channel_files()
+
+            if self.channel_config.incremental_staging:
+                index: FileIndex = FileIndex(self.channel_config.cache_dir / STAGING_INDEX)
+                try:
+                    results: dict = sync_staging_dir(
+                        channel_files,
+                        self.staging_dir,
+                        index,
+                        self.channel_config.staging_link_mode
+                    )
+                    click.echo(f'staged {results["copied"]} changed, {results["unchanged"]} unchanged, '
+                               f'removed {results["removed"]}')
+                finally:
+                    index.save()
+                return
+
             Channel.empty_dir(self.staging_dir)
 
-            for glob_path in self.channel_config.files:
-                full_glob_path: Path = self.channel_config.root / glob_path
-                for path in glob.glob(str(full_glob_path)):
-                    from_path: Path = Path(path)
-                    relative_from: Path = from_path.relative_to(self.channel_config.root)
-                    to_path: Path = self.staging_dir / relative_from
-
-                    if from_path.is_file():
-                        if not to_path.parent.exists():
-                            to_path.parent.mkdir(parents=True)
-                        try:
-                            shutil.copyfile(str(from_path), str(to_path))
-                        except FileNotFoundError:
-                            click.echo(f'failed to copy {str(from_path)} into staging')
-                    elif from_path.is_dir():
-                        copy_tree(str(from_path), str(to_path))
+            for channel_file in channel_files:
+                try:
+                    place_file(
+                        channel_file.path,
+                        self.staging_dir / channel_file.relative,
+                        self.channel_config.staging_link_mode
+                    )
+                except FileNotFoundError:
+                    click.echo(f'failed to copy {str(channel_file.path)} into staging')
 
+    @profiled('zip')
     def archive_staged_content_to_out(self) -> None:
         """
         Creates an archive out of the contents in the staging directory
         """
-        if self.channel_config is not None:
+        if self.channel_config is not None and self.staging_dir is not None:
             if not self.channel_config.out_dir.exists():
                 self.channel_config.out_dir.mkdir(parents=True)
 
-            channel_archive: Path = self.channel_config.out_dir / f'{self.__str__()}'
-            os.chdir(str(self.staging_dir))
-            shutil.make_archive(
-                base_name=str(channel_archive),
-                format='zip',
-                base_dir='.'
-            )
-
-            self.channel_archive = self.channel_config.out_dir / f'{self.__str__()}.zip'
+            staged_files: List[ChannelFile] = [
+                ChannelFile.from_path(self.staging_dir / relative, relative)
+                for relative in sorted(list_dir_files(self.staging_dir))
+            ]
+            self.channel_archive = self.channel_config.out_dir / self.archive_file_name()
+            self.create_archive_engine().write_archive(staged_files, self.channel_archive)
 
-            if self.staging_dir is not None and not self.channel_config.retain_staging_dir:
+            retain_staging_dir: bool = self.channel_config.retain_staging_dir or \
+                self.channel_config.incremental_staging
+            if not retain_staging_dir:
                 Channel.empty_dir(self.staging_dir)
                 self.staging_dir.rmdir()
 
+    @profiled('zip')
+    def build_archive_from_source(self, channel_files: Union[None, List[ChannelFile]] = None) -> None:
+        """
+        Creates an archive straight from the channel root without writing a staging directory
+        :param channel_files: already resolved channel files, resolved from the config when None
+        """
+        if self.channel_config is not None:
+            if channel_files is None:
+                channel_files = self.collect_channel_files()
+
+            if self.channel_config.retain_staging_dir:
+                self.stage_channel_for_compilation(channel_files)
+
+            if not self.channel_config.out_dir.exists():
+                self.channel_config.out_dir.mkdir(parents=True)
+
+            self.channel_archive = self.channel_config.out_dir / self.archive_file_name()
+            self.create_archive_engine().write_archive(channel_files, self.channel_archive)
+
+    def restore_cached_archive(self, channel_files: List[ChannelFile]) -> Union[None, ArchiveCache]:
+        """
+        Restores the cached archive into the out dir when the resolved inputs are unchanged, setting archive_key
+        and archive_from_cache
+        :param channel_files: resolved channel files
+        :return: the archive cache to store a new build in, None when caching is off or the archive was restored
+        """
+        self.archive_from_cache = False
+        self.archive_key = None
+        if self.channel_config is None or not self.channel_config.cache_archives:
+            return None
+
+        cache: ArchiveCache = ArchiveCache(self.channel_config.cache_dir)
+        engine: ArchiveEngine = self.create_archive_engine()
+        archive_path: Path = self.channel_config.out_dir / self.archive_file_name()
+        if not self.channel_config.out_dir.exists():
+            self.channel_config.out_dir.mkdir(parents=True)
+        with span('archive cache'):
+            self.archive_key = cache.inputs_key(channel_files, {
+                'name': self.__str__(),
+                'levels': engine.levels,
+                'default_level': engine.default_level,
+                'images': [self.active_image_profile(), self.channel_config.image_quality]
+            })
+            restored: bool = cache.restore(self.archive_key, archive_path)
+        if restored:
+            self.channel_archive = archive_path
+            self.archive_from_cache = True
+            return None
+
+        return cache
+
+    @profiled('build')
+    def build_channel_archive(self) -> None:
+        """
+        Builds the channel archive in the configured mode, reusing the cached archive when the
+        resolved inputs are unchanged
+        :exception click.ClickException when the archive is over the config's SizeBudget
+        """
+        if self.channel_config is not None:
+            channel_files: List[ChannelFile] = self.collect_channel_files()
+            cache: Union[None, ArchiveCache] = self.restore_cached_archive(channel_files)
+            if self.archive_from_cache:
+                self.check_size_budget()
+                return
+
+            channel_files = self.transcode_images(channel_files)
+            if self.channel_config.direct_build:
+                self.build_archive_from_source(channel_files=channel_files)
+            else:
+                self.stage_channel_for_compilation(channel_files)
+                self.archive_staged_content_to_out()
+
+            # an archive over budget isn't kept for later builds to reuse
+            self.check_size_budget()
+            if cache is not None and self.channel_archive is not None:
+                with span('archive cache'):
+                    cache.store(self.archive_key, self.channel_archive)
+
+    @profiled('build')
+    def stream_channel_archive(
+        self,
+        broadcast: ArchiveBroadcast,
+        channel_files: Union[None, List[ChannelFile]] = None,
+        cache: Union[None, ArchiveCache] = None
+    ) -> None:
+        """
+        Writes the archive into a broadcast, uploads read it as it's written, then keeps the broadcast's tee file
+        as the channel archive
+        :param broadcast: ArchiveBroadcast - its tee_path should be the archive's path in the out dir
+        :param channel_files: already resolved channel files, resolved from the config when None
+        :param cache: archive cache to store the finished archive in
+        :exception whatever writing the archive raised, after the broadcast's readers were ended with it
+        :exception click.ClickException when the archive grows over the config's SizeBudget, the write that would
+            cross it fails so uploads end before receiving a complete archive
+        """
+        if self.channel_config is not None:
+            if channel_files is None:
+                channel_files = self.collect_channel_files()
+            broadcast.limit = max(0, self.channel_config.size_budget)
+
+            try:
+                channel_files = self.transcode_images(channel_files)
+                if self.channel_config.direct_build:
+                    if self.channel_config.retain_staging_dir:
+                        self.stage_channel_for_compilation(channel_files)
+                else:
+                    self.stage_channel_for_compilation(channel_files)
+                    channel_files = [
+                        ChannelFile.from_path(self.staging_dir / relative, relative)
+                        for relative in sorted(list_dir_files(self.staging_dir))
+                    ]
+
+                with span('zip'):
+                    self.create_archive_engine().write_archive(channel_files, broadcast)
+            except BroadcastLimitExceeded as error:
+                broadcast.finish(error)
+                raise self.size_budget_error(f'{self.archive_file_name()} is over', broadcast.limit) from error
+            except BaseException as error:
+                broadcast.finish(error)
+                raise
+            broadcast.finish()
+
+            if not self.channel_config.direct_build:
+                retain_staging_dir: bool = self.channel_config.retain_staging_dir or \
+                    self.channel_config.incremental_staging
+                if not retain_staging_dir:
+                    Channel.empty_dir(self.staging_dir)
+                    self.staging_dir.rmdir()
+
+            self.channel_archive = broadcast.tee_path
+            if cache is not None and self.channel_archive is not None:
+                with span('archive cache'):
+                    cache.store(self.archive_key, self.channel_archive)
+
+    def archive_digest(self) -> str:
+        """
+        Hashes the archive's bytes, what the deploy planner records per device, hashed again only when the archive
+        file changed
+        :return:
+        """
+        stat: os.stat_result = self.channel_archive.stat()
+        signature: tuple = (str(self.channel_archive), stat.st_mtime_ns, stat.st_size)
+        if self._archive_digest is None or self._archive_digest[0] != signature:
+            self._archive_digest = (signature, file_digest(self.channel_archive))
+
+        return self._archive_digest[1]
+
+    def check_size_budget(self) -> None:
+        """
+        Fails the build when the archive is larger than the config's SizeBudget
+        :exception click.ClickException
+        """
+        if self.channel_config is None or self.channel_config.size_budget <= 0 or self.channel_archive is None:
+            return
+
+        size: int = self.channel_archive.stat().st_size
+        if size > self.channel_config.size_budget:
+            raise self.size_budget_error(
+                f'{self.channel_archive.name} is {size} bytes, {size - self.channel_config.size_budget} over',
+                self.channel_config.size_budget
+            )
+
+    def size_budget_error(self, size_text: str, size_budget: int) -> click.ClickException:
+        """
+        Error for an archive over its SizeBudget
+        :param size_text: how big the archive is, e.g. 'channel.zip is 5000 bytes, 1000 over'
+        :param size_budget: the budget
+        :return:
+        """
+        return click.ClickException(
+            f'{size_text} the SizeBudget of {size_budget}, run pyku analyze -c {str(self.channel_path)} '
+            f'to see what takes the space'
+        )
+
     @staticmethod
     def empty_dir(dir_to_empty: Path) -> None:
         """
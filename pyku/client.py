@@ -0,0 +1,154 @@
+# coding=utf-8
+"""
+Usage:
+    Thin client for the pyku serve daemon, only standard lib and click so commands handed to the daemon start fast
+
+    Requests and replies are JSON, one message per line. A request is {"command", "args", "cwd"}, the daemon
+    answers with any number of {"output": text} messages and ends with {"exit": code}.
+
+ToDos:
+"""
+# standard lib imports
+import json
+import os
+import socket
+from pathlib import Path
+from typing import BinaryIO, Union
+# third party lib imports
+import click
+# project imports
+from pyku.constants import DAEMON_CONNECT_TIMEOUT, DAEMON_SOCKET
+
+
+def default_socket_path() -> Path:
+    """
+    Returns the daemon socket path, under the user's runtime dir when there is one, else beside the device cache
+    """
+    runtime_dir: str = os.environ.get('XDG_RUNTIME_DIR', '')
+    if runtime_dir:
+        return Path(runtime_dir) / 'pyku' / DAEMON_SOCKET
+
+    cache_home: str = os.environ.get('XDG_CACHE_HOME', '') or str(Path.home() / '.cache')
+
+    return Path(cache_home) / 'pyku' / DAEMON_SOCKET
+
+
+def send_message(stream: BinaryIO, message: dict) -> None:
+    """
+    Writes a protocol message
+    :param stream: socket file
+    :param message: JSON serializable dict
+    """
+    stream.write(json.dumps(message).encode() + b'\n')
+    stream.flush()
+
+
+def read_message(stream: BinaryIO) -> Union[None, dict]:
+    """
+    Reads a protocol message
+    :param stream: socket file
+    :return: message, None once the other side closed the connection
+    """
+    line: bytes = stream.readline()
+    if not line:
+        return None
+
+    return json.loads(line)
+
+
+class DaemonClient:
+    """
+    Hands commands to a running daemon
+
+    *Attributes:
+        socket_path (Path): Daemon's Unix socket
+
+    *methods
+        connect() -> Union[None, socket.socket]:
+
+        request(command: str, args: dict) -> Union[None, int]:
+
+        status() -> Union[None, dict]:
+
+        stop() -> bool:
+    """
+    def __init__(self, socket_path: Union[None, Path] = None):
+        self.socket_path: Path = socket_path or default_socket_path()
+
+    def connect(self) -> Union[None, socket.socket]:
+        """
+        Connects to the daemon
+        :return: connected socket, None if no daemon is running
+        """
+        if not hasattr(socket, 'AF_UNIX') or not self.socket_path.exists():
+            return None
+
+        connection: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(DAEMON_CONNECT_TIMEOUT)
+        try:
+            connection.connect(str(self.socket_path))
+        except OSError:
+            # a socket left behind by a daemon that didn't shut down cleanly
+            connection.close()
+            return None
+        connection.settimeout(None)
+
+        return connection
+
+    def send(self, command: str, args: Union[None, dict] = None):
+        """
+        Sends a request and yields the daemon's replies
+        :param command: command name
+        :param args: command arguments
+        :return: generator of messages, empty if no daemon is running
+        """
+        connection: Union[None, socket.socket] = self.connect()
+        if connection is None:
+            return
+
+        with connection, connection.makefile('rwb') as stream:
+            send_message(stream, {'command': command, 'args': args or {}, 'cwd': os.getcwd()})
+            while True:
+                message: Union[None, dict] = read_message(stream)
+                if message is None:
+                    return
+                yield message
+
+    def request(self, command: str, args: dict) -> Union[None, int]:
+        """
+        Runs a command in the daemon, echoing its output as it comes
+        :param command: deploy | keypress
+        :param args: command arguments
+        :return: command's exit code, None if no daemon is running
+        """
+        connected: bool = False
+        for message in self.send(command, args):
+            connected = True
+            if 'output' in message:
+                click.echo(message['output'], nl=False)
+            if 'exit' in message:
+                return int(message['exit'])
+
+        if connected:
+            click.echo('pyku serve closed the connection before the command finished')
+            return 1
+
+        return None
+
+    def status(self) -> Union[None, dict]:
+        """
+        Asks the daemon what it holds
+        :return: status, None if no daemon is running
+        """
+        for message in self.send('status'):
+            if 'status' in message:
+                return message['status']
+
+        return None
+
+    def stop(self) -> bool:
+        """
+        Asks the daemon to shut down
+        :return: if a daemon was running
+        """
+        return any('exit' in message for message in self.send('stop'))
@@ -14,9 +14,105 @@ STANDARD_CONFIG: dict = {
         'images/*'
     ],
     'OutDir': '',
-    'RetainStagingDir': False
+    'RetainStagingDir': False,
+    'IncrementalStaging': True,
+    'StagingLinkMode': 'copy',
+    'CompressionLevels': {
+        'default': 6
+    },
+    'ArchiveWorkers': 0,
+    'CacheArchives': True,
+    'StreamUpload': False,
+    'SizeBudget': 0,
+    'ImageProfile': 'none',
+    'ImageQuality': 85
 }
 PKKU_CONFIG = 'pyku_config.yml'
+WORKSPACE_FILE = 'pyku_workspace.yml'
+PYKU_CACHE_DIR = '.pyku'
+STAGING_INDEX = 'staging_index.json'
+ARCHIVE_CACHE_SIZE: int = 5
+DEPLOY_STATE = 'deploy_state.json'
+DAEMON_SOCKET = 'pyku.sock'
+# kept short, commands run themselves when no daemon answers
+DAEMON_CONNECT_TIMEOUT: float = 0.5
+ECP_TIMEOUT: float = 5
+INSTALLER_PORT: int = 80
+DEBUG_CONSOLE_PORT: int = 8085
+DEBUG_CONNECT_TIMEOUT: float = 3
+DEBUG_RECONNECT_DELAY: float = 1
+# console lines held per device while the writer catches up, older ones are dropped past this
+DEBUG_BUFFER_LINES: int = 10000
+DEBUG_LINE_LIMIT: int = 64 * 1024
+DEBUG_LOG_MAX_BYTES: int = 5 * 1024 * 1024
+DEBUG_LOG_BACKUPS: int = 3
+# seconds between keys in a key script, lets the UI settle
+ECP_KEY_DELAY: float = 0.1
+DEVICE_CACHE_FILE = 'devices.json'
+# used when an SSDP response has no Cache-Control max-age
+DEFAULT_DEVICE_MAX_AGE: int = 3600
+DEVICE_INFO_TIMEOUT: float = 3
+DEVICE_INFO_WORKERS: int = 16
+DISCOVERY_TIMEOUT: float = 3
+SSDP_ADDRESS: tuple = ('239.255.255.250', 1900)
+SSDP_RESEND_DELAY: float = 0.5
+DEFAULT_COMPRESSION_LEVEL: int = 6
+STREAM_CHUNK_SIZE: int = 64 * 1024
+# chunks buffered per streamed upload, the archive writer waits on the slowest upload past this
+STREAM_BUFFER_CHUNKS: int = 32
+# already compressed formats, deflating them again only costs cpu
+STORED_EXTENSIONS: list = [
+    '.png',
+    '.jpg',
+    '.jpeg',
+    '.gif',
+    '.webp',
+    '.mp4',
+    '.m4v',
+    '.mkv',
+    '.ts',
+    '.mp3',
+    '.m4a',
+    '.aac',
+    '.zip',
+    '.gz',
+    '.pkg'
+]
+# ui height per image profile, artwork is scaled down from the resolution the manifest's ui_resolutions designs for
+IMAGE_PROFILES: dict = {
+    'fhd': 1080,
+    'hd': 720,
+    'sd': 480
+}
+# device-info ui-resolution -> image profile
+UI_RESOLUTION_PROFILES: dict = {
+    '480i': 'sd',
+    '480p': 'sd',
+    '576i': 'sd',
+    '576p': 'sd',
+    '720p': 'hd',
+    '1080i': 'fhd',
+    '1080p': 'fhd',
+    '4k': 'fhd',
+    '2160p': 'fhd'
+}
+# dirs whose images are transcoded, .9.png nine patch images never are
+IMAGE_DIRS: list = [
+    'images',
+    'components'
+]
+IMAGE_EXTENSIONS: list = [
+    '.png',
+    '.jpg',
+    '.jpeg'
+]
+IMAGE_CACHE_DIR = 'images'
+IMAGE_INDEX = 'image_index.json'
+STAGING_LINK_MODES: list = [
+    'copy',
+    'hardlink',
+    'reflink'
+]
 KEYPRESS_COMMANDS: list = [
     'home',
     'rev',
@@ -34,3 +130,19 @@ KEYPRESS_COMMANDS: list = [
     'search',
     'enter'
 ]
+FIND_REMOTE_COMMAND = 'findremote'
+# Roku TVs accept these on top of KEYPRESS_COMMANDS
+TV_KEYPRESS_COMMANDS: list = [
+    'volumedown',
+    'volumemute',
+    'volumeup',
+    'poweroff',
+    'channelup',
+    'channeldown',
+    'inputtuner',
+    'inputhdmi1',
+    'inputhdmi2',
+    'inputhdmi3',
+    'inputhdmi4',
+    'inputav1'
+]
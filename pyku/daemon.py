@@ -0,0 +1,394 @@
+# coding=utf-8
+"""
+Usage:
+    python3 -m pyku serve
+
+    Long running daemon holding warm state between commands: channels with their staging index, compressed archive
+    entries and last archive, selected devices with their keep-alive ECP and plugin installer sessions, and the
+    device cache. deploy and keypress hand non interactive runs to it over a Unix socket, see pyku/client.py.
+
+ToDos:
+"""
+# standard lib imports
+import io
+import os
+import socket
+import socketserver
+import threading
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Tuple, Union
+# third party lib imports
+import click
+# project imports
+from pyku.channel import Channel
+from pyku.client import DaemonClient, read_message, send_message
+from pyku.constants import DEPLOY_STATE, PKKU_CONFIG
+from pyku.device import DeviceHandle
+from pyku.device_cache import DeviceCache
+from pyku.ecp import EcpClient, parse_key_script, text_to_keys
+from pyku.pipeline import BackgroundBuild
+from pyku.planner import DeployPlanner
+from pyku.roku import Roku
+import pyku.utils as utils
+
+
+class SocketOutput(io.TextIOBase):
+    """
+    Text stream sending what's written to the client as output messages, click.echo writes to it while a command
+    runs. Output is dropped once the client goes away so the command still finishes.
+    """
+    def __init__(self, stream: BinaryIO):
+        super().__init__()
+        self.stream: BinaryIO = stream
+        self.connected: bool = True
+        self._lock: threading.Lock = threading.Lock()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            raise TypeError(f'write() argument must be str, not {type(text).__name__}')
+
+        if text and self.connected:
+            with self._lock:
+                try:
+                    send_message(self.stream, {'output': text})
+                except OSError:
+                    self.connected = False
+
+        return len(text)
+
+
+class PykuDaemon:
+    """
+    Warm state shared by every request. Commands run one at a time, they share stdout and the working dir.
+
+    *Attributes:
+        socket_path (Path): Unix socket served on
+        channels (Dict[str, Channel]): Channel per root, with entry_cache kept between builds
+        stamps (Dict[str, tuple]): Config and manifest mtimes each channel was loaded at
+        planners (Dict[str, DeployPlanner]): Deploy planner per channel root
+        selections (Dict[tuple, List[Roku]]): Devices selected per (channel root, devices, require_password)
+        rokus (Dict[str, Roku]): Last Roku per location, its sessions carry over to reselected devices
+        device_cache (DeviceCache): Device cache kept in memory
+        started_at (float): Wall clock time the daemon started
+        requests (int): Commands run
+
+    *methods
+        get_channel(channel_path: str) -> Channel:
+
+        select_devices(channel: Channel, devices: List[str], refresh_devices: bool, require_password: bool) -> list:
+
+        deploy(args: dict) -> int:
+
+        keypress(args: dict) -> int:
+
+        run(command: str, args: dict, cwd: str, output: SocketOutput) -> int:
+
+        status() -> dict:
+    """
+    def __init__(self, socket_path: Path):
+        self.socket_path: Path = socket_path
+        self.channels: Dict[str, Channel] = {}
+        self.stamps: Dict[str, tuple] = {}
+        self.planners: Dict[str, DeployPlanner] = {}
+        self.selections: Dict[tuple, List[Roku]] = {}
+        self.rokus: Dict[str, Roku] = {}
+        self.device_cache: DeviceCache = DeviceCache()
+        self.started_at: float = time.time()
+        self.requests: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def channel_stamp(channel_path: Path) -> tuple:
+        """
+        Config and manifest mtimes, either changing reloads the channel
+        """
+        stamp: list = []
+        for name in [PKKU_CONFIG, 'manifest']:
+            try:
+                stamp.append((channel_path / name).stat().st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+
+        return tuple(stamp)
+
+    def get_channel(self, channel_path: str) -> Channel:
+        """
+        Returns the warm Channel for a root, reloading its config and forgetting its device selections when the
+        config or manifest changed
+        :param channel_path: absolute channel root
+        :return:
+        """
+        stamp: tuple = PykuDaemon.channel_stamp(Path(channel_path))
+        channel: Union[None, Channel] = self.channels.get(channel_path, None)
+
+        if channel is None:
+            channel = Channel(channel_path)
+            # keep compressed entries between builds so only changed files are recompressed
+            channel.entry_cache = {}
+            self.channels[channel_path] = channel
+        elif stamp != self.stamps.get(channel_path, None):
+            channel.reload_config()
+            self.planners.pop(channel_path, None)
+            self.selections = {key: rokus for key, rokus in self.selections.items() if key[0] != channel_path}
+        self.stamps[channel_path] = stamp
+
+        return channel
+
+    def select_devices(
+        self,
+        channel: Channel,
+        devices: List[str],
+        refresh_devices: bool,
+        require_password: bool
+    ) -> list:
+        """
+        Selects devices the way get_selected_from_config does, reusing the last selection for the same devices
+        :param channel: Channel
+        :param devices: ip addresses, serial numbers or names, empty for every device in config
+        :param refresh_devices: flag to fetch device-info again
+        :param require_password: flag to skip devices without a password in config
+        :return: selected devices
+        """
+        key: tuple = (str(channel.channel_path), tuple(devices), require_password)
+        if not refresh_devices and key in self.selections:
+            return self.selections[key]
+
+        selected: list = utils.get_selected_from_config(
+            channel,
+            self.device_cache,
+            refresh_devices,
+            devices or None,
+            require_password
+        )
+        self.device_cache.finish()
+
+        for roku in selected:
+            known: Union[None, Roku] = self.rokus.get(roku.location, None)
+            if known is not None and known is not roku:
+                roku.ecp = known.ecp
+                roku.installer = known.installer
+            self.rokus[roku.location] = roku
+        self.selections[key] = selected
+
+        return selected
+
+    def deploy(self, args: dict) -> int:
+        """
+        deploy, without --debugger or --profile, which stay in the CLI
+        :param args: channel, jobs, force, refresh_devices, devices
+        :return: exit code
+        """
+        click.echo('deploy')
+        channel: Channel = self.get_channel(args['channel'])
+        if not channel.has_config:
+            click.echo('cannot deploy a channel without pyku_config.yml, run deploy with --no-daemon first')
+            return 1
+
+        click.echo('creating archive')
+        build: Union[None, BackgroundBuild] = None
+        if not channel.channel_config.stream_upload:
+            build = BackgroundBuild(channel)
+            build.start()
+        try:
+            selected_devices: list = self.select_devices(
+                channel,
+                args.get('devices', []),
+                args.get('refresh_devices', False),
+                True
+            )
+        finally:
+            if build is not None:
+                build.wait()
+        if channel.archive_from_cache:
+            click.echo(f'reusing cached archive {str(channel.channel_archive)}')
+
+        if len(selected_devices) == 0:
+            if channel.channel_config.stream_upload:
+                channel.build_channel_archive()
+            return 1
+
+        planner: Union[None, DeployPlanner] = None
+        if not args.get('force', False):
+            planner = self.planners.get(args['channel'], None)
+            if planner is None:
+                planner = DeployPlanner(channel.channel_config.cache_dir / DEPLOY_STATE)
+                self.planners[args['channel']] = planner
+
+        results: list = utils.deploy_channel_to_devices(channel, selected_devices, args.get('jobs', 4), planner)
+
+        return 0 if utils.echo_deploy_summary(results) else 1
+
+    def keypress(self, args: dict) -> int:
+        """
+        keypress over the selected devices' open ECP sessions
+        :param args: channel, button, script, text, delay, refresh_devices, devices
+        :return: exit code
+        """
+        click.echo('key press')
+        keys: list = []
+        if args.get('button', None):
+            keys.append(args['button'])
+        if args.get('script', None):
+            try:
+                keys += parse_key_script(args['script'])
+            except ValueError as error:
+                click.echo(f'Error: Invalid value for --script: {error}')
+                return 2
+        if args.get('text', None):
+            keys += text_to_keys(args['text'])
+        if len(keys) == 0:
+            click.echo('Error: one of --button, --script or --text is required')
+            return 2
+
+        channel: Channel = self.get_channel(args['channel'])
+        selected_devices: list = self.select_devices(
+            channel,
+            args.get('devices', []),
+            args.get('refresh_devices', False),
+            False
+        )
+        if len(selected_devices) == 0:
+            return 0
+
+        handles: List[DeviceHandle] = [DeviceHandle.from_roku(selected) for selected in selected_devices]
+        clients: Dict[str, EcpClient] = {selected.location: selected.get_ecp() for selected in selected_devices}
+        results: List[Tuple[DeviceHandle, Union[None, str]]] = utils.send_keys_to_devices(
+            handles,
+            keys,
+            args.get('delay', 0),
+            clients
+        )
+
+        return 1 if any(error is not None for _, error in results) else 0
+
+    def run(self, command: str, args: dict, cwd: str, output: SocketOutput) -> int:
+        """
+        Runs a command in the client's working dir with its output sent to the client
+        :param command: deploy | keypress
+        :param args: command arguments
+        :param cwd: client's working dir, relative paths in configs resolve against it
+        :param output: client's output stream
+        :return: exit code
+        """
+        commands: dict = {'deploy': self.deploy, 'keypress': self.keypress}
+        if command not in commands:
+            send_message(output.stream, {'output': f'unknown command {command}\n'})
+            return 2
+
+        with self._lock, redirect_stdout(output):
+            self.requests += 1
+            previous_cwd: str = os.getcwd()
+            try:
+                os.chdir(cwd)
+                return commands[command](args)
+            except SystemExit as exit_error:
+                return exit_error.code if isinstance(exit_error.code, int) else 1
+            except Exception as error:
+                click.echo(f'{command} failed: {error}')
+                return 1
+            finally:
+                os.chdir(previous_cwd)
+
+    def status(self) -> dict:
+        """
+        What the daemon holds
+        """
+        return {
+            'pid': os.getpid(),
+            'socket': str(self.socket_path),
+            'started_at': self.started_at,
+            'requests': self.requests,
+            'channels': sorted(self.channels),
+            'devices': sorted(self.rokus)
+        }
+
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Reads one request and answers it
+    """
+    server: 'DaemonServer'
+
+    def handle(self) -> None:
+        try:
+            request: Union[None, dict] = read_message(self.rfile)
+        except ValueError:
+            request = {}
+        if request is None:
+            # a connection closed without a request, e.g. a client checking whether the daemon is running
+            return
+        if not isinstance(request, dict) or len(request) == 0:
+            send_message(self.wfile, {'output': 'malformed request\n', 'exit': 2})
+            return
+
+        command: str = str(request.get('command', ''))
+        if command == 'status':
+            send_message(self.wfile, {'status': self.server.pyku.status(), 'exit': 0})
+        elif command == 'stop':
+            send_message(self.wfile, {'output': 'stopping pyku serve\n', 'exit': 0})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            exit_code: int = self.server.pyku.run(
+                command,
+                request.get('args', {}),
+                request.get('cwd', os.getcwd()),
+                SocketOutput(self.wfile)
+            )
+            try:
+                send_message(self.wfile, {'exit': exit_code})
+            except OSError:
+                pass
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server, status and stop are answered while a command runs
+
+    *Attributes:
+        pyku (PykuDaemon): Warm state commands run against
+    """
+    daemon_threads: bool = True
+
+    def __init__(self, pyku: PykuDaemon):
+        socket_path: Path = pyku.socket_path
+        if DaemonClient(socket_path).connect() is not None:
+            raise click.ClickException(f'pyku serve is already running on {str(socket_path)}')
+        if socket_path.exists():
+            socket_path.unlink()
+        if not socket_path.parent.exists():
+            socket_path.parent.mkdir(parents=True, mode=0o700)
+
+        super().__init__(str(socket_path), DaemonRequestHandler)
+        # devices' dev passwords pass through here, keep the socket to its user
+        os.chmod(str(socket_path), 0o600)
+        self.pyku: PykuDaemon = pyku
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self.pyku.socket_path.exists():
+            self.pyku.socket_path.unlink()
+        self.pyku.device_cache.finish()
+
+
+def serve(socket_path: Path) -> None:
+    """
+    Serves until stopped by ctrl+c or pyku serve --stop
+    :param socket_path: Unix socket to serve on
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        raise click.ClickException('pyku serve needs Unix socket support')
+
+    server: DaemonServer = DaemonServer(PykuDaemon(socket_path))
+    click.echo(f'serving on {str(socket_path)}, ctrl+c to stop')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        click.echo('stopped pyku serve')
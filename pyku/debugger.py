@@ -0,0 +1,266 @@
+# coding=utf-8
+"""
+Usage:
+    Streams the BrightScript debug console (telnet port 8085) of many devices into one tagged output and per device
+    rotating log files
+
+ToDos:
+"""
+# standard lib imports
+import asyncio
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Deque, List, Union
+# third party lib imports
+import click
+# project imports
+from pyku.constants import DEBUG_BUFFER_LINES, DEBUG_CONNECT_TIMEOUT, DEBUG_CONSOLE_PORT, DEBUG_LINE_LIMIT, \
+    DEBUG_LOG_BACKUPS, DEBUG_LOG_MAX_BYTES, DEBUG_RECONNECT_DELAY
+from pyku.roku import Roku
+
+
+class DeviceConsole:
+    """
+    One device's console, lines wait in a ring buffer until the writer thread picks them up. When the writer falls
+    behind the oldest lines are dropped, a chatty channel can't grow memory or block the socket reads.
+
+    *Attributes:
+        tag (str): Prefix for the device's lines
+        host (str): Device ip address
+        lines (Deque[str]): Ring buffer of lines not yet written
+        dropped (int): Lines dropped from the ring buffer, only the event loop writes it
+        reported_dropped (int): Dropped lines already reported, only the writer thread writes it
+        logger (logging.Logger): Writes to the device's rotating log file
+
+    *methods
+        push(line: str) -> None:
+
+        drain() -> List[str]:
+
+        close() -> None:
+    """
+    def __init__(self, tag: str, host: str, log_file: Path, buffer_lines: int = DEBUG_BUFFER_LINES):
+        self.tag: str = tag
+        self.host: str = host
+        self.lines: Deque[str] = deque(maxlen=buffer_lines)
+        self.dropped: int = 0
+        self.reported_dropped: int = 0
+
+        handler: RotatingFileHandler = RotatingFileHandler(
+            str(log_file),
+            maxBytes=DEBUG_LOG_MAX_BYTES,
+            backupCount=DEBUG_LOG_BACKUPS,
+            encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        self.logger: logging.Logger = logging.getLogger(f'pyku.debugger.{log_file.stem}')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.handlers = [handler]
+
+    def push(self, line: str) -> None:
+        """
+        Buffers a line, dropping the oldest if the buffer is full
+        """
+        if len(self.lines) == self.lines.maxlen:
+            self.dropped += 1
+        self.lines.append(line)
+
+    def drain(self) -> List[str]:
+        """
+        Takes every buffered line
+        """
+        lines: List[str] = []
+        while True:
+            try:
+                lines.append(self.lines.popleft())
+            except IndexError:
+                return lines
+
+    def close(self) -> None:
+        """
+        Closes the log file
+        """
+        for handler in self.logger.handlers:
+            handler.close()
+        self.logger.handlers = []
+
+
+class DebugConsoleStreamer:
+    """
+    Reads every device's console on an asyncio loop in a background thread and writes them from a second thread,
+    so neither a slow terminal nor a slow disk holds up the reads or the deploy
+
+    *Attributes:
+        consoles (List[DeviceConsole]): Console per device
+        port (int): Debug console port
+        connect_timeout (float): Seconds start waits on the first connection to each device
+
+    *methods
+        start() -> None:
+
+        stop() -> None:
+
+        stream_device(console: DeviceConsole) -> None: | async
+
+        write_lines() -> None:
+    """
+    def __init__(
+        self,
+        rokus: List[Roku],
+        log_dir: Path,
+        port: int = DEBUG_CONSOLE_PORT,
+        buffer_lines: int = DEBUG_BUFFER_LINES,
+        connect_timeout: float = DEBUG_CONNECT_TIMEOUT
+    ):
+        if not log_dir.exists():
+            log_dir.mkdir(parents=True)
+
+        self.consoles: List[DeviceConsole] = [
+            DeviceConsole(
+                str(roku.friendly_device_name or roku.get_ip_address()),
+                roku.get_ip_address(),
+                log_dir / f'{roku.serial_number or roku.get_ip_address()}.log',
+                buffer_lines
+            )
+            for roku in rokus
+        ]
+        self.port: int = port
+        self.connect_timeout: float = connect_timeout
+        self._loop: Union[None, asyncio.AbstractEventLoop] = None
+        self._stopping: Union[None, asyncio.Event] = None
+        self._attempted: int = 0
+        self._ready: threading.Event = threading.Event()
+        self._wake: threading.Event = threading.Event()
+        self._stopped: threading.Event = threading.Event()
+        self._reader: threading.Thread = threading.Thread(target=self.read_consoles, daemon=True)
+        self._writer: threading.Thread = threading.Thread(target=self.write_lines, daemon=True)
+
+    def start(self) -> None:
+        """
+        Starts streaming and waits for the first connection attempt to every device, so logs from the launch
+        that follows an upload are captured
+        """
+        self._writer.start()
+        self._reader.start()
+        self._ready.wait(self.connect_timeout + 1)
+
+    def stop(self) -> None:
+        """
+        Stops streaming, writing out buffered lines
+        """
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        self._reader.join(self.connect_timeout + 1)
+
+        self._stopped.set()
+        self._wake.set()
+        self._writer.join()
+        for console in self.consoles:
+            console.close()
+
+    def read_consoles(self) -> None:
+        """
+        Runs the event loop reading every console
+        """
+        async def stream_all() -> None:
+            self._loop = asyncio.get_running_loop()
+            self._stopping = asyncio.Event()
+            tasks: List[asyncio.Task] = [
+                asyncio.ensure_future(self.stream_device(console)) for console in self.consoles
+            ]
+            await self._stopping.wait()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run(stream_all())
+
+    def connection_attempted(self) -> None:
+        """
+        Counts first connection attempts, start returns once every device had one
+        """
+        self._attempted += 1
+        if self._attempted == len(self.consoles):
+            self._ready.set()
+
+    def emit(self, console: DeviceConsole, line: str) -> None:
+        """
+        Buffers a line and wakes the writer
+        """
+        console.push(line)
+        self._wake.set()
+
+    async def stream_device(self, console: DeviceConsole) -> None:
+        """
+        Reads a device's console, reconnecting when the connection drops
+        :param console: DeviceConsole of the device
+        """
+        first_attempt: bool = True
+        while True:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(console.host, self.port),
+                    self.connect_timeout
+                )
+            except (OSError, asyncio.TimeoutError) as error:
+                if first_attempt:
+                    self.emit(console, f'unable to connect to debug console, retrying: {error or "timed out"}')
+                    self.connection_attempted()
+                    first_attempt = False
+                await asyncio.sleep(DEBUG_RECONNECT_DELAY)
+                continue
+
+            if first_attempt:
+                self.connection_attempted()
+                first_attempt = False
+
+            partial: bytes = b''
+            try:
+                while True:
+                    data: bytes = await reader.read(DEBUG_LINE_LIMIT)
+                    if not data:
+                        break
+
+                    *lines, partial = (partial + data).split(b'\n')
+                    # a line with no end in sight is written in pieces rather than held
+                    if len(partial) >= DEBUG_LINE_LIMIT:
+                        lines.append(partial)
+                        partial = b''
+                    for line in lines:
+                        self.emit(console, line.decode('utf-8', 'replace').rstrip('\r'))
+            except OSError:
+                pass
+            finally:
+                writer.close()
+
+            if partial:
+                self.emit(console, partial.decode('utf-8', 'replace').rstrip('\r'))
+            self.emit(console, 'debug console disconnected, reconnecting')
+            await asyncio.sleep(DEBUG_RECONNECT_DELAY)
+
+    def write_lines(self) -> None:
+        """
+        Echoes buffered lines tagged with their device and logs them to the device's file
+        """
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            stopped: bool = self._stopped.is_set()
+
+            for console in self.consoles:
+                dropped: int = console.dropped - console.reported_dropped
+                if dropped > 0:
+                    console.reported_dropped += dropped
+                    click.echo(f'[{console.tag}] ... {dropped} line(s) dropped, output is falling behind')
+                    console.logger.info(f'... {dropped} line(s) dropped')
+
+                for line in console.drain():
+                    click.echo(f'[{console.tag}] {line}')
+                    console.logger.info(line)
+
+            if stopped:
+                return
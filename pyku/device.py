@@ -0,0 +1,290 @@
+# coding=utf-8
+"""
+Usage:
+    Compact device records for holding many devices in memory, and handles for commands that only need to reach
+    a device
+
+ToDos:
+"""
+# standard lib imports
+import sys
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, FrozenSet, NamedTuple, Tuple, Union
+# project imports
+from pyku.constants import DEFAULT_DEVICE_MAX_AGE
+from pyku.device_cache import device_udn, parse_max_age
+from pyku.ecp import EcpClient, allowed_commands
+from pyku.roku import Roku
+
+# Roku attributes set from ECP device-info, the ECP field name is the attribute with - for _
+DEVICE_INFO_FIELDS: Tuple[str, ...] = (
+    'advertising_id',
+    'build_number',
+    'can_use_wifi_extender',
+    'clock_format',
+    'country',
+    'davinci_version',
+    'default_device_name',
+    'developer_enabled',
+    'device_id',
+    'expert_pq_enabled',
+    'find_remote_is_possible',
+    'friendly_device_name',
+    'friendly_model_name',
+    'grandcentral_version',
+    'has_mobile_screensaver',
+    'has_play_on_roku',
+    'has_wifi_extender',
+    'has_wifi_5G_support',
+    'headphones_connected',
+    'is_stick',
+    'is_tv',
+    'keyed_developer_id',
+    'language',
+    'locale',
+    'model_name',
+    'model_number',
+    'model_region',
+    'notifications_enabled',
+    'notifications_first_use',
+    'panel_id',
+    'power_mode',
+    'screen_size',
+    'search_channels_enabled',
+    'search_enabled',
+    'secure_device',
+    'serial_number',
+    'software_build',
+    'software_version',
+    'supports_audio_guide',
+    'supports_ethernet',
+    'supports_find_remote',
+    'supports_private_listening',
+    'supports_private_listening_dtv',
+    'supports_rva',
+    'supports_wake_on_wlan',
+    'supports_warm_standby',
+    'supports_suspend',
+    'support_url',
+    'time_zone',
+    'time_zone_auto',
+    'time_zone_name',
+    'time_zone_offset',
+    'time_zone_tz',
+    'trc_channel_version',
+    'trc_version',
+    'tuner_type',
+    'udn',
+    'uptime',
+    'user_device_name',
+    'user_device_location',
+    'vendor_name',
+    'voice_search_enabled',
+    'wifi_driver',
+    'wifi_mac'
+)
+FIELD_INDEX: Dict[str, int] = {field: index for index, field in enumerate(DEVICE_INFO_FIELDS)}
+
+
+def decode_field(value: Union[None, str]) -> Union[None, bool, str]:
+    """
+    Decodes a device-info value the way Roku does, 'true' and 'false' become bools. Strings are interned since
+    model names, versions and the like repeat across a fleet.
+    :param value: raw device-info value
+    :return:
+    """
+    if value is None:
+        return None
+
+    if value.lower() == 'true' or value.lower() == 'false':
+        return value.lower() == 'true'
+
+    return sys.intern(value)
+
+
+def encode_field(value: Union[None, bool, str]) -> Union[None, str]:
+    """
+    Reverses decode_field
+    """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+
+    return value
+
+
+class DeviceRecord:
+    """
+    Read only device record, device-info is kept as the raw xml or field dict it came in and only decoded into a
+    tuple the first time a field is read
+
+    *Attributes:
+        location (str): Device's ECP location, e.g. http://{ip}:8060/
+        usn (str): Device's SSDP unique service name
+        max_age (int): Seconds the device's discovery data may be cached for
+        every name in DEVICE_INFO_FIELDS, e.g. serial_number, is_tv
+
+    *methods
+        from_roku(roku: Roku) -> DeviceRecord: | static
+
+        from_cache_entry(entry: dict) -> DeviceRecord: | static
+
+        decode() -> tuple:
+
+        get_ip_address() -> str:
+
+        get_device_info() -> dict:
+
+        to_roku() -> Roku:
+    """
+    __slots__ = ('location', 'usn', 'max_age', '_source', '_values')
+
+    def __init__(
+        self,
+        location: str,
+        device_info: Union[None, bytes, dict],
+        usn: str = '',
+        max_age: int = DEFAULT_DEVICE_MAX_AGE
+    ):
+        self.location: str = location
+        self.usn: str = usn
+        self.max_age: int = max_age
+        self._source: Union[None, bytes, dict] = device_info
+        self._values: Union[None, tuple] = None
+
+    @staticmethod
+    def from_roku(roku: Roku) -> 'DeviceRecord':
+        """
+        Builds a record from a Roku with fetched device-info
+        """
+        return DeviceRecord(
+            roku.location,
+            roku.get_device_info(),
+            device_udn(roku.discovery_data),
+            parse_max_age(roku.discovery_data)
+        )
+
+    @staticmethod
+    def from_cache_entry(entry: dict) -> 'DeviceRecord':
+        """
+        Builds a record from a DeviceCache entry
+        """
+        return DeviceRecord(
+            entry['location'],
+            entry['device_info'],
+            device_udn(entry['discovery_data']),
+            entry['max_age']
+        )
+
+    def decode(self) -> tuple:
+        """
+        Decodes device-info into a tuple ordered by DEVICE_INFO_FIELDS, releasing the raw source
+        :return:
+        """
+        if self._values is not None:
+            return self._values
+
+        raw: Dict[str, Union[None, str]] = {}
+        if isinstance(self._source, bytes):
+            raw = {field.tag: field.text for field in ElementTree.fromstring(self._source)}
+        elif isinstance(self._source, dict):
+            raw = self._source
+
+        self._values = tuple(decode_field(raw.get(field.replace('_', '-'), None)) for field in DEVICE_INFO_FIELDS)
+        self._source = None
+
+        return self._values
+
+    def __getattr__(self, name: str) -> Union[None, bool, str]:
+        # only called for names that aren't slots, i.e. device-info fields
+        index: Union[None, int] = FIELD_INDEX.get(name, None)
+        if index is None:
+            raise AttributeError(name)
+
+        return self.decode()[index]
+
+    def __repr__(self) -> str:
+        return f'DeviceRecord({self.location!r}, usn={self.usn!r})'
+
+    def get_ip_address(self) -> str:
+        """
+        returns ip address without protocol or port
+        :return:
+        """
+        return self.location.split(':')[1][2:]
+
+    def get_device_info(self) -> dict:
+        """
+        Returns the device-info fields the record holds, as raw ECP values
+        :return:
+        """
+        return {
+            field.replace('_', '-'): encode_field(value)
+            for field, value in zip(DEVICE_INFO_FIELDS, self.decode())
+            if value is not None
+        }
+
+    def to_roku(self) -> Roku:
+        """
+        Expands the record into a full Roku
+        :return:
+        """
+        roku: Roku = Roku(
+            location=self.location,
+            discovery_data={
+                'LOCATION': self.location,
+                'USN': self.usn,
+                'Cache-Control': f'max-age={self.max_age}'
+            }
+        )
+        roku.load_device_info(self.get_device_info())
+
+        return roku
+
+
+class DeviceHandle(NamedTuple):
+    """
+    What commands that only talk to a device, like keypress, need from it
+
+    *Attributes:
+        location (str): Device's ECP location, e.g. http://{ip}:8060/
+        user_name (str): Dev user name
+        password (Union[None, str]): Dev password
+        allowed_commands (FrozenSet[str]): Keys the device accepts
+
+    *methods
+        from_roku(roku: Roku) -> DeviceHandle: | class
+
+        get_ip_address() -> str:
+
+        ecp_client() -> EcpClient:
+    """
+    location: str
+    user_name: str = 'rokudev'
+    password: Union[None, str] = None
+    allowed_commands: FrozenSet[str] = allowed_commands(False, False)
+
+    @classmethod
+    def from_roku(cls, roku: Union[Roku, DeviceRecord]) -> 'DeviceHandle':
+        """
+        Keeps only a device's location, credentials and allowed keys
+        """
+        return cls(
+            roku.location,
+            getattr(roku, 'user_name', 'rokudev'),
+            getattr(roku, 'password', None),
+            allowed_commands(bool(roku.is_tv), bool(roku.find_remote_is_possible))
+        )
+
+    def get_ip_address(self) -> str:
+        """
+        returns ip address without protocol or port
+        :return:
+        """
+        return self.location.split(':')[1][2:]
+
+    def ecp_client(self) -> EcpClient:
+        """
+        Opens a keep-alive ECP session to the device
+        :return:
+        """
+        return EcpClient(self.location, self.allowed_commands)
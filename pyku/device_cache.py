@@ -0,0 +1,278 @@
+# coding=utf-8
+"""
+Usage:
+    On disk cache of discovered devices and their device-info, shared by every channel
+
+ToDos:
+"""
+# standard lib imports
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Union
+# project imports
+from pyku.constants import DEFAULT_DEVICE_MAX_AGE, DEVICE_CACHE_FILE, DEVICE_INFO_TIMEOUT
+from pyku.discovery import DiscoveryEngine
+from pyku.roku import Roku
+
+
+def default_cache_file() -> Path:
+    """
+    Returns the device cache path under the user's cache dir
+    """
+    cache_home: str = os.environ.get('XDG_CACHE_HOME', '') or str(Path.home() / '.cache')
+
+    return Path(cache_home) / 'pyku' / DEVICE_CACHE_FILE
+
+
+def parse_max_age(discovery_data: dict) -> int:
+    """
+    Reads max-age from an SSDP response's Cache-Control header
+    :param discovery_data: SSDP response headers
+    :return: seconds the response may be cached for
+    """
+    cache_control: str = ''
+    for key, value in discovery_data.items():
+        if key.lower() == 'cache-control':
+            cache_control = value
+    match = re.search(r'max-age\s*=\s*(\d+)', cache_control)
+
+    return int(match.group(1)) if match else DEFAULT_DEVICE_MAX_AGE
+
+
+def device_udn(discovery_data: dict) -> str:
+    """
+    Returns the device's unique name from an SSDP response's USN header, e.g. uuid:roku:ecp:{serial}
+    """
+    for key, value in discovery_data.items():
+        if key.lower() == 'usn':
+            return value
+
+    return ''
+
+
+def device_identity(discovery_data: dict, device_info: Union[None, dict]) -> str:
+    """
+    Identifies a device the same way however it was found, by the serial number in its device-info, falling back to
+    its SSDP UDN for entries without one
+    """
+    serial_number: Union[None, str] = (device_info or {}).get('serial-number', None)
+
+    return f'uuid:roku:ecp:{serial_number}' if serial_number else device_udn(discovery_data)
+
+
+class DeviceCache:
+    """
+    Discovered devices keyed by serial number and location. Entries are fresh for the SSDP max-age, stale entries
+    are still used but re-fetched in the background. Devices read from config by ip address are cached too, but only
+    entries found by SSDP stand in for a discovery.
+
+    *Attributes:
+        file (Path): JSON file the cache is persisted to
+        entries (dict): key -> {'location', 'discovery_data', 'device_info', 'fetched_at', 'max_age', 'discovered'}
+
+    *methods
+        entry_key(location: str, discovery_data: dict, device_info: Union[None, dict]) -> str: | static
+
+        is_fresh(entry: dict) -> bool: | static
+
+        roku_from_entry(entry: dict) -> Roku: | static
+
+        load_rokus(discovered_only: bool, revalidate: bool) -> List[Roku]:
+
+        has_stale_entries() -> bool:
+
+        get(location: str) -> Union[None, Roku]:
+
+        store(roku: Roku) -> None:
+
+        revalidate(entry: dict) -> None:
+
+        rescan() -> None:
+
+        finish(timeout: float) -> None:
+
+        save() -> None:
+    """
+    def __init__(self, cache_file: Union[None, Path] = None):
+        self.file: Path = cache_file or default_cache_file()
+        self.entries: Dict[str, dict] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._revalidating: List[threading.Thread] = []
+
+        if self.file.exists():
+            try:
+                with self.file.open('r') as cache:
+                    self.entries = json.load(cache)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @staticmethod
+    def entry_key(location: str, discovery_data: dict, device_info: Union[None, dict]) -> str:
+        """
+        Keys an entry by the device's serial number and location, so a device configured by ip address and the same
+        device found by SSDP share an entry
+        """
+        return f'{device_identity(discovery_data, device_info)}|{location}'
+
+    @staticmethod
+    def is_fresh(entry: dict) -> bool:
+        """
+        Checks if an entry is within its SSDP max-age
+        """
+        return time.time() - entry['fetched_at'] < entry['max_age']
+
+    @staticmethod
+    def roku_from_entry(entry: dict) -> Roku:
+        """
+        Rebuilds a Roku from a cache entry without any network requests
+        """
+        roku: Roku = Roku(location=entry['location'], discovery_data=entry['discovery_data'])
+        roku.load_device_info(entry['device_info'])
+
+        return roku
+
+    def load_rokus(self, discovered_only: bool = False, revalidate: bool = True) -> List[Roku]:
+        """
+        Returns every cached device, one per location, starting background re-fetches for stale ones
+        :param discovered_only: flag to leave out devices only ever reached through a configured ip address
+        :param revalidate: flag to re-fetch stale entries, off when the caller refreshes them through rescan()
+        :return:
+        """
+        with self._lock:
+            entries: list = [entry for entry in self.entries.values()
+                             if entry.get('discovered', True) or not discovered_only]
+
+        # caches written before entries were keyed by serial number can hold a device twice
+        by_location: Dict[str, dict] = {}
+        for entry in sorted(entries, key=lambda cached: cached['fetched_at']):
+            by_location[entry['location']] = entry
+
+        rokus: List[Roku] = []
+        for entry in by_location.values():
+            if revalidate and not DeviceCache.is_fresh(entry):
+                self.revalidate(entry)
+            rokus.append(DeviceCache.roku_from_entry(entry))
+
+        return rokus
+
+    def has_stale_entries(self) -> bool:
+        """
+        Checks if any entry is past its SSDP max-age
+        """
+        with self._lock:
+            return any(not DeviceCache.is_fresh(entry) for entry in self.entries.values())
+
+    def get(self, location: str) -> Union[None, Roku]:
+        """
+        Returns the cached device at a location, starting a background re-fetch if it's stale
+        :param location: device's ECP location, e.g. http://{ip}:8060/
+        :return: None when the location isn't cached
+        """
+        with self._lock:
+            entries: list = [entry for entry in self.entries.values() if entry['location'] == location]
+
+        if len(entries) == 0:
+            return None
+
+        entry: dict = max(entries, key=lambda cached: cached['fetched_at'])
+        if not DeviceCache.is_fresh(entry):
+            self.revalidate(entry)
+
+        return DeviceCache.roku_from_entry(entry)
+
+    def store(self, roku: Roku) -> None:
+        """
+        Caches a device's discovery data and fetched device-info, replacing any other entry at its location
+        :param roku: Roku with fetched data
+        """
+        device_info: Union[None, dict] = roku.get_device_info()
+        if device_info is None:
+            return
+
+        key: str = DeviceCache.entry_key(roku.location, roku.discovery_data, device_info)
+        with self._lock:
+            discovered: bool = device_udn(roku.discovery_data) != '' or \
+                self.entries.get(key, {}).get('discovered', False)
+            for other in [other for other, entry in self.entries.items()
+                          if entry['location'] == roku.location and other != key]:
+                del self.entries[other]
+            self.entries[key] = {
+                'location': roku.location,
+                'discovery_data': dict(roku.discovery_data),
+                'device_info': device_info,
+                'fetched_at': time.time(),
+                'max_age': parse_max_age(roku.discovery_data),
+                'discovered': discovered
+            }
+
+    def revalidate(self, entry: dict) -> None:
+        """
+        Re-fetches a stale entry's device-info on a background thread, dropping it if the device is gone
+        :param entry: cache entry
+        """
+        def fetch() -> None:
+            roku: Roku = Roku(location=entry['location'], discovery_data=entry['discovery_data'])
+            try:
+                roku.fetch_device_info(DEVICE_INFO_TIMEOUT)
+            except Exception:
+                pass
+
+            if roku.get_device_info() is not None:
+                self.store(roku)
+            else:
+                with self._lock:
+                    self.entries.pop(
+                        DeviceCache.entry_key(entry['location'], entry['discovery_data'], entry['device_info']),
+                        None
+                    )
+
+        thread: threading.Thread = threading.Thread(target=fetch, daemon=True)
+        thread.start()
+        self._revalidating.append(thread)
+
+    def rescan(self) -> None:
+        """
+        Runs an SSDP discovery on a background thread, caching every device that answers, so devices that joined
+        the network since the cache was written show up on the next run
+        """
+        def scan() -> None:
+            def on_device(roku: Roku, error: Union[None, Exception]) -> None:
+                if error is None:
+                    self.store(roku)
+
+            try:
+                DiscoveryEngine().discover(None, on_device)
+            except OSError:
+                pass
+
+        thread: threading.Thread = threading.Thread(target=scan, daemon=True)
+        thread.start()
+        self._revalidating.append(thread)
+
+    def finish(self, timeout: float = 5) -> None:
+        """
+        Waits for background re-fetches, then saves
+        :param timeout: max seconds to wait on all re-fetches
+        """
+        deadline: float = time.time() + timeout
+        for thread in self._revalidating:
+            thread.join(max(0.0, deadline - time.time()))
+        self._revalidating = []
+        self.save()
+
+    def save(self) -> None:
+        """
+        Writes the cache to disk
+        """
+        with self._lock:
+            if not self.file.parent.exists():
+                self.file.parent.mkdir(parents=True)
+
+            temp_file: Path = self.file.with_suffix('.tmp')
+            with temp_file.open('w') as cache:
+                json.dump(self.entries, cache, indent=2, sort_keys=True)
+            os.replace(str(temp_file), str(self.file))
@@ -0,0 +1,247 @@
+# coding=utf-8
+"""
+Usage:
+    Asyncio SSDP discovery, devices are yielded as they answer with their device-info fetched as soon as their
+    M-SEARCH response arrives
+
+ToDos:
+"""
+# standard lib imports
+import asyncio
+import ipaddress
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, List, Set, Tuple, Union
+# project imports
+from pyku.constants import DEVICE_INFO_TIMEOUT, DEVICE_INFO_WORKERS, DISCOVERY_TIMEOUT, SSDP_ADDRESS, \
+    SSDP_RESEND_DELAY
+from pyku.roku import Roku
+
+
+def parse_ssdp_response(data: bytes) -> Union[None, dict]:
+    """
+    Parses an M-SEARCH response's headers, keeping header names as sent
+    :param data: raw datagram
+    :return: header -> value, None if the datagram isn't an SSDP response with a LOCATION
+    """
+    try:
+        lines: List[str] = data.decode('utf8').split('\r\n')
+    except UnicodeDecodeError:
+        return None
+
+    if not lines[0].startswith('HTTP/'):
+        return None
+
+    headers: dict = {}
+    for line in lines[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip()] = value.strip()
+
+    for key in list(headers.keys()):
+        if key.upper() == 'LOCATION' and key != 'LOCATION':
+            headers['LOCATION'] = headers.pop(key)
+
+    return headers if 'LOCATION' in headers else None
+
+
+def device_target(value: str) -> dict:
+    """
+    Turns a --device value into a target, ip addresses match by ip, anything else by serial number or device name
+    :param value: ip address, serial number or device name
+    :return: target dict, same keys as a Rokus config entry
+    """
+    try:
+        ipaddress.ip_address(value)
+        return {'ip_address': value}
+    except ValueError:
+        return {'serial_number': value, 'name': value}
+
+
+def target_matches(target: dict, roku: Roku) -> bool:
+    """
+    Checks if a device is the one a target or Rokus config entry names
+    :param target: dict with any of ip_address, serial_number and name
+    :param roku: Roku device with device-info
+    :return:
+    """
+    ip_address: Union[None, str] = target.get('ip_address', None)
+    if ip_address and roku.get_ip_address() == str(ip_address):
+        return True
+
+    serial_number: Union[None, str] = target.get('serial_number', None)
+    if serial_number and str(roku.serial_number or '').lower() == str(serial_number).lower():
+        return True
+
+    name: Union[None, str] = target.get('name', None)
+    device_names: List[str] = [
+        str(device_name).lower()
+        for device_name in [roku.user_device_name, roku.friendly_device_name, roku.default_device_name]
+        if device_name
+    ]
+
+    return bool(name) and str(name).lower() in device_names
+
+
+class SsdpProtocol(asyncio.DatagramProtocol):
+    """
+    Hands each M-SEARCH response to a callback as it arrives
+
+    *Attributes:
+        on_response (Callable): Called with the parsed headers of each response
+    """
+    def __init__(self, on_response: Callable[[dict], None]):
+        self.on_response: Callable[[dict], None] = on_response
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        headers: Union[None, dict] = parse_ssdp_response(data)
+        if headers is not None:
+            self.on_response(headers)
+
+    def error_received(self, exc: Exception) -> None:
+        pass
+
+
+class DiscoveryEngine:
+    """
+    Sends an M-SEARCH and fetches each answering device's info right away, stopping once every target answered
+
+    *Attributes:
+        timeout (float): Seconds to wait for M-SEARCH responses when targets don't all answer
+        fetch_timeout (float): Seconds each device has to answer device-info
+        workers (int): Max number of device-info fetches at once
+        search_target (str): SSDP search target
+        search_address (tuple): Address M-SEARCH is sent to, the SSDP multicast group by default
+
+    *methods
+        search_message() -> bytes:
+
+        search(transport: asyncio.DatagramTransport) -> None:
+
+        stream(targets: List[dict]) -> AsyncIterator[Tuple[Roku, Union[None, Exception]]]:
+
+        discover(targets: List[dict], on_device: Callable) -> List[Roku]:
+    """
+    def __init__(
+        self,
+        timeout: float = DISCOVERY_TIMEOUT,
+        fetch_timeout: float = DEVICE_INFO_TIMEOUT,
+        workers: int = DEVICE_INFO_WORKERS,
+        search_target: str = 'roku:ecp',
+        search_address: tuple = SSDP_ADDRESS
+    ):
+        self.timeout: float = timeout
+        self.fetch_timeout: float = fetch_timeout
+        self.workers: int = workers
+        self.search_target: str = search_target
+        self.search_address: tuple = search_address
+
+    def search_message(self) -> bytes:
+        """
+        Builds the M-SEARCH request, devices answer within MX seconds
+        """
+        return f'M-SEARCH * HTTP/1.1\r\n' \
+               f'HOST:{self.search_address[0]}:{self.search_address[1]}\r\n' \
+               f'ST:{self.search_target}\r\n' \
+               f'MX:{max(1, int(self.timeout) - 1)}\r\n' \
+               f'MAN:"ssdp:discover"\r\n' \
+               f'\r\n'.encode()
+
+    def search(self, transport: asyncio.DatagramTransport) -> None:
+        """
+        Sends an M-SEARCH, it's sent twice since multicast UDP gets dropped
+        """
+        if not transport.is_closing():
+            transport.sendto(self.search_message(), self.search_address)
+
+    async def stream(
+        self,
+        targets: Union[None, List[dict]] = None
+    ) -> AsyncIterator[Tuple[Roku, Union[None, Exception]]]:
+        """
+        Yields devices as their device-info arrives
+        :param targets: Rokus config entries or --device targets, when all have answered discovery stops early
+        :return: (device, None) for each reachable device, (device, error) for devices whose device-info failed
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        fetched: asyncio.Queue = asyncio.Queue()
+        locations: Set[str] = set()
+        fetches: List[asyncio.Future] = []
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=self.workers)
+
+        def on_response(headers: dict) -> None:
+            location: str = headers['LOCATION']
+            if location in locations:
+                return
+            locations.add(location)
+
+            roku: Roku = Roku(location=location, discovery_data=headers)
+            fetch: asyncio.Future = loop.run_in_executor(executor, roku.fetch_device_info, self.fetch_timeout)
+            fetch.add_done_callback(
+                lambda done: None if done.cancelled() else fetched.put_nowait((roku, done.exception()))
+            )
+            fetches.append(fetch)
+
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: SsdpProtocol(on_response),
+            local_addr=('0.0.0.0', 0),
+            family=socket.AF_INET
+        )
+        transport.get_extra_info('socket').setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        unmatched: List[dict] = list(targets or [])
+        deadline: float = loop.time() + self.timeout
+        delivered: int = 0
+
+        self.search(transport)
+        resend: asyncio.TimerHandle = loop.call_later(SSDP_RESEND_DELAY, self.search, transport)
+        try:
+            while True:
+                remaining: float = deadline - loop.time()
+                outstanding: int = len(fetches) - delivered
+                if remaining <= 0 and outstanding == 0:
+                    break
+
+                if remaining <= 0:
+                    # the scan window is over, only wait on fetches already started
+                    transport.close()
+                try:
+                    roku, error = await asyncio.wait_for(fetched.get(), remaining if remaining > 0 else None)
+                except asyncio.TimeoutError:
+                    continue
+                delivered += 1
+
+                yield roku, error
+
+                if error is None and len(unmatched) > 0:
+                    unmatched = [target for target in unmatched if not target_matches(target, roku)]
+                    if len(unmatched) == 0:
+                        break
+        finally:
+            resend.cancel()
+            transport.close()
+            for fetch in fetches:
+                fetch.cancel()
+            executor.shutdown(wait=False)
+
+    def discover(
+        self,
+        targets: Union[None, List[dict]] = None,
+        on_device: Union[None, Callable[[Roku, Union[None, Exception]], None]] = None
+    ) -> List[Roku]:
+        """
+        Runs stream to completion from sync code
+        :param targets: Rokus config entries or --device targets, when all have answered discovery stops early
+        :param on_device: called with each device and its device-info error, if any, as it answers
+        :return: reachable devices, in the order they answered
+        """
+        async def collect() -> List[Roku]:
+            rokus: List[Roku] = []
+            async for roku, error in self.stream(targets):
+                if on_device is not None:
+                    on_device(roku, error)
+                if error is None:
+                    rokus.append(roku)
+
+            return rokus
+
+        return asyncio.run(collect())
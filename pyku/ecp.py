@@ -0,0 +1,183 @@
+# coding=utf-8
+"""
+Usage:
+    Keypresses over a keep-alive ECP (http://{ip}:8060) session, and key scripts
+
+    Key scripts are keys separated by spaces or commas:
+        down up select - keys, see KEYPRESS_COMMANDS
+        down*3 - a key repeated
+        "some text" - text, sent a character at a time as Lit_ keys
+        Lit_a - a single literal character
+        wait:1.5 - pause for seconds
+
+ToDos:
+"""
+# standard lib imports
+import re
+import shlex
+import time
+from functools import lru_cache
+from typing import FrozenSet, List
+from urllib.parse import quote
+# third party lib imports
+import requests
+from requests.adapters import HTTPAdapter
+# project imports
+from pyku.constants import ECP_KEY_DELAY, ECP_TIMEOUT, FIND_REMOTE_COMMAND, KEYPRESS_COMMANDS, TV_KEYPRESS_COMMANDS
+
+LITERAL_PREFIX: str = 'Lit_'
+WAIT_PREFIX: str = 'wait:'
+REPEATED_KEY: re.Pattern = re.compile(r'^(?P<key>[A-Za-z0-9_]+)\*(?P<count>\d+)$')
+
+
+@lru_cache(maxsize=None)
+def allowed_commands(is_tv: bool, find_remote_is_possible: bool) -> FrozenSet[str]:
+    """
+    Keys a device accepts, there are only four kinds of device so each set is built once
+    :param is_tv: flag for Roku TVs, which add volume, power, channel and input keys
+    :param find_remote_is_possible: flag for devices that can ping the remote
+    :return:
+    """
+    commands: List[str] = list(KEYPRESS_COMMANDS)
+
+    if find_remote_is_possible:
+        commands.append(FIND_REMOTE_COMMAND)
+
+    if is_tv:
+        commands += TV_KEYPRESS_COMMANDS
+
+    return frozenset(commands)
+
+
+def text_to_keys(text: str) -> List[str]:
+    """
+    Turns text into Lit_ keys, one per character
+    :param text: text to type
+    :return:
+    """
+    return [f'{LITERAL_PREFIX}{quote(character, safe="")}' for character in text]
+
+
+def parse_key_script(script: str) -> List[str]:
+    """
+    Expands a key script into keys, see module docs for the syntax
+    :param script: key script
+    :exception ValueError if the script's quotes aren't closed
+    :return: keys and wait: steps in order
+    """
+    lexer: shlex.shlex = shlex.shlex(script, posix=False)
+    lexer.whitespace += ','
+    lexer.whitespace_split = True
+    lexer.commenters = '#'
+
+    keys: List[str] = []
+    for token in lexer:
+        repeated = REPEATED_KEY.match(token)
+        if token[0] in '"\'' and len(token) > 1 and token[-1] == token[0]:
+            keys += text_to_keys(token[1:-1])
+        elif repeated is not None:
+            keys += [repeated.group('key')] * int(repeated.group('count'))
+        else:
+            keys.append(token)
+
+    return keys
+
+
+def validate_keys(keys: List[str], allowed: FrozenSet[str]) -> None:
+    """
+    Checks every key before any are sent, so a typo doesn't leave the UI halfway through a script
+    :param keys: keys and wait: steps
+    :param allowed: device's allowed commands
+    :exception if any key is unknown
+    :return:
+    """
+    unknown: List[str] = []
+    for key in keys:
+        if key.startswith(LITERAL_PREFIX) and len(key) > len(LITERAL_PREFIX):
+            continue
+
+        if key.startswith(WAIT_PREFIX):
+            try:
+                float(key[len(WAIT_PREFIX):])
+                continue
+            except ValueError:
+                pass
+
+        if key.lower() not in allowed:
+            unknown.append(key)
+
+    if len(unknown) > 0:
+        raise Exception(f'unknown command {", ".join(unknown)}')
+
+
+class EcpClient:
+    """
+    One keep-alive session per device, so a script of thousands of keys reuses one connection
+
+    *Attributes:
+        location (str): Device's ECP location, e.g. http://{ip}:8060/
+        allowed (FrozenSet[str]): Keys the device accepts
+        session (requests.Session): Pooled session
+        timeout (float): Seconds to wait on each keypress
+
+    *methods
+        keypress(key: str) -> None:
+
+        send_keys(keys: List[str], delay: float) -> int:
+
+        close() -> None:
+    """
+    def __init__(self, location: str, allowed: FrozenSet[str], timeout: float = ECP_TIMEOUT):
+        self.location: str = location
+        self.allowed: FrozenSet[str] = allowed
+        self.timeout: float = timeout
+        self.session: requests.Session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+    def post_key(self, key: str) -> None:
+        """
+        Sends a single validated key
+        """
+        response: requests.Response = self.session.post(f'{self.location}keypress/{key}', timeout=self.timeout)
+        response.raise_for_status()
+
+    def keypress(self, key: str) -> None:
+        """
+        Sends a key
+        :param key: key, e.g. home or Lit_a
+        :exception if the key is unknown
+        :exception requests.RequestException if the device didn't accept it
+        :return:
+        """
+        validate_keys([key], self.allowed)
+        self.post_key(key)
+
+    def send_keys(self, keys: List[str], delay: float = ECP_KEY_DELAY) -> int:
+        """
+        Sends keys in order, waiting delay seconds between keys so the UI keeps up
+        :param keys: keys and wait: steps, e.g. from parse_key_script
+        :param delay: seconds between keys
+        :exception if any key is unknown, nothing is sent then
+        :exception requests.RequestException if the device didn't accept a key
+        :return: number of keys sent
+        """
+        validate_keys(keys, self.allowed)
+
+        sent: int = 0
+        for key in keys:
+            if key.startswith(WAIT_PREFIX):
+                time.sleep(float(key[len(WAIT_PREFIX):]))
+                continue
+
+            if sent > 0 and delay > 0:
+                time.sleep(delay)
+            self.post_key(key)
+            sent += 1
+
+        return sent
+
+    def close(self) -> None:
+        """
+        Closes the session's connection
+        """
+        self.session.close()
@@ -0,0 +1,187 @@
+# coding=utf-8
+"""
+Usage:
+    Resolves a channel's Files globs into an ordered file list with a single walk of the channel root
+
+ToDos:
+"""
+# standard lib imports
+import os
+import re
+from pathlib import Path
+from typing import List, NamedTuple, Pattern, Tuple
+
+
+class ChannelFile(NamedTuple):
+    """
+    A resolved channel file
+
+    *Attributes:
+        path (Path): File on disk
+        relative (str): Posix path relative to the channel root
+        size (int): Size in bytes from the walk's stat
+        mtime (int): Modified time in ns from the walk's stat
+    """
+    path: Path
+    relative: str
+    size: int
+    mtime: int
+
+    @classmethod
+    def from_path(cls, path: Path, relative: str) -> 'ChannelFile':
+        """
+        Creates a ChannelFile by stat'ing path
+        """
+        stat: os.stat_result = path.stat()
+
+        return cls(path, relative, stat.st_size, stat.st_mtime_ns)
+
+# regex for '**', any number of directories that don't start with a dot
+ANY_DIRS: str = '(?:(?!\\.)[^/]+/)*'
+
+
+def translate_segment(segment: str) -> str:
+    """
+    Translates one glob path segment into a regex, wildcards don't match a leading dot like glob.glob
+    :param segment: glob segment without separators
+    :return: regex source
+    """
+    regex: str = ''
+    index: int = 0
+    while index < len(segment):
+        char: str = segment[index]
+        if char == '*':
+            regex += '[^/]*'
+        elif char == '?':
+            regex += '[^/]'
+        elif char == '[':
+            end: int = segment.find(']', index + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body: str = segment[index + 1:end].replace('\\', '\\\\')
+                if body.startswith('!'):
+                    body = f'^{body[1:]}'
+                regex += f'[{body}]'
+                index = end
+        else:
+            regex += re.escape(char)
+        index += 1
+
+    if segment[:1] in ('*', '?', '['):
+        regex = f'(?!\\.){regex}'
+
+    return regex
+
+
+class GlobPattern:
+    """
+    Compiled Files glob, '**' matches any number of directories that don't start with a dot
+
+    *Attributes:
+        pattern (str): Original glob
+        segments (List[Pattern]): Compiled segments, None for '**'
+        regex (Pattern): Compiled full pattern
+
+    *methods
+        matches(relative: str) -> bool:
+
+        may_match_below(parts: Tuple[str, ...]) -> bool:
+    """
+    def __init__(self, pattern: str):
+        self.pattern: str = pattern
+        parts: List[str] = [part for part in pattern.replace('\\', '/').strip('/').split('/') if part not in ('', '.')]
+        self.segments: list = [None if part == '**' else re.compile(translate_segment(part)) for part in parts]
+
+        regex: str = ''
+        for index, part in enumerate(parts):
+            if part == '**':
+                regex += ANY_DIRS if index < len(parts) - 1 else f'{ANY_DIRS}(?!\\.)[^/]*'
+            else:
+                regex += translate_segment(part) + ('/' if index < len(parts) - 1 else '')
+        self.regex: Pattern = re.compile(regex)
+
+    def matches(self, relative: str) -> bool:
+        """
+        Checks a posix relative path against the whole pattern
+        """
+        return self.regex.fullmatch(relative) is not None
+
+    def may_match_below(self, parts: Tuple[str, ...]) -> bool:
+        """
+        Checks if anything inside a directory could match, used to prune the walk
+        :param parts: the directory's relative path split into names
+        """
+        for index, part in enumerate(parts):
+            if index >= len(self.segments):
+                return False
+            segment = self.segments[index]
+            if segment is None:
+                return True
+            if segment.fullmatch(part) is None:
+                return False
+
+        return len(parts) < len(self.segments)
+
+
+class FileSetResolver:
+    """
+    Walks a channel root once with os.scandir resolving include and exclude globs. A matched
+    directory includes everything below it, matching how staging copied matched directories.
+
+    *Attributes:
+        root (Path): Channel root
+        includes (List[GlobPattern]): Compiled Files globs
+        excludes (List[GlobPattern]): Compiled Exclude globs
+
+    *methods
+        resolve() -> List[ChannelFile]:
+    """
+    def __init__(self, root: Path, includes: List[str], excludes: List[str] = None):
+        self.root: Path = root
+        self.includes: List[GlobPattern] = [GlobPattern(pattern) for pattern in includes]
+        self.excludes: List[GlobPattern] = [GlobPattern(pattern) for pattern in excludes or []]
+
+    def is_excluded(self, relative: str) -> bool:
+        """
+        Checks a posix relative path against the exclude globs
+        """
+        return any(exclude.matches(relative) for exclude in self.excludes)
+
+    def resolve(self) -> List[ChannelFile]:
+        """
+        Resolves the file set
+        :return: de-duplicated files sorted by relative path
+        """
+        found: List[ChannelFile] = []
+        self.walk(str(self.root), (), False, found)
+        found.sort(key=lambda channel_file: channel_file.relative)
+
+        return found
+
+    def walk(self, directory: str, parts: Tuple[str, ...], included: bool, found: List[ChannelFile]) -> None:
+        """
+        Scans one directory, recursing into directories that are included or could hold matches
+        :param directory: directory to scan
+        :param parts: the directory's relative path split into names
+        :param included: if an ancestor directory matched an include glob
+        :param found: list matches are appended to
+        """
+        try:
+            entries = list(os.scandir(directory))
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return
+
+        for entry in entries:
+            entry_parts: Tuple[str, ...] = parts + (entry.name,)
+            relative: str = '/'.join(entry_parts)
+            if self.is_excluded(relative):
+                continue
+
+            entry_included: bool = included or any(include.matches(relative) for include in self.includes)
+            if entry.is_dir():
+                if entry_included or any(include.may_match_below(entry_parts) for include in self.includes):
+                    self.walk(entry.path, entry_parts, entry_included, found)
+            elif entry_included and entry.is_file():
+                stat: os.stat_result = entry.stat()
+                found.append(ChannelFile(Path(entry.path), relative, stat.st_size, stat.st_mtime_ns))
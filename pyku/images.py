@@ -0,0 +1,182 @@
+# coding=utf-8
+"""
+Usage:
+    Scales and recompresses a channel's images for a device resolution, e.g. FHD artwork for HD only devices
+
+    transcoder = ImageTranscoder(channel.channel_config.cache_dir, 'hd', 1080)
+    channel_files = transcoder.transcode(channel_files)
+
+    Transcoded images are cached by source hash, profile and quality in OutDir/.pyku/images, so rebuilds only transcode
+    changed images. Needs Pillow, pip3 install pyku[images], without it images are left as they are.
+
+ToDos:
+"""
+# standard lib imports
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Union
+# third party lib imports
+import click
+# project imports
+from pyku.constants import IMAGE_CACHE_DIR, IMAGE_DIRS, IMAGE_EXTENSIONS, IMAGE_INDEX, IMAGE_PROFILES, \
+    UI_RESOLUTION_PROFILES
+from pyku.fileset import ChannelFile
+from pyku.staging import FileIndex
+
+
+def pillow_available() -> bool:
+    """
+    Checks if Pillow can be imported, it's an optional dependency
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+def design_height(manifest_data: Union[None, dict]) -> int:
+    """
+    Returns the ui height the channel's artwork is made for, the highest of the manifest's ui_resolutions
+    :param manifest_data: parsed manifest
+    :return: height in pixels, FHD when the manifest doesn't say
+    """
+    resolutions: List[str] = str((manifest_data or {}).get('ui_resolutions', '')).lower().split(',')
+    heights: List[int] = [IMAGE_PROFILES[resolution.strip()] for resolution in resolutions
+                          if resolution.strip() in IMAGE_PROFILES]
+
+    return max(heights) if heights else IMAGE_PROFILES['fhd']
+
+
+def profile_for_device_info(device_info: Union[None, dict]) -> Union[None, str]:
+    """
+    Picks the image profile for a device from its device-info ui-resolution
+    :param device_info: raw ECP device-info fields
+    :return: profile name, None when the device doesn't report its ui resolution
+    """
+    ui_resolution: str = str((device_info or {}).get('ui-resolution', '')).lower()
+
+    return UI_RESOLUTION_PROFILES.get(ui_resolution, None)
+
+
+def is_transcodable(relative: str) -> bool:
+    """
+    Checks if a channel file is an image the transcoder handles
+    """
+    return relative.split('/', 1)[0] in IMAGE_DIRS and \
+        os.path.splitext(relative)[1].lower() in IMAGE_EXTENSIONS and \
+        not relative.lower().endswith('.9.png')
+
+
+def transcode_image(source: str, target: str, scale: float, quality: int) -> bool:
+    """
+    Scales an image and writes it recompressed, run in a worker process. Keeps the source when the result
+    isn't smaller or Pillow can't read it.
+    :param source: image to transcode
+    :param target: where the transcoded image is written
+    :param scale: factor to scale width and height by
+    :param quality: JPEG quality
+    :return: True if the transcoded image was kept
+    """
+    from PIL import Image
+
+    temp_target: str = f'{target}.tmp'
+    resampling = getattr(Image, 'Resampling', Image).LANCZOS
+    try:
+        with Image.open(source) as image:
+            size: tuple = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            resized = image.resize(size, resampling)
+            if os.path.splitext(source)[1].lower() in ['.jpg', '.jpeg']:
+                if resized.mode not in ['RGB', 'L']:
+                    resized = resized.convert('RGB')
+                resized.save(temp_target, 'JPEG', quality=quality, optimize=True)
+            else:
+                resized.save(temp_target, 'PNG', optimize=True)
+        kept: bool = os.path.getsize(temp_target) < os.path.getsize(source)
+    except OSError:
+        # not an image Pillow can decode, ship it as it is
+        kept = False
+
+    if not kept:
+        shutil.copyfile(source, temp_target)
+    os.replace(temp_target, target)
+
+    return kept
+
+
+class ImageTranscoder:
+    """
+    Transcodes a channel's images for one profile on a process pool, caching the results
+
+    *Attributes:
+        cache_dir (Path): Transcoded images of this profile
+        index (FileIndex): Source image hashes, so unchanged images aren't read again
+        profile (str): Image profile, a key of IMAGE_PROFILES
+        scale (float): Factor images are scaled by, 1 or more leaves them as they are
+        quality (int): JPEG quality
+        workers (int): Size of the process pool, 0 uses the cpu count
+
+    *methods
+        transcode(channel_files: List[ChannelFile]) -> List[ChannelFile]:
+    """
+    def __init__(self, pyku_cache_dir: Path, profile: str, source_height: int, quality: int = 85, workers: int = 0):
+        self.cache_dir: Path = pyku_cache_dir / IMAGE_CACHE_DIR / profile
+        self.index: FileIndex = FileIndex(pyku_cache_dir / IMAGE_INDEX)
+        self.profile: str = profile
+        self.scale: float = IMAGE_PROFILES[profile] / source_height
+        self.quality: int = quality
+        self.workers: int = workers if workers > 0 else (os.cpu_count() or 1)
+
+    def transcode(self, channel_files: List[ChannelFile]) -> List[ChannelFile]:
+        """
+        Swaps the images in channel_files for transcoded copies, transcoding those not cached yet
+        :param channel_files: resolved channel files
+        :return: channel files with the same relative paths, images pointing at their transcoded copies
+        """
+        if self.scale >= 1:
+            return channel_files
+        if not pillow_available():
+            click.echo(f'ImageProfile {self.profile} needs Pillow, pip3 install pyku[images], '
+                       f'images are left as they are')
+            return channel_files
+
+        targets: Dict[str, Path] = {}
+        pending: Dict[str, ChannelFile] = {}
+        for channel_file in channel_files:
+            if is_transcodable(channel_file.relative):
+                extension: str = os.path.splitext(channel_file.relative)[1].lower()
+                target: Path = self.cache_dir / f'{self.index.digest(channel_file)}_{self.quality}{extension}'
+                targets[channel_file.relative] = target
+                if not target.exists():
+                    pending[str(target)] = channel_file
+        self.index.save()
+
+        if pending:
+            if not self.cache_dir.exists():
+                self.cache_dir.mkdir(parents=True)
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as executor:
+                list(executor.map(
+                    transcode_image,
+                    [str(channel_file.path) for channel_file in pending.values()],
+                    list(pending),
+                    [self.scale] * len(pending),
+                    [self.quality] * len(pending)
+                ))
+
+        # drop images no longer in the channel, e.g. replaced artwork
+        current: set = {target.name for target in targets.values()}
+        if self.cache_dir.exists():
+            for cached in self.cache_dir.iterdir():
+                if cached.name not in current:
+                    cached.unlink()
+
+        click.echo(f'images | {len(pending)} transcoded, {len(targets) - len(pending)} cached for {self.profile}')
+
+        return [
+            ChannelFile.from_path(targets[channel_file.relative], channel_file.relative)
+            if channel_file.relative in targets else channel_file
+            for channel_file in channel_files
+        ]
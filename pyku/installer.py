@@ -0,0 +1,332 @@
+# coding=utf-8
+"""
+Usage:
+    In process client for a Roku's plugin installer (http://{ip}/plugin_install)
+
+ToDos:
+"""
+# standard lib imports
+import io
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from re import Match
+from typing import BinaryIO, Iterable, Iterator, List, Tuple, Union
+# third party lib imports
+import requests
+from requests.auth import HTTPDigestAuth
+# project imports
+from pyku.profiling import PROFILER, span
+
+INSTALLER_CONNECT_TIMEOUT: float = 10
+# the installer only answers once the uploaded channel is unpacked and launched
+INSTALLER_READ_TIMEOUT: float = 120
+
+
+def parse_plugin_installer_output(output_html: str) -> list:
+    """
+    Parsed plugin installer response html for installer messages
+    :param output_html:
+    :return:
+    """
+    messages: list = re.findall(r'Shell\.create\(.+\)\.trigger\(.+\)\.trigger\(.+\)', output_html)
+    temp: list = []
+    for message in messages:
+        status_message_match: Match = re.search(r'.\(\'Set message type\',.+?\)', message)
+        status_message: str = message[status_message_match.start(): status_message_match.end()]
+        status_message_arr: list = re.split(',', status_message)
+        status: str = re.sub(r'[^A-Za-z0-9]+', '', status_message_arr[1])
+
+        message_content_match: Match = re.search(r'.\(\'Set message content\',.+?\)', message)
+        message_content: str = message[message_content_match.start(): message_content_match.end()]
+        message_content_arr: list = re.split(',', message_content)
+        content_message: str = re.sub(r'[^A-Za-z0-9]+', '', message_content_arr[1])
+
+        temp.append({
+            'status': status,
+            'msg': content_message
+        })
+
+    return temp
+
+
+class MultipartFileBody(io.RawIOBase):
+    """
+    multipart/form-data body that streams its file part from disk. It has a length so requests sends a
+    Content-Length, and it can seek so digest auth can rewind it to resend after a 401.
+
+    *Attributes:
+        boundary (str): Multipart boundary
+        content_type (str): Content-Type header value for the body
+        parts (list): Body segments, bytes like or (file object, size)
+        length (int): Total body size
+        position (int): Current read offset
+        sent_at (Union[None, int]): perf_counter_ns when the last byte was read, i.e. the upload finished
+    """
+    def __init__(self, fields: List[Tuple[str, str]], file_field: str, archive: Union[None, Path, BinaryIO]):
+        super().__init__()
+        self.boundary: str = uuid.uuid4().hex
+        self.content_type: str = f'multipart/form-data; boundary={self.boundary}'
+        self.parts: list = []
+        self.file: Union[None, BinaryIO] = None
+
+        head: str = ''
+        for name, value in fields:
+            head += f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+
+        if archive is None:
+            head += f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"\r\n\r\n\r\n'
+            self.parts.append(head.encode())
+        else:
+            file_name: str = archive.name if isinstance(archive, Path) else 'channel.zip'
+            head += f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; ' \
+                    f'filename="{file_name}"\r\nContent-Type: application/zip\r\n\r\n'
+            if isinstance(archive, Path):
+                self.file = archive.open('rb')
+                self.parts += [head.encode(), (self.file, archive.stat().st_size), b'\r\n']
+            else:
+                # in memory archives are shared by concurrent deploys, so read them through a view not seek
+                content = archive.getbuffer() if hasattr(archive, 'getbuffer') else archive.read()
+                self.parts += [head.encode(), content, b'\r\n']
+
+        self.parts.append(f'--{self.boundary}--\r\n'.encode())
+        self.length: int = sum(part[1] if isinstance(part, tuple) else len(part) for part in self.parts)
+        self.position: int = 0
+        self.sent_at: Union[None, int] = None
+
+    def __len__(self) -> int:
+        return self.length
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.length
+        self.position = max(0, min(offset, self.length))
+
+        return self.position
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Reads from the segment holding the current position, at most size bytes
+        """
+        if size is None or size < 0:
+            size = self.length - self.position
+
+        chunks: list = []
+        start: int = 0
+        for part in self.parts:
+            part_size: int = part[1] if isinstance(part, tuple) else len(part)
+            if size > 0 and start <= self.position < start + part_size:
+                offset: int = self.position - start
+                count: int = min(size, part_size - offset)
+                if isinstance(part, tuple):
+                    part[0].seek(offset)
+                    chunk: bytes = part[0].read(count)
+                else:
+                    chunk = bytes(part[offset:offset + count])
+                chunks.append(chunk)
+                self.position += len(chunk)
+                size -= len(chunk)
+            start += part_size
+
+        if self.position == self.length and self.sent_at is None:
+            self.sent_at = time.perf_counter_ns()
+
+        return b''.join(chunks)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+        for part in self.parts:
+            if isinstance(part, memoryview):
+                part.release()
+        super().close()
+
+
+class MultipartStreamBody:
+    """
+    multipart/form-data body whose file part comes from an iterable of chunks, e.g. an archive still being written.
+    It has no length, so requests sends it chunked.
+
+    *Attributes:
+        boundary (str): Multipart boundary
+        content_type (str): Content-Type header value for the body
+        head (bytes): Fields and the file part's headers
+        chunks (Iterable[bytes]): File content
+        sent_at (Union[None, int]): perf_counter_ns when the last chunk was handed to requests
+    """
+    def __init__(self, fields: List[Tuple[str, str]], file_field: str, file_name: str, chunks: Iterable[bytes]):
+        self.boundary: str = uuid.uuid4().hex
+        self.content_type: str = f'multipart/form-data; boundary={self.boundary}'
+        head: str = ''
+        for name, value in fields:
+            head += f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        head += f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; ' \
+                f'filename="{file_name}"\r\nContent-Type: application/zip\r\n\r\n'
+        self.head: bytes = head.encode()
+        self.chunks: Iterable[bytes] = chunks
+        self.sent_at: Union[None, int] = None
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self.head
+        for chunk in self.chunks:
+            yield chunk
+        yield f'\r\n--{self.boundary}--\r\n'.encode()
+        self.sent_at = time.perf_counter_ns()
+
+
+class InstallerDigestAuth(HTTPDigestAuth):
+    """
+    Digest auth that doesn't answer a 401 by resending a streamed body, its chunks were already sent and can't be
+    read again. The 401 is returned as is and the upload is made again from the finished archive.
+    """
+    def handle_401(self, r: requests.Response, **kwargs) -> requests.Response:
+        if isinstance(r.request.body, MultipartStreamBody):
+            return r
+
+        return super().handle_401(r, **kwargs)
+
+
+class PluginInstallerClient:
+    """
+    One keep-alive session per device, the digest nonce from the first request is reused by the next
+    ones so delete and replace don't each pay a 401 round trip
+
+    *Attributes:
+        host (str): Device ip address, optionally with port
+        session (requests.Session): Pooled session with digest auth
+        timeout (tuple): (connect, read) timeouts in seconds
+
+    *methods
+        authenticate(refresh: bool) -> Union[None, dict]:
+
+        submit(mysubmit: str, archive: Union[None, Path, BinaryIO, Iterable[bytes]]) -> list:
+
+        delete() -> list:
+
+        replace(archive: Union[Path, BinaryIO, Iterable[bytes]]) -> list:
+    """
+    def __init__(self, host: str, user_name: str, password: str):
+        self.host: str = host
+        self.session: requests.Session = requests.Session()
+        self.session.auth = InstallerDigestAuth(user_name, password)
+        self.timeout: tuple = (INSTALLER_CONNECT_TIMEOUT, INSTALLER_READ_TIMEOUT)
+        self._local: threading.local = threading.local()
+
+    @property
+    def url(self) -> str:
+        """
+        Plugin installer url
+        """
+        return f'http://{self.host}/plugin_install'
+
+    @staticmethod
+    def error(msg: str, http_status: Union[None, int] = None) -> dict:
+        """
+        Builds a structured error result
+        """
+        return {'status': 'error', 'msg': msg, 'http_status': http_status}
+
+    def authenticate(self, refresh: bool = False) -> Union[None, dict]:
+        """
+        Gets a digest nonce with a bodiless request so uploads aren't sent twice because of a 401.
+        requests keeps the nonce per thread, so this runs once per thread.
+        :param refresh: flag to get a fresh nonce even if this thread has one, streamed uploads can't be resent
+        :return: error result if the device couldn't be reached or rejected the credentials
+        """
+        if getattr(self._local, 'authenticated', False) and not refresh:
+            return None
+
+        try:
+            with span('installer auth', self.host):
+                response: requests.Response = self.session.get(self.url, timeout=self.timeout)
+        except requests.RequestException as error:
+            return PluginInstallerClient.error(f'unable to reach {self.host}: {error}')
+
+        if response.status_code == requests.codes.unauthorized:
+            return PluginInstallerClient.error('authentication failed, check username and password', 401)
+
+        self._local.authenticated = True
+
+        return None
+
+    def submit(self, mysubmit: str, archive: Union[None, Path, BinaryIO, Iterable[bytes]] = None) -> list:
+        """
+        Posts a plugin installer form
+        :param mysubmit: installer action, e.g. Delete | Replace | Install
+        :param archive: channel archive to upload, streamed from disk when a Path, sent chunked as it's read when
+            an iterable of chunks, e.g. a pyku.streaming.BroadcastReader. Chunks can't be resent, so a streamed
+            upload gets a fresh nonce first and a 401 is returned rather than retried.
+        :return: installer messages, each {'status', 'msg', 'http_status'}
+        """
+        streamed: bool = not (archive is None or isinstance(archive, Path) or hasattr(archive, 'read'))
+        body: Union[MultipartFileBody, MultipartStreamBody]
+        if streamed:
+            body = MultipartStreamBody([('mysubmit', mysubmit)], 'archive', 'channel.zip', archive)
+        else:
+            body = MultipartFileBody([('mysubmit', mysubmit)], 'archive', archive)
+        try:
+            auth_error: Union[None, dict] = self.authenticate(refresh=streamed)
+            if auth_error is not None:
+                return [auth_error]
+
+            started_at: int = time.perf_counter_ns()
+            response: requests.Response = self.session.post(
+                self.url,
+                data=body,
+                headers={'Content-Type': body.content_type},
+                timeout=self.timeout
+            )
+        except requests.RequestException as error:
+            self._local.authenticated = False
+            return [PluginInstallerClient.error(f'{mysubmit} request failed: {error}')]
+        finally:
+            if isinstance(body, MultipartFileBody):
+                body.close()
+            elif hasattr(archive, 'close'):
+                # stop the archive writer waiting on an upload that ended early
+                archive.close()
+
+        # the installer answers once the channel is unpacked and launched, time the upload and the wait apart
+        sent_at: int = body.sent_at or started_at
+        PROFILER.record(f'{mysubmit.lower()} upload', started_at, sent_at, self.host)
+        PROFILER.record('installer response', sent_at, time.perf_counter_ns(), self.host)
+
+        if response.status_code == requests.codes.unauthorized:
+            self._local.authenticated = False
+            if streamed:
+                return [PluginInstallerClient.error(f'{mysubmit} stream was rejected, digest nonce expired', 401)]
+            return [PluginInstallerClient.error('authentication failed, check username and password', 401)]
+
+        messages: list = [
+            {**message, 'http_status': response.status_code}
+            for message in parse_plugin_installer_output(response.text)
+        ]
+        if len(messages) > 0:
+            return messages
+
+        return [PluginInstallerClient.error(f'{mysubmit} returned no installer messages', response.status_code)]
+
+    def delete(self) -> list:
+        """
+        Deletes the installed dev channel
+        """
+        return self.submit('Delete')
+
+    def replace(self, archive: Union[Path, BinaryIO, Iterable[bytes]]) -> list:
+        """
+        Installs archive as the dev channel, replacing any installed one
+        """
+        return self.submit('Replace', archive)
@@ -0,0 +1,124 @@
+# coding=utf-8
+"""
+Usage:
+    Builds a channel's archive in the background while devices are discovered and selected
+
+    build = BackgroundBuild(channel)
+    build.start()
+    try:
+        selected_devices = ...
+    finally:
+        build.wait()
+
+ToDos:
+"""
+# standard lib imports
+import sys
+import threading
+from typing import List, TextIO, Union
+# project imports
+from pyku.channel import Channel
+
+
+class DeferredOutput:
+    """
+    Stands in for stdout, holding back one thread's writes until released so a background build doesn't draw over
+    the device selection prompt. Every other thread writes straight through.
+
+    *Attributes:
+        stream (TextIO): Real stdout
+        thread_id (Union[None, int]): Thread whose writes are held
+        held (List[str]): Held writes
+
+    *methods
+        release() -> None:
+    """
+    def __init__(self, stream: TextIO):
+        self.stream: TextIO = stream
+        self.thread_id: Union[None, int] = None
+        self.held: List[str] = []
+        self._lock: threading.Lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        if threading.get_ident() != self.thread_id:
+            return self.stream.write(text)
+
+        if not isinstance(text, str):
+            raise TypeError(f'write() argument must be str, not {type(text).__name__}')
+        with self._lock:
+            self.held.append(text)
+
+        return len(text)
+
+    def flush(self) -> None:
+        if threading.get_ident() != self.thread_id:
+            self.stream.flush()
+
+    def release(self) -> None:
+        """
+        Writes out everything held
+        """
+        with self._lock:
+            held: List[str] = self.held
+            self.held = []
+        for text in held:
+            self.stream.write(text)
+        self.stream.flush()
+
+    def __getattr__(self, name: str):
+        # isatty, fileno, encoding and the rest come from the real stdout, the prompt needs them
+        return getattr(self.stream, name)
+
+
+class BackgroundBuild:
+    """
+    Runs Channel.build_channel_archive on its own thread
+
+    *Attributes:
+        channel (Channel): Channel being built
+        error (Union[None, BaseException]): What the build raised, if anything
+        output (Union[None, DeferredOutput]): stdout while the build runs
+
+    *methods
+        start() -> None:
+
+        wait() -> None:
+    """
+    def __init__(self, channel: Channel):
+        self.channel: Channel = channel
+        self.error: Union[None, BaseException] = None
+        self.output: Union[None, DeferredOutput] = None
+        self._thread: threading.Thread = threading.Thread(target=self.build, daemon=True)
+
+    def start(self) -> None:
+        """
+        Starts building, the build's output is held until wait
+        """
+        self.output = DeferredOutput(sys.stdout)
+        sys.stdout = self.output
+        self._thread.start()
+
+    def build(self) -> None:
+        """
+        Builds the archive, keeping any error for wait to raise
+        """
+        self.output.thread_id = threading.get_ident()
+        try:
+            self.channel.build_channel_archive()
+        except BaseException as error:
+            self.error = error
+
+    def wait(self) -> None:
+        """
+        Waits for the build, then writes out its output
+        :exception whatever the build raised
+        """
+        self._thread.join()
+        if self.output is not None:
+            if sys.stdout is self.output:
+                sys.stdout = self.output.stream
+            self.output.release()
+            self.output = None
+
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,103 @@
+# coding=utf-8
+"""
+Usage:
+    Decides per device if an archive needs uploading, tracking what was last pushed to each device
+
+ToDos:
+"""
+# standard lib imports
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Union
+# project imports
+from pyku.roku import Roku
+
+PLAN_SKIP: str = 'skip'
+PLAN_REPLACE: str = 'replace'
+
+
+class DeployPlanner:
+    """
+    Keeps the digest of the last archive pushed to each device beside the archive cache
+
+    *Attributes:
+        state_file (Path): JSON file device state is persisted to
+        devices (dict): device key -> {'digest': str, 'dev_app': dict, 'deployed_at': float}
+
+    *methods
+        device_key(roku: Roku) -> str: | static
+
+        plan(roku: Roku, digest: str) -> str:
+
+        record(roku: Roku, digest: str) -> None:
+
+        save() -> None:
+    """
+    def __init__(self, state_file: Path):
+        self.state_file: Path = state_file
+        self.devices: Dict[str, dict] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+        if self.state_file.exists():
+            try:
+                with self.state_file.open('r') as state:
+                    self.devices = json.load(state)
+            except (OSError, ValueError):
+                self.devices = {}
+
+    @staticmethod
+    def device_key(roku: Roku) -> str:
+        """
+        Identifies a device across runs, preferring ids that survive an ip change
+        """
+        return str(roku.serial_number or roku.udn or roku.location)
+
+    def plan(self, roku: Roku, digest: str) -> str:
+        """
+        Queries the device's installed dev app and compares it with what was last pushed
+        :param roku: Roku device to deploy to
+        :param digest: digest of the archive to deploy
+        :return: PLAN_SKIP if the device already runs this archive, else PLAN_REPLACE
+        """
+        with self._lock:
+            record: Union[None, dict] = self.devices.get(DeployPlanner.device_key(roku), None)
+
+        if record is None or record.get('digest') != digest:
+            return PLAN_REPLACE
+
+        dev_app: Union[None, dict] = roku.query_dev_app()
+        if dev_app is None or dev_app != record.get('dev_app'):
+            return PLAN_REPLACE
+
+        return PLAN_SKIP
+
+    def record(self, roku: Roku, digest: str) -> None:
+        """
+        Records a successful upload along with the dev app the device now reports
+        :param roku: Roku device deployed to
+        :param digest: digest of the archive deployed
+        """
+        dev_app: Union[None, dict] = roku.query_dev_app()
+
+        with self._lock:
+            self.devices[DeployPlanner.device_key(roku)] = {
+                'digest': digest,
+                'dev_app': dev_app,
+                'deployed_at': time.time()
+            }
+
+    def save(self) -> None:
+        """
+        Writes device state to disk
+        """
+        with self._lock:
+            if not self.state_file.parent.exists():
+                self.state_file.parent.mkdir(parents=True)
+
+            temp_file: Path = self.state_file.with_suffix('.tmp')
+            with temp_file.open('w') as state:
+                json.dump(self.devices, state, indent=2, sort_keys=True)
+            os.replace(str(temp_file), str(self.state_file))
@@ -0,0 +1,253 @@
+# coding=utf-8
+"""
+Usage:
+    Phase timing, off unless enabled, e.g. by deploy --profile
+
+    with span('staging'):
+        ...
+
+    @profiled('zip')
+    def build(): ...
+
+ToDos:
+"""
+# standard lib imports
+import functools
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Union
+
+
+class Span(NamedTuple):
+    """
+    A timed phase
+
+    *Attributes:
+        name (str): Phase name, e.g. staging, upload
+        start (int): perf_counter_ns when the phase started
+        end (int): perf_counter_ns when the phase ended
+        thread (int): Id of the thread that ran it
+        device (Union[None, str]): Device the phase ran against, if any
+    """
+    name: str
+    start: int
+    end: int
+    thread: int
+    device: Union[None, str]
+
+
+class _NoSpan:
+    """
+    Context manager used while profiling is off
+    """
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+
+NO_SPAN: _NoSpan = _NoSpan()
+
+
+class _ActiveSpan:
+    """
+    Context manager recording a span into a profiler on exit
+    """
+    def __init__(self, profiler: 'Profiler', name: str, device: Union[None, str]):
+        self.profiler: Profiler = profiler
+        self.name: str = name
+        self.device: Union[None, str] = device
+        self.start: int = 0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler.record(self.name, self.start, time.perf_counter_ns(), self.device)
+
+
+class Profiler:
+    """
+    Collects spans from every thread
+
+    *Attributes:
+        enabled (bool): If spans are being recorded
+        origin (int): perf_counter_ns when profiling was enabled, trace timestamps are relative to it
+        started_at (float): Wall clock time profiling was enabled
+        spans (List[Span]): Recorded spans
+
+    *methods
+        enable() -> None:
+
+        span(name: str, device: Union[None, str]) -> context manager:
+
+        record(name: str, start: int, end: int, device: Union[None, str]) -> None:
+
+        summary() -> dict:
+
+        chrome_trace() -> dict:
+
+        write(out_dir: Path, label: str) -> List[Path]:
+    """
+    def __init__(self):
+        self.enabled: bool = False
+        self.origin: int = 0
+        self.started_at: float = 0
+        self.spans: List[Span] = []
+        self._lock: threading.Lock = threading.Lock()
+
+    def enable(self) -> None:
+        """
+        Starts recording spans
+        """
+        self.enabled = True
+        self.origin = time.perf_counter_ns()
+        self.started_at = time.time()
+        self.spans = []
+
+    def span(self, name: str, device: Union[None, str] = None):
+        """
+        Times the with block as a phase
+        :param name: phase name
+        :param device: device the phase runs against, gives the device its own track in the trace
+        :return:
+        """
+        if not self.enabled:
+            return NO_SPAN
+
+        return _ActiveSpan(self, name, device)
+
+    def record(self, name: str, start: int, end: int, device: Union[None, str] = None) -> None:
+        """
+        Records a phase timed elsewhere, e.g. from timestamps taken on another thread
+        :param name: phase name
+        :param start: perf_counter_ns the phase started
+        :param end: perf_counter_ns the phase ended
+        :param device: device the phase ran against
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.spans.append(Span(name, start, end, threading.get_ident(), device))
+
+    def summary(self) -> dict:
+        """
+        Totals per phase, and per device for phases run against devices
+        :return:
+        """
+        with self._lock:
+            spans: List[Span] = list(self.spans)
+
+        def totals(selected: List[Span]) -> Dict[str, dict]:
+            phases: Dict[str, dict] = {}
+            for span in selected:
+                duration: float = (span.end - span.start) / 1e6
+                phase: dict = phases.setdefault(span.name, {'count': 0, 'total_ms': 0.0, 'min_ms': None, 'max_ms': 0.0})
+                phase['count'] += 1
+                phase['total_ms'] += duration
+                phase['min_ms'] = duration if phase['min_ms'] is None else min(phase['min_ms'], duration)
+                phase['max_ms'] = max(phase['max_ms'], duration)
+            for phase in phases.values():
+                for key in ['total_ms', 'min_ms', 'max_ms']:
+                    phase[key] = round(phase[key], 3)
+
+            return phases
+
+        devices: List[str] = sorted({span.device for span in spans if span.device is not None})
+
+        return {
+            'started_at': self.started_at,
+            'wall_ms': round((max((span.end for span in spans), default=self.origin) - self.origin) / 1e6, 3),
+            'phases': totals(spans),
+            'devices': {device: totals([span for span in spans if span.device == device]) for device in devices}
+        }
+
+    def chrome_trace(self) -> dict:
+        """
+        Spans as Chrome trace events, chrome://tracing or https://ui.perfetto.dev open them. Phases run against a
+        device are on that device's track, the rest on the track of the thread that ran them.
+        :return:
+        """
+        with self._lock:
+            spans: List[Span] = list(self.spans)
+
+        tracks: Dict[str, int] = {}
+        events: List[dict] = []
+        for span in sorted(spans, key=lambda recorded: recorded.start):
+            track: str = f'device {span.device}' if span.device is not None else f'thread {span.thread}'
+            if track not in tracks:
+                tracks[track] = len(tracks) + 1
+                events.append({
+                    'name': 'thread_name',
+                    'ph': 'M',
+                    'pid': os.getpid(),
+                    'tid': tracks[track],
+                    'args': {'name': track}
+                })
+            events.append({
+                'name': span.name,
+                'cat': 'device' if span.device is not None else 'pyku',
+                'ph': 'X',
+                'ts': (span.start - self.origin) / 1e3,
+                'dur': (span.end - span.start) / 1e3,
+                'pid': os.getpid(),
+                'tid': tracks[track],
+                'args': {'device': span.device} if span.device is not None else {}
+            })
+
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, out_dir: Path, label: str) -> List[Path]:
+        """
+        Writes the summary and Chrome trace, named by label and start time so runs can be compared
+        :param out_dir: dir to write to
+        :param label: run name, e.g. the command
+        :return: summary and trace paths
+        """
+        if not out_dir.exists():
+            out_dir.mkdir(parents=True)
+
+        stamp: str = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))
+        summary_file: Path = out_dir / f'{label}-{stamp}.json'
+        trace_file: Path = out_dir / f'{label}-{stamp}.trace.json'
+        with summary_file.open('w') as summary:
+            json.dump(self.summary(), summary, indent=2, sort_keys=True)
+        with trace_file.open('w') as trace:
+            json.dump(self.chrome_trace(), trace)
+
+        return [summary_file, trace_file]
+
+
+PROFILER: Profiler = Profiler()
+
+
+def span(name: str, device: Union[None, str] = None):
+    """
+    Times the with block as a phase on the shared profiler
+    :param name: phase name
+    :param device: device the phase runs against
+    :return:
+    """
+    return PROFILER.span(name, device)
+
+
+def profiled(name: str) -> Callable:
+    """
+    Decorator timing every call as a phase on the shared profiler
+    :param name: phase name
+    :return:
+    """
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with PROFILER.span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
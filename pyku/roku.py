@@ -4,32 +4,20 @@ Usage:
     Roku class
 
 ToDos:
-    1. solve auth digest issue with using requests module
-        -  res = requests.post(
-             url=f'http://{self.get_ip_address()}/plugin_install',
-             auth=HTTPDigestAuth(self.user_name, self.password),
-             data=[
-                 ('mysubmit', 'Delete'),
-                 ('archive', '')
-             ],
-             verify=False,
-             stream=True,
-             timeout=10
-         )
 """
 # standard lib imports
-import os
-import re
+import xml.etree.ElementTree as ElementTree
 from pathlib import Path
-from re import Match
-from typing import List, Union
+from typing import BinaryIO, Iterable, List, Union
 # third party lib imports
 import requests
-# from requests.auth import HTTPDigestAuth
 from roku_scanner.custom_types import DeviceInfoAttribute, DiscoveryData, Player, RokuApp
 from roku_scanner.roku import Roku as RokuDevice
 # project imports
-from pyku.constants import KEYPRESS_COMMANDS
+from pyku.constants import ECP_KEY_DELAY, ECP_TIMEOUT, INSTALLER_PORT
+from pyku.ecp import EcpClient, allowed_commands
+from pyku.installer import PluginInstallerClient, parse_plugin_installer_output
+from pyku.profiling import span
 
 
 class Roku(RokuDevice):
@@ -49,6 +37,7 @@ class Roku(RokuDevice):
         default_device_name (DeviceInfoAttribute): Default name used device
         device_id (DeviceInfoAttribute): Unique Roku device ID.
         discovery_data (DiscoveryData): Device discovery data. See custom_types
+        ecp (EcpClient | None): Keep-alive ECP session, created on first use
         expert_pq_enabled (DeviceInfoAttribute):
         find_remote_is_possible (DeviceInfoAttribute): If device has find remote ping capability.
         friendly_device_name (DeviceInfoAttribute): Device name given by user.
@@ -59,6 +48,8 @@ class Roku(RokuDevice):
         has_wifi_extender (DeviceInfoAttribute):
         has_wifi_5G_support (DeviceInfoAttribute):
         headphones_connected (DeviceInfoAttribute):
+        installer (PluginInstallerClient | None): Plugin installer session, created on first use
+        installer_port (int): Plugin installer port, 80 on devices
         is_stick (DeviceInfoAttribute): Is the device a streaming stick.
         is_tv (DeviceInfoAttribute): Is the device a TV.
         keyed_developer_id (DeviceInfoAttribute):
@@ -116,13 +107,27 @@ class Roku(RokuDevice):
 
         get_ip_address() -> str
 
+        get_device_info() -> Union[None, dict]
+
+        load_device_info(device_info: dict)
+
+        fetch_device_info(timeout: float)
+
+        get_ecp() -> EcpClient
+
         send_remote_command(command: str)
 
+        send_keys(keys: List[str], delay: float) -> int
+
         parse_plugin_installer_output(output_html: str) -> list
 
+        get_installer() -> PluginInstallerClient
+
+        query_dev_app() -> Union[None, dict]
+
         delete_dev_app()
 
-        deploy_archive(self, channel_archive: Path)
+        deploy_archive(self, channel_archive: Union[Path, BinaryIO, Iterable[bytes]])
     """
     def __init__(self, location: str, discovery_data: DiscoveryData):
         self.advertising_id: DeviceInfoAttribute = None
@@ -147,6 +152,9 @@ class Roku(RokuDevice):
         self.has_wifi_extender: DeviceInfoAttribute = None
         self.has_wifi_5G_support: DeviceInfoAttribute = None
         self.headphones_connected: DeviceInfoAttribute = None
+        self.installer: Union[None, PluginInstallerClient] = None
+        self.installer_port: int = INSTALLER_PORT
+        self.ecp: Union[None, EcpClient] = None
         self.is_stick: DeviceInfoAttribute = None
         self.is_tv: DeviceInfoAttribute = None
         self.keyed_developer_id: DeviceInfoAttribute = None
@@ -205,6 +213,62 @@ class Roku(RokuDevice):
         """
         return self.location.split(':')[1][2:]
 
+    def get_device_info(self) -> Union[None, dict]:
+        """
+        returns the raw ECP device-info fields fetched for the device
+        :return:
+        """
+        try:
+            return dict(self.data['device_info']['data']['device-info'])
+        except (KeyError, TypeError):
+            return None
+
+    def load_device_info(self, device_info: dict) -> None:
+        """
+        Sets device info attributes from raw ECP device-info fields, e.g. from the device cache,
+        the same way fetch_data does
+        :param device_info: device-info field -> value
+        :return:
+        """
+        self.data = {**self.data, 'device_info': {'data': {'device-info': device_info}}}
+
+        for key, val in device_info.items():
+            obj_key: str = key.replace('-', '_')
+            if hasattr(self, obj_key) and isinstance(val, str):
+                if val.lower() == 'true' or val.lower() == 'false':
+                    setattr(self, obj_key, val.lower() == 'true')
+                else:
+                    setattr(self, obj_key, val)
+
+    def fetch_device_info(self, timeout: float = ECP_TIMEOUT) -> None:
+        """
+        Fetches only ECP device-info, which is all discovery needs, fetch_data also queries apps, the active app
+        and the media player, without timeouts
+        :param timeout: seconds to wait on connecting and on each read
+        :exception requests.RequestException if the device is unreachable, slow or errors
+        :exception ElementTree.ParseError if the response isn't device-info xml
+        :return:
+        """
+        with span('device-info', self.get_ip_address()):
+            res: requests.Response = requests.get(f'{self.location}query/device-info', timeout=timeout)
+            res.raise_for_status()
+            device_info: ElementTree.Element = ElementTree.fromstring(res.content)
+
+        self.load_device_info({field.tag: field.text for field in device_info})
+
+    def get_ecp(self) -> EcpClient:
+        """
+        Returns the device's keep-alive ECP session, its allowed commands are worked out once
+        :return:
+        """
+        if self.ecp is None:
+            self.ecp = EcpClient(
+                self.location,
+                allowed_commands(bool(self.is_tv), bool(self.find_remote_is_possible))
+            )
+
+        return self.ecp
+
     def send_remote_command(self, command: str) -> None:
         """
         sends keypress command to Roku device
@@ -212,31 +276,17 @@ class Roku(RokuDevice):
         :exception if command is unknown
         :return:
         """
-        allowed_commands: list = KEYPRESS_COMMANDS
-
-        if self.find_remote_is_possible:
-            allowed_commands.append('findremote')
-
-        if self.is_tv:
-            allowed_commands.append([
-                'volumedown',
-                'volumemute',
-                'volumeup',
-                'poweroff',
-                'channelup',
-                'channeldown',
-                'inputtuner',
-                'inputhdmi1',
-                'inputhdmi2',
-                'inputhdmi3',
-                'inputhdmi4',
-                'inputav1'
-            ])
-
-        if command.lower() not in allowed_commands:
-            raise Exception('unknown command')
-
-        requests.post(f'{self.location}keypress/{command}')
+        self.get_ecp().keypress(command)
+
+    def send_keys(self, keys: List[str], delay: float = ECP_KEY_DELAY) -> int:
+        """
+        sends a sequence of keypress commands to Roku device
+        :param keys: keys, Lit_ characters and wait: steps, e.g. from pyku.ecp.parse_key_script
+        :param delay: seconds between keys
+        :exception if any key is unknown, nothing is sent then
+        :return: number of keys sent
+        """
+        return self.get_ecp().send_keys(keys, delay)
 
     @staticmethod
     def parse_plugin_installer_output(output_html: str) -> list:
@@ -245,61 +295,62 @@ class Roku(RokuDevice):
         :param output_html:
         :return:
         """
-        messages: list = re.findall(r'Shell\.create\(.+\)\.trigger\(.+\)\.trigger\(.+\)', output_html)
-        temp: list = []
-        for message in messages:
-            status_message_match: Match = re.search(r'.\(\'Set message type\',.+?\)', message)
-            status_message: str = message[status_message_match.start(): status_message_match.end()]
-            status_message_arr: list = re.split(',', status_message)
-            status: str = re.sub(r'[^A-Za-z0-9]+', '', status_message_arr[1])
-
-            message_content_match: Match = re.search(r'.\(\'Set message content\',.+?\)', message)
-            message_content: str = message[message_content_match.start(): message_content_match.end()]
-            message_content_arr: list = re.split(',', message_content)
-            content_message: str = re.sub(r'[^A-Za-z0-9]+', '', message_content_arr[1])
-
-            temp.append({
-                'status': status,
-                'msg': content_message
-            })
-
-        return temp
+        return parse_plugin_installer_output(output_html)
 
-    def delete_dev_app(self) -> list:
+    def get_installer(self) -> PluginInstallerClient:
         """
-        Send plugin installer delete command
+        Returns the device's plugin installer session, recreating it if the credentials changed
         :return:
         """
-        self.send_remote_command('home')
-        delete_cmd: str = f'curl --user {self.user_name}:{str(self.password)} --digest -s -S ' \
-                          f'-F "mysubmit=Delete" ' \
-                          f'-F "archive=''"  ' \
-                          f'http://{self.get_ip_address()}/plugin_install'
-        results: str = os.popen(delete_cmd).read()
-        messages: list = Roku.parse_plugin_installer_output(results)
-        if len(messages) > 0:
-            return messages
-
-        return [{'status': 'error', 'msg': 'command failed'}]
-
-    def deploy_archive(self, channel_archive: Path) -> list:
+        host: str = self.get_ip_address()
+        if self.installer_port != INSTALLER_PORT:
+            host = f'{host}:{self.installer_port}'
+
+        if self.installer is None or self.installer.host != host or \
+                self.installer.session.auth.username != self.user_name or \
+                self.installer.session.auth.password != str(self.password):
+            self.installer = PluginInstallerClient(host, self.user_name, str(self.password))
+
+        return self.installer
+
+    def query_dev_app(self) -> Union[None, dict]:
         """
-        Send plugin installer deploy command
-        :param channel_archive: path to chanel archive to deployed
-        :return:
+        Queries ECP for the installed dev channel
+        :return: the dev app's id, version and name, None if none is installed or the query failed
         """
-        self.send_remote_command('home')
-        self.delete_dev_app()
-        deploy_cmd: str = f'curl --user {self.user_name}:{str(self.password)} --digest -s -S ' \
-                          f'-F "mysubmit=Replace" ' \
-                          f'-F "archive=@{str(channel_archive)}"  ' \
-                          f'http://{self.get_ip_address()}/plugin_install'
-        results = os.popen(deploy_cmd).read()
-        messages: list = Roku.parse_plugin_installer_output(results)
-        if len(messages) > 0:
-            return messages
+        try:
+            with span('query apps', self.get_ip_address()):
+                res: requests.Response = requests.get(f'{self.location}query/apps', timeout=ECP_TIMEOUT)
+                apps: ElementTree.Element = ElementTree.fromstring(res.content)
+        except (requests.RequestException, ElementTree.ParseError):
+            return None
 
-        return [{'status': 'error', 'msg': 'command failed'}]
+        for app in apps.iter('app'):
+            if app.get('id') == 'dev':
+                return {
+                    'id': app.get('id'),
+                    'version': app.get('version'),
+                    'name': app.text
+                }
 
+        return None
 
+    def delete_dev_app(self) -> list:
+        """
+        Send plugin installer delete command
+        :return:
+        """
+        with span('delete', self.get_ip_address()):
+            self.send_remote_command('home')
+
+            return self.get_installer().delete()
 
+    def deploy_archive(self, channel_archive: Union[Path, BinaryIO, Iterable[bytes]]) -> list:
+        """
+        Send plugin installer deploy command, Replace swaps out any installed dev channel so no
+        separate Delete is sent
+        :param channel_archive: path to chanel archive, in memory archive or chunks of one being built to be deployed
+        :return:
+        """
+        with span('deploy archive', self.get_ip_address()):
+            return self.get_installer().replace(channel_archive)
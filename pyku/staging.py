@@ -0,0 +1,255 @@
+# coding=utf-8
+"""
+Usage:
+    Incremental staging helpers used by Channel.stage_channel_for_compilation
+
+ToDos:
+"""
+# standard lib imports
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Union
+# project imports
+from pyku.constants import STAGING_LINK_MODES
+from pyku.fileset import ChannelFile
+
+HASH_CHUNK_SIZE: int = 1024 * 1024
+# linux ioctl request code for cloning a file's extents (copy on write)
+FICLONE: int = 0x40049409
+
+
+def file_digest(path: Path) -> str:
+    """
+    Hashes a file's content
+    :param path: Path - file to hash
+    :return: hex digest of the file's content
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with path.open('rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class FileIndex:
+    """
+    Persisted index of file sizes, mtimes and content hashes keyed by relative path
+
+    *Attributes:
+        file (Path): JSON file the index is persisted to
+        entries (dict): relative path -> {'size': int, 'mtime': int, 'hash': str}
+
+    *methods
+        load() -> None:
+
+        save() -> None:
+
+        is_current(channel_file: ChannelFile) -> bool:
+
+        digest(channel_file: ChannelFile) -> str:
+
+        update(channel_file: ChannelFile, digest: str) -> None:
+
+        remove(relative: str) -> None:
+    """
+    def __init__(self, index_file: Path):
+        self.file: Path = index_file
+        self.entries: Dict[str, dict] = {}
+        self.load()
+
+    def load(self) -> None:
+        """
+        Reads index from disk, a missing or corrupt index is treated as empty
+        """
+        if self.file.exists():
+            try:
+                with self.file.open('r') as index:
+                    self.entries = json.load(index)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def save(self) -> None:
+        """
+        Writes index to disk
+        """
+        if not self.file.parent.exists():
+            self.file.parent.mkdir(parents=True)
+
+        temp_file: Path = self.file.with_suffix('.tmp')
+        with temp_file.open('w') as index:
+            json.dump(self.entries, index, sort_keys=True)
+        os.replace(str(temp_file), str(self.file))
+
+    def is_current(self, channel_file: ChannelFile) -> bool:
+        """
+        Checks if the indexed size and mtime still match the file
+        :param channel_file: ChannelFile - file with a fresh size and mtime
+        :return:
+        """
+        entry: Union[None, dict] = self.entries.get(channel_file.relative, None)
+
+        return entry is not None and entry['size'] == channel_file.size and entry['mtime'] == channel_file.mtime
+
+    def digest(self, channel_file: ChannelFile) -> str:
+        """
+        Returns the content hash of a file, only reading it when the index is out of date
+        :param channel_file: ChannelFile - file with a fresh size and mtime
+        :return: hex digest of the file's content
+        """
+        if self.is_current(channel_file):
+            return self.entries[channel_file.relative]['hash']
+
+        digest: str = file_digest(channel_file.path)
+        self.update(channel_file, digest)
+
+        return digest
+
+    def update(self, channel_file: ChannelFile, digest: str) -> None:
+        """
+        Records a file's size, mtime and hash
+        """
+        self.entries[channel_file.relative] = {
+            'size': channel_file.size,
+            'mtime': channel_file.mtime,
+            'hash': digest
+        }
+
+    def remove(self, relative: str) -> None:
+        """
+        Drops a file from the index
+        """
+        self.entries.pop(relative, None)
+
+
+def reflink_file(source: Path, target: Path) -> bool:
+    """
+    Clones source into target sharing extents, only supported on copy on write filesystems
+    :param source: Path - file to clone
+    :param target: Path - clone destination
+    :return: True if the clone succeeded
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    with source.open('rb') as src, target.open('wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            pass
+
+    target.unlink()
+
+    return False
+
+
+def place_file(source: Path, target: Path, link_mode: str = 'copy') -> None:
+    """
+    Puts source at target by hardlink, reflink or copy, falling back to a copy
+    :param source: Path - source file
+    :param target: Path - staged file
+    :param link_mode: one of STAGING_LINK_MODES
+    """
+    if link_mode not in STAGING_LINK_MODES:
+        raise Exception(f'unknown staging link mode {link_mode}')
+
+    if not target.parent.exists():
+        target.parent.mkdir(parents=True)
+
+    if target.exists() or target.is_symlink():
+        target.unlink()
+
+    if link_mode == 'hardlink':
+        try:
+            os.link(str(source), str(target))
+            return
+        except OSError:
+            pass
+    elif link_mode == 'reflink' and reflink_file(source, target):
+        return
+
+    shutil.copyfile(str(source), str(target))
+
+
+def list_dir_files(directory: Path) -> List[str]:
+    """
+    Lists every file under directory as posix relative paths
+    :param directory: Path - directory to list
+    :return:
+    """
+    found: List[str] = []
+    for root, dirs, files in os.walk(str(directory)):
+        for file in files:
+            found.append(Path(os.path.relpath(os.path.join(root, file), str(directory))).as_posix())
+
+    return found
+
+
+def remove_empty_dirs(directory: Path) -> None:
+    """
+    Removes empty child directories, deepest first
+    :param directory: Path - directory to prune
+    """
+    for root, dirs, files in os.walk(str(directory), topdown=False):
+        if root != str(directory) and not os.listdir(root):
+            os.rmdir(root)
+
+
+def sync_staging_dir(
+    channel_files: List[ChannelFile],
+    staging_dir: Path,
+    index: FileIndex,
+    link_mode: str = 'copy'
+) -> dict:
+    """
+    Brings staging_dir in line with channel_files, only touching files whose content changed
+    :param channel_files: resolved channel files
+    :param staging_dir: Path - staging directory
+    :param index: FileIndex - index of the files currently staged
+    :param link_mode: one of STAGING_LINK_MODES
+    :return: counts of copied, unchanged and removed files
+    """
+    results: dict = {'copied': 0, 'unchanged': 0, 'removed': 0}
+    wanted: set = {channel_file.relative for channel_file in channel_files}
+    staged: set = set()
+
+    if staging_dir.exists():
+        for relative in list_dir_files(staging_dir):
+            if relative in wanted:
+                staged.add(relative)
+            else:
+                (staging_dir / relative).unlink()
+                index.remove(relative)
+                results['removed'] += 1
+        remove_empty_dirs(staging_dir)
+
+    for relative in list(index.entries.keys()):
+        if relative not in staged:
+            index.remove(relative)
+
+    for channel_file in channel_files:
+        if channel_file.relative in staged:
+            if index.is_current(channel_file):
+                results['unchanged'] += 1
+                continue
+
+            previous: Union[None, dict] = index.entries.get(channel_file.relative, None)
+            digest: str = file_digest(channel_file.path)
+            if previous is not None and previous['hash'] == digest:
+                index.update(channel_file, digest)
+                results['unchanged'] += 1
+                continue
+        else:
+            digest = file_digest(channel_file.path)
+
+        place_file(channel_file.path, staging_dir / channel_file.relative, link_mode)
+        index.update(channel_file, digest)
+        results['copied'] += 1
+
+    return results
@@ -0,0 +1,146 @@
+# coding=utf-8
+"""
+Usage:
+    Fans a channel archive out to uploads while it's being written, so compression and transfer overlap
+
+    broadcast = ArchiveBroadcast(2, tee_path)
+    uploads read broadcast.readers[0] and broadcast.readers[1] on their own threads
+    channel.stream_channel_archive(broadcast)
+
+    Each reader holds at most STREAM_BUFFER_CHUNKS chunks, the writer waits on the slowest upload, so memory stays
+    bounded whatever the archive size.
+
+ToDos:
+"""
+# standard lib imports
+import io
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Union
+# project imports
+from pyku.constants import STREAM_BUFFER_CHUNKS, STREAM_CHUNK_SIZE
+
+# seconds a blocked write waits before checking if its reader was abandoned
+STREAM_PUT_TIMEOUT: float = 0.5
+
+
+class BroadcastLimitExceeded(IOError):
+    """
+    Raised by ArchiveBroadcast.write when the archive would grow past the broadcast's limit
+    """
+
+
+class BroadcastReader:
+    """
+    One upload's view of a broadcast, iterating yields the archive's bytes in chunks
+
+    *Attributes:
+        chunks (queue.Queue): Chunks written but not yet read, bytes, or None once the archive is finished
+        abandoned (bool): Set when the upload stopped reading, the writer skips it from then on
+        error (Union[None, BaseException]): Set when writing the archive failed
+
+    *methods
+        close() -> None:
+    """
+    def __init__(self, buffer_chunks: int = STREAM_BUFFER_CHUNKS):
+        self.chunks: queue.Queue = queue.Queue(maxsize=buffer_chunks)
+        self.abandoned: bool = False
+        self.error: Union[None, BaseException] = None
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk: Union[None, bytes] = self.chunks.get()
+            if chunk is None:
+                if self.error is not None:
+                    raise IOError(f'archive build failed: {self.error}')
+                return
+            yield chunk
+
+    def put(self, chunk: Union[None, bytes]) -> None:
+        """
+        Queues a chunk, waiting while the reader is behind unless it's abandoned
+        """
+        while not self.abandoned:
+            try:
+                self.chunks.put(chunk, timeout=STREAM_PUT_TIMEOUT)
+                return
+            except queue.Full:
+                continue
+
+    def close(self) -> None:
+        """
+        Stops reading, e.g. because the upload failed
+        """
+        self.abandoned = True
+
+
+class ArchiveBroadcast(io.RawIOBase):
+    """
+    Write only, unseekable stream ZipFile writes an archive into, copying every chunk to each reader and to the
+    tee file
+
+    *Attributes:
+        readers (List[BroadcastReader]): Reader per upload
+        tee_path (Union[None, Path]): Where the full archive is kept once finished
+        limit (int): Max bytes, a write past it raises BroadcastLimitExceeded before any of its data is sent, 0 for
+            no limit
+        written (int): Bytes written
+
+    *methods
+        finish(error: Union[None, BaseException]) -> None:
+    """
+    def __init__(
+        self,
+        reader_count: int,
+        tee_path: Union[None, Path] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        limit: int = 0
+    ):
+        super().__init__()
+        self.readers: List[BroadcastReader] = [BroadcastReader() for _ in range(reader_count)]
+        self.tee_path: Union[None, Path] = tee_path
+        self.limit: int = limit
+        self.chunk_size: int = chunk_size
+        self.written: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._tee: Union[None, BinaryIO] = None
+        if tee_path is not None:
+            self._tee = tee_path.with_name(f'{tee_path.name}.tmp').open('wb')
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        view: memoryview = memoryview(data)
+        with self._lock:
+            if 0 < self.limit < self.written + len(view):
+                raise BroadcastLimitExceeded(f'archive is over {self.limit} bytes')
+            if self._tee is not None:
+                self._tee.write(view)
+            for offset in range(0, len(view), self.chunk_size):
+                chunk: bytes = bytes(view[offset:offset + self.chunk_size])
+                for reader in self.readers:
+                    reader.put(chunk)
+            self.written += len(view)
+
+        return len(view)
+
+    def finish(self, error: Union[None, BaseException] = None) -> None:
+        """
+        Ends every reader's stream and keeps the tee file, or drops it when writing failed
+        :param error: what failed writing the archive, readers raise it
+        """
+        for reader in self.readers:
+            reader.error = error
+            reader.put(None)
+
+        if self._tee is not None and self.tee_path is not None:
+            temp_path: Path = Path(self._tee.name)
+            self._tee.close()
+            self._tee = None
+            if error is None:
+                os.replace(str(temp_path), str(self.tee_path))
+            else:
+                temp_path.unlink()
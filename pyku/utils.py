@@ -6,14 +6,24 @@ Usage:
 ToDos:
 """
 # standard lib imports
-from typing import Union
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Tuple, Union
 # third party lib imports
 import click
-from PyInquirer import prompt
-from roku_scanner.scanner import Scanner
+import requests
 # project imports
 from pyku.channel import Channel
+from pyku.constants import DEVICE_INFO_TIMEOUT, DEVICE_INFO_WORKERS, ECP_KEY_DELAY
+from pyku.device import DeviceHandle
+from pyku.device_cache import DeviceCache
+from pyku.discovery import DiscoveryEngine, device_target, target_matches
+from pyku.ecp import EcpClient
+from pyku.images import profile_for_device_info
+from pyku.planner import PLAN_SKIP, DeployPlanner
+from pyku.profiling import profiled, span
 from pyku.roku import Roku
+from pyku.streaming import ArchiveBroadcast, BroadcastReader
 
 
 def serialize_roku_object_for_selection(roku: Roku) -> dict:
@@ -37,42 +47,124 @@ def merge_roku_config_values_into_dict(config_rokus: list) -> dict:
     return {key: value for config in config_rokus for key, value in config.items()}
 
 
+def get_config_rokus(channel: Channel) -> list:
+    """
+    Returns the Rokus config entries, empty for a channel without config
+    :param channel: Channel
+    :return:
+    """
+    if channel.channel_config is None:
+        return []
+
+    return channel.channel_config.rokus
+
+
 def check_if_roku_exists_in_config(roku: Roku, channel: Channel) -> Union[None, dict]:
     """
-    Checks if a Roku's ip address exists in the config and returns amerged version of it if True else None
+    Checks if a Roku is named in the config by ip address, serial number or name and returns its config if True
+    else None
     :param roku: Roku device
     :param channel: Channel
     :return:
     """
-    config_rokus: Union[list, None] = channel.channel_config.rokus
+    config_rokus: Union[list, None] = get_config_rokus(channel)
 
     if config_rokus is not None and len(config_rokus) > 0:
-        for index in range(len(config_rokus)):
-            ip_address: Union[str, None] = config_rokus[index][0].get('ip_address', None)
-            if ip_address is not None and roku.location.find(ip_address) != -1:
-                return merge_roku_config_values_into_dict(config_rokus[index])
+        for roku_config in config_rokus:
+            if target_matches(roku_config, roku):
+                return dict(roku_config)
 
     return None
 
 
-def run_device_discovery(channel: Channel) -> list:
+def describe_target(target: dict) -> str:
+    """
+    Names a target or Rokus config entry for messages
+    """
+    return str(target.get('ip_address', None) or target.get('serial_number', None) or target.get('name', ''))
+
+
+@profiled('device-info fetch')
+def fetch_device_info_for_rokus(
+    rokus: List[Roku],
+    timeout: float = DEVICE_INFO_TIMEOUT,
+    workers: int = DEVICE_INFO_WORKERS
+) -> List[Roku]:
+    """
+    Fetches device-info for many devices at once, reporting and dropping any that are slow or offline
+    :param rokus: Roku devices to fetch
+    :param timeout: seconds each device has to connect and answer each read
+    :param workers: max number of devices fetched at once
+    :return: reachable devices, in the order given
+    """
+    if len(rokus) == 0:
+        return []
+
+    reachable: List[Roku] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(rokus)))) as executor:
+        futures: dict = {executor.submit(roku.fetch_device_info, timeout): roku for roku in rokus}
+        for future in as_completed(futures):
+            roku: Roku = futures[future]
+            try:
+                future.result()
+                reachable.append(roku)
+            except (requests.RequestException, ElementTree.ParseError) as error:
+                click.echo(f'skipping {roku.location}, device-info failed: {error}')
+
+    return [roku for roku in rokus if roku in reachable]
+
+
+@profiled('discovery')
+def discover_rokus(targets: Union[None, List[dict]] = None, device_cache: Union[None, DeviceCache] = None) -> list:
+    """
+    Runs SSDP discovery, reporting devices as they answer
+    :param targets: Rokus config entries or --device targets, discovery stops once all of them answered
+    :param device_cache: DeviceCache answering devices are stored in
+    :return: reachable devices, in the order they answered
+    """
+    click.echo('discovering devices')
+
+    def on_device(roku: Roku, error: Union[None, Exception]) -> None:
+        if error is not None:
+            click.echo(f'skipping {roku.location}, device-info failed: {error}')
+            return
+
+        click.echo(f'found {roku.friendly_device_name} @ {roku.location}')
+        if device_cache is not None:
+            device_cache.store(roku)
+
+    return DiscoveryEngine().discover(targets, on_device)
+
+
+def run_device_discovery(
+    channel: Channel,
+    device_cache: Union[None, DeviceCache] = None,
+    refresh_devices: bool = False,
+    require_password: bool = True
+) -> list:
     """
     Discovers devices on LAN and cross references config for password or prompts user for it
     :param channel: Channel
+    :param device_cache: DeviceCache used instead of a scan when it holds discovered devices, rescanned in the
+        background when any entry is stale
+    :param refresh_devices: flag to scan even when devices are cached
+    :param require_password: flag to prompt for passwords missing from config, ECP only commands don't need one
     :return: list of selected devices
     """
-    # Discover devices
-    click.echo('discovering devices')
-    scanner: Scanner = Scanner()
-    scanner.discover()
     selected_devices: list = []
     rokus: list = []
 
-    for device in scanner.discovered_devices:
-        roku_location: str = device.get('LOCATION')
-        roku: Roku = Roku(location=roku_location, discovery_data=device)
-        roku.fetch_data()
-        rokus.append(roku)
+    if device_cache is not None and not refresh_devices:
+        stale: bool = device_cache.has_stale_entries()
+        # stale entries are refreshed by one background scan rather than a re-fetch each on top of it
+        rokus = device_cache.load_rokus(discovered_only=True, revalidate=False)
+        if len(rokus) > 0:
+            click.echo(f'using {len(rokus)} cached device(s), --refresh-devices to rescan')
+            if stale:
+                device_cache.rescan()
+
+    if len(rokus) == 0:
+        rokus = discover_rokus(get_config_rokus(channel), device_cache)
 
     if len(rokus) > 0:
         # setup rokus for selection prompt
@@ -87,12 +179,15 @@ def run_device_discovery(channel: Channel) -> list:
                 if len(answer) == 0 else True
             }
         ]
+        # prompt_toolkit is slow to import and only the selection prompt needs it
+        from PyInquirer import prompt
+
         selected_rokus: dict = prompt(device_selection_questions)
-        selected_devices.append(selected_rokus.get('selected_devices', []))
+        selected_devices = list(selected_rokus.get('selected_devices', []))
 
         if len(selected_devices) > 0:
             # check for roku dev password in config or prompt user for it
-            for selected in selected_devices:
+            for selected in list(selected_devices):
                 config_check: Union[None, dict] = check_if_roku_exists_in_config(selected, channel)
                 if config_check is not None:
                     selected.password = config_check.get('password', None)
@@ -100,6 +195,8 @@ def run_device_discovery(channel: Channel) -> list:
                     config_username: Union[str, None] = config_check.get('username', None)
                     if config_username is not None:
                         selected.user_name = config_username
+                elif not require_password:
+                    selected.selected = True
                 else:
                     password_prompt: str = click.prompt(
                         f'password for {selected.location}',
@@ -116,41 +213,399 @@ def run_device_discovery(channel: Channel) -> list:
     return selected_devices
 
 
-def get_selected_from_config(channel: Channel):
+def get_selected_from_config(
+    channel: Channel,
+    device_cache: Union[None, DeviceCache] = None,
+    refresh_devices: bool = False,
+    devices: Union[None, List[str]] = None,
+    require_password: bool = True
+):
     """
-    Reads config for devices and creates Roku objects
+    Reads config for devices and creates Roku objects, without prompting. Devices configured by ip address are
+    queried directly, ones configured by serial number or name are found through discovery that stops as soon as
+    they've all answered.
     :param channel: Channel
+    :param device_cache: DeviceCache used instead of fetching device-info for cached devices
+    :param refresh_devices: flag to fetch device-info even when devices are cached
+    :param devices: ip addresses, serial numbers or names to use instead of every device in config
+    :param require_password: flag to skip devices without a password in config, ECP only commands don't need one
     :return: list of selected devices
     """
     # create roku objects from config
     click.echo('reading config for rokus')
     selected_devices: list = []
-    config_rokus: list = channel.channel_config.rokus
-    if not len(config_rokus):
+    config_rokus: list = get_config_rokus(channel)
+    targets: List[dict] = [device_target(device) for device in devices] if devices else config_rokus
+    if not len(targets):
         click.echo('cannot skip device discovery without rokus designated in config')
         exit()
 
-    for roku_config in config_rokus:
-        click.echo(f'found config for {roku_config.get("ip_address", "")}')
-        roku: Roku = Roku(
-            location=f'http://{roku_config.get("ip_address", "")}:8060/',
-            discovery_data={
-                'WAKEUP': '',
-                'device-group.roku.com': '',
-                'LOCATION': f'http://{roku_config.get("ip_address", "")}:8060/',
-                'Server': 'Roku/9.3.0 UPnP/1.0 Roku/9.3.0',
-                'Ext': '',
-                'USN': '',
-                'ST': 'roku:ecp',
-                'Cache-Control': 'max-age=3600'
-            }
-        )
-        roku.fetch_data()
+    resolved: List[Tuple[dict, Roku]] = []
+    cached_rokus: List[Roku] = []
+    if device_cache is not None and not refresh_devices:
+        cached_rokus = device_cache.load_rokus()
+
+    by_ip: List[Tuple[dict, Roku]] = []
+    unresolved: List[dict] = []
+    for target in targets:
+        click.echo(f'found config for {describe_target(target)}')
+        roku: Union[None, Roku] = next((cached for cached in cached_rokus if target_matches(target, cached)), None)
+        if roku is not None:
+            resolved.append((target, roku))
+        elif target.get('ip_address', None):
+            location: str = f'http://{target.get("ip_address")}:8060/'
+            by_ip.append((target, Roku(
+                location=location,
+                discovery_data={
+                    'WAKEUP': '',
+                    'device-group.roku.com': '',
+                    'LOCATION': location,
+                    'Server': 'Roku/9.3.0 UPnP/1.0 Roku/9.3.0',
+                    'Ext': '',
+                    'USN': '',
+                    'ST': 'roku:ecp',
+                    'Cache-Control': 'max-age=3600'
+                }
+            )))
+        else:
+            unresolved.append(target)
+
+    reachable: List[Roku] = fetch_device_info_for_rokus([roku for _, roku in by_ip])
+    for target, roku in by_ip:
+        if roku in reachable:
+            resolved.append((target, roku))
+            if device_cache is not None:
+                device_cache.store(roku)
+
+    if len(unresolved) > 0:
+        discovered: List[Roku] = discover_rokus(unresolved, device_cache)
+        for target in unresolved:
+            roku = next((found for found in discovered if target_matches(target, found)), None)
+            if roku is not None:
+                resolved.append((target, roku))
+            else:
+                click.echo(f'unable to find {describe_target(target)}')
+
+    for target, roku in resolved:
+        roku_config: Union[None, dict] = target
+        if 'password' not in target:
+            roku_config = check_if_roku_exists_in_config(roku, channel)
+        if roku_config is None:
+            roku_config = {}
+        if require_password and roku_config.get('password', None) is None:
+            click.echo(f'skipping {describe_target(target)}, no password for it in config')
+            continue
+
         roku.selected = True
         roku.password = roku_config.get("password", "")
         config_username: Union[str, None] = roku_config.get('username', None)
         if config_username is not None:
             roku.user_name = config_username
-        selected_devices.append(roku)
+        if roku not in selected_devices:
+            selected_devices.append(roku)
 
     return selected_devices
+
+
+def deploy_to_device(channel: Channel, selected: Roku, planner: Union[None, DeployPlanner] = None) -> list:
+    """
+    Deploys the channel's archive to a device, skipping the upload when the planner finds the device
+    already runs it
+    :param channel: Channel with a built archive
+    :param selected: selected Roku device
+    :param planner: DeployPlanner tracking what was last pushed to each device, None always uploads
+    :return: installer messages
+    """
+    with span('deploy', selected.get_ip_address()):
+        digest: Union[None, str] = None
+        if planner is not None:
+            with span('plan', selected.get_ip_address()):
+                digest = channel.archive_digest()
+                plan: str = planner.plan(selected, digest)
+            if plan == PLAN_SKIP:
+                return [{'status': 'skipped', 'msg': 'device already runs this archive'}]
+
+        result_msgs: list = selected.deploy_archive(channel.channel_archive)
+        if planner is not None and deploy_succeeded(result_msgs):
+            planner.record(selected, digest)
+
+        return result_msgs
+
+
+def deploy_archive_to_devices(
+    channel: Channel,
+    selected_devices: list,
+    jobs: int = 1,
+    planner: Union[None, DeployPlanner] = None
+) -> List[Tuple[Roku, list]]:
+    """
+    Deploys the channel's archive to the selected devices, up to jobs at a time, echoing each
+    device's installer messages as soon as its deploy finishes
+    :param channel: Channel with a built archive
+    :param selected_devices: list of selected Roku devices
+    :param jobs: max number of concurrent deploys
+    :param planner: DeployPlanner used to skip devices that already run the archive
+    :return: (device, installer messages) in the order the devices were selected
+    """
+    results: dict = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(selected_devices) or 1))) as executor:
+        futures: dict = {
+            executor.submit(deploy_to_device, channel, selected, planner): index
+            for index, selected in enumerate(selected_devices)
+        }
+        for future in as_completed(futures):
+            index: int = futures[future]
+            selected: Roku = selected_devices[index]
+            try:
+                result_msgs: list = future.result()
+            except Exception as error:
+                result_msgs = [{'status': 'error', 'msg': str(error)}]
+            results[index] = result_msgs
+            for msg in result_msgs:
+                click.echo(f'{selected.friendly_model_name} | Status {msg["status"]} | {msg["msg"]}')
+
+    if planner is not None:
+        planner.save()
+
+    return [(selected_devices[index], results[index]) for index in sorted(results)]
+
+
+def deploy_archive_by_image_profile(
+    channel: Channel,
+    selected_devices: list,
+    jobs: int = 1,
+    planner: Union[None, DeployPlanner] = None
+) -> List[Tuple[Roku, list]]:
+    """
+    Deploys to each device the archive with images transcoded for its ui-resolution, ImageProfile auto. Devices
+    whose resolution the images are designed for, or that don't report one, get the archive already built, an
+    archive is built per other profile.
+    :param channel: Channel with a built archive
+    :param selected_devices: list of selected Roku devices
+    :param jobs: max number of concurrent deploys
+    :param planner: DeployPlanner used to skip devices that already run the archive
+    :return: (device, installer messages) in the order the devices were selected
+    """
+    groups: Dict[Union[None, str], List[int]] = {}
+    for index, selected in enumerate(selected_devices):
+        channel.image_profile = profile_for_device_info(selected.get_device_info())
+        groups.setdefault(channel.active_image_profile(), []).append(index)
+    channel.image_profile = None
+
+    built_profile: Union[None, str] = channel.active_image_profile()
+    results: dict = {}
+    for profile in sorted(groups, key=lambda group_profile: group_profile != built_profile):
+        indexes: List[int] = groups[profile]
+        if profile != channel.active_image_profile():
+            channel.image_profile = profile
+            click.echo(f'creating archive for {profile or "design resolution"} devices')
+            channel.build_channel_archive()
+            if channel.archive_from_cache:
+                click.echo(f'reusing cached archive {str(channel.channel_archive)}')
+        group_results: list = deploy_archive_to_devices(channel, [selected_devices[index] for index in indexes],
+                                                        jobs, planner)
+        for index, (_, result_msgs) in zip(indexes, group_results):
+            results[index] = result_msgs
+    channel.image_profile = None
+
+    return [(selected_devices[index], results[index]) for index in sorted(results)]
+
+
+def stream_to_device(selected: Roku, reader: BroadcastReader) -> list:
+    """
+    Uploads the channel's archive to a device as it's being built. The planner isn't consulted, the archive's
+    digest isn't known until it's written, and an unchanged archive comes from the cache instead of streaming.
+    :param selected: selected Roku device
+    :param reader: BroadcastReader - this device's view of the archive
+    :return: installer messages
+    """
+    with span('deploy', selected.get_ip_address()):
+        return selected.deploy_archive(reader)
+
+
+def stream_archive_to_devices(
+    channel: Channel,
+    selected_devices: list,
+    jobs: int = 1,
+    planner: Union[None, DeployPlanner] = None
+) -> List[Tuple[Roku, list]]:
+    """
+    Builds the channel's archive while uploading it to the first jobs devices, so compression and transfer
+    overlap, then deploys the finished archive to the rest and to streamed devices that answered 401. A cached
+    archive is deployed as usual.
+    :param channel: Channel to build and deploy
+    :param selected_devices: list of selected Roku devices
+    :param jobs: max number of concurrent deploys
+    :param planner: DeployPlanner the streamed uploads are recorded in, it skips devices only for the cached archive
+        and the devices deployed to after the build
+    :return: (device, installer messages) in the order the devices were selected
+    :exception whatever building the archive raised, once the uploads reading it have ended
+    """
+    channel_files: list = channel.collect_channel_files()
+    cache = channel.restore_cached_archive(channel_files)
+    if channel.archive_from_cache or channel.channel_config is None:
+        if channel.archive_from_cache:
+            click.echo(f'reusing cached archive {str(channel.channel_archive)}')
+        return deploy_archive_to_devices(channel, selected_devices, jobs, planner)
+
+    # only as many readers as uploads running at once, a queued upload's reader would stall the writer
+    streamed: int = max(1, min(jobs, len(selected_devices)))
+    if not channel.channel_config.out_dir.exists():
+        channel.channel_config.out_dir.mkdir(parents=True)
+    broadcast: ArchiveBroadcast = ArchiveBroadcast(
+        streamed if selected_devices else 0,
+        channel.channel_config.out_dir / channel.archive_file_name()
+    )
+    results: dict = {}
+
+    with ThreadPoolExecutor(max_workers=streamed) as executor:
+        futures: dict = {
+            executor.submit(stream_to_device, selected, reader): index
+            for index, (selected, reader) in enumerate(zip(selected_devices, broadcast.readers))
+        }
+        try:
+            channel.stream_channel_archive(broadcast, channel_files, cache)
+        finally:
+            for future in as_completed(futures):
+                index: int = futures[future]
+                selected: Roku = selected_devices[index]
+                try:
+                    result_msgs: list = future.result()
+                except Exception as error:
+                    result_msgs = [{'status': 'error', 'msg': str(error)}]
+                results[index] = result_msgs
+                for msg in result_msgs:
+                    click.echo(f'{selected.friendly_model_name} | Status {msg["status"]} | {msg["msg"]}')
+
+    if planner is not None:
+        # the tee copy holds exactly the bytes streamed
+        digest: str = channel.archive_digest()
+        for index, result_msgs in results.items():
+            if deploy_succeeded(result_msgs):
+                planner.record(selected_devices[index], digest)
+
+    # a stream can't be resent after a 401, those devices get the finished archive along with the rest
+    remaining: List[int] = [index for index in sorted(results) if results[index][0].get('http_status') == 401]
+    remaining += list(range(len(results), len(selected_devices)))
+    if remaining:
+        # deploy_archive_to_devices saves the planner
+        deployed: list = deploy_archive_to_devices(channel, [selected_devices[index] for index in remaining], jobs,
+                                                   planner)
+        for index, (_, result_msgs) in zip(remaining, deployed):
+            results[index] = result_msgs
+    elif planner is not None:
+        planner.save()
+
+    return [(selected_devices[index], results[index]) for index in sorted(results)]
+
+
+def deploy_channel_to_devices(
+    channel: Channel,
+    selected_devices: list,
+    jobs: int = 1,
+    planner: Union[None, DeployPlanner] = None
+) -> List[Tuple[Roku, list]]:
+    """
+    Deploys the way the channel's config asks, an archive per device resolution with ImageProfile auto, streamed
+    while it's built with StreamUpload, else the archive already built
+    :param channel: Channel, built unless StreamUpload is set
+    :param selected_devices: list of selected Roku devices
+    :param jobs: max number of concurrent deploys
+    :param planner: DeployPlanner used to skip devices that already run the archive
+    :return: (device, installer messages) in the order the devices were selected
+    """
+    if channel.channel_config is not None and channel.channel_config.image_profile == 'auto':
+        return deploy_archive_by_image_profile(channel, selected_devices, jobs, planner)
+    if channel.channel_config is not None and channel.channel_config.stream_upload:
+        return stream_archive_to_devices(channel, selected_devices, jobs, planner)
+
+    return deploy_archive_to_devices(channel, selected_devices, jobs, planner)
+
+
+def deploy_succeeded(result_msgs: list) -> bool:
+    """
+    Checks a device's installer messages for a successful install
+    :param result_msgs: installer messages returned by Roku.deploy_archive
+    :return:
+    """
+    statuses: list = [msg["status"] for msg in result_msgs]
+
+    return ('success' in statuses or 'skipped' in statuses) and 'error' not in statuses
+
+
+def echo_deploy_summary(results: List[Tuple[Roku, list]]) -> bool:
+    """
+    Echoes one line per device with its final deploy status
+    :param results: (device, installer messages) as returned by deploy_archive_to_devices
+    :return: True if every device deployed successfully
+    """
+    click.echo('summary')
+    all_succeeded: bool = True
+
+    for selected, result_msgs in results:
+        succeeded: bool = deploy_succeeded(result_msgs)
+        all_succeeded = all_succeeded and succeeded
+        click.echo(f'{selected.friendly_model_name} @ {selected.location} | {"ok" if succeeded else "failed"}')
+
+    return all_succeeded
+
+
+def send_keys_to_device(
+    handle: DeviceHandle,
+    keys: List[str],
+    delay: float,
+    client: Union[None, EcpClient] = None
+) -> int:
+    """
+    Sends keys to a device over its own keep-alive session
+    :param handle: DeviceHandle of the device
+    :param keys: keys, Lit_ characters and wait: steps
+    :param delay: seconds between keys
+    :param client: open session to send over and leave open, None opens one for these keys only
+    :return: number of keys sent
+    """
+    if client is not None:
+        return client.send_keys(keys, delay)
+
+    client = handle.ecp_client()
+    try:
+        return client.send_keys(keys, delay)
+    finally:
+        client.close()
+
+
+def send_keys_to_devices(
+    handles: List[DeviceHandle],
+    keys: List[str],
+    delay: float = ECP_KEY_DELAY,
+    clients: Union[None, Dict[str, EcpClient]] = None
+) -> List[Tuple[DeviceHandle, Union[None, str]]]:
+    """
+    Sends the same keys to every device at once, each device gets the keys in order
+    :param handles: DeviceHandles of the selected devices
+    :param keys: keys, Lit_ characters and wait: steps
+    :param delay: seconds between keys
+    :param clients: location -> open session kept between calls, e.g. by the daemon
+    :return: (device, error message or None) in the order given
+    """
+    results: dict = {}
+    clients = clients or {}
+
+    with ThreadPoolExecutor(max_workers=max(1, len(handles))) as executor:
+        futures: dict = {
+            executor.submit(send_keys_to_device, handle, keys, delay, clients.get(handle.location, None)): index
+            for index, handle in enumerate(handles)
+        }
+        for future in as_completed(futures):
+            index: int = futures[future]
+            handle: DeviceHandle = handles[index]
+            try:
+                sent: int = future.result()
+                results[index] = None
+                click.echo(f'{handle.location} | sent {sent} key(s)')
+            except Exception as error:
+                results[index] = str(error)
+                click.echo(f'{handle.location} | failed | {error}')
+
+    return [(handles[index], results[index]) for index in sorted(results)]
@@ -0,0 +1,273 @@
+# coding=utf-8
+"""
+Usage:
+    Watches a channel's file set for changes, through inotify on linux with a polling fallback
+
+ToDos:
+"""
+# standard lib imports
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Union
+# project imports
+from pyku.channel import Channel
+
+# inotify event masks, see inotify(7)
+IN_MODIFY: int = 0x00000002
+IN_ATTRIB: int = 0x00000004
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_DELETE_SELF: int = 0x00000400
+IN_IGNORED: int = 0x00008000
+IN_ISDIR: int = 0x40000000
+IN_NONBLOCK: int = 0o4000
+IN_CLOEXEC: int = 0o2000000
+WATCH_MASK: int = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | \
+    IN_DELETE | IN_DELETE_SELF
+EVENT_BUFFER_SIZE: int = 64 * 1024
+# struct inotify_event without its name: wd, mask, cookie, len
+EVENT_HEADER: struct.Struct = struct.Struct('iIII')
+
+
+class InotifyBackend:
+    """
+    Wakes on any file system event below the channel root
+
+    *Attributes:
+        root (Path): Channel root
+        ignored (List[Path]): Dirs not watched, e.g. staging and out dirs
+        fd (int): inotify file descriptor
+        watches (Dict[int, str]): Watch descriptor -> watched dir
+
+    *methods
+        available() -> bool: | static
+
+        add_watches(directory: str) -> None:
+
+        read_events() -> List[str]:
+
+        wait(timeout: float) -> bool:
+
+        close() -> None:
+    """
+    def __init__(self, root: Path, ignored: List[Path]):
+        self.root: Path = root
+        self.ignored: List[str] = [str(path) for path in ignored]
+        self.watches: Dict[int, str] = {}
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd: int = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.add_watches(str(self.root))
+
+    @staticmethod
+    def available() -> bool:
+        """
+        Checks if inotify can be used on this platform
+        """
+        if not sys.platform.startswith('linux'):
+            return False
+
+        library: Union[None, str] = ctypes.util.find_library('c')
+
+        return library is not None and hasattr(ctypes.CDLL(library), 'inotify_init1')
+
+    def is_ignored(self, directory: str) -> bool:
+        """
+        Checks if a dir is left unwatched, hidden dirs and the ignored ones
+        """
+        return os.path.basename(directory).startswith('.') or directory in self.ignored
+
+    def add_watches(self, directory: str) -> None:
+        """
+        Watches a dir and every dir below it, inotify isn't recursive
+        :param directory: the root, or a dir created since it was walked
+        """
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = [child for child in dirs if not self.is_ignored(os.path.join(root, child))]
+            watch: int = self.libc.inotify_add_watch(self.fd, root.encode(), WATCH_MASK)
+            if watch >= 0:
+                self.watches[watch] = root
+
+    def read_events(self) -> List[str]:
+        """
+        Drains pending events
+        :return: dirs created or moved in below a watched dir
+        """
+        created: List[str] = []
+        try:
+            while True:
+                data: bytes = os.read(self.fd, EVENT_BUFFER_SIZE)
+                if not data:
+                    break
+                offset: int = 0
+                while offset < len(data):
+                    watch, mask, _, name_size = EVENT_HEADER.unpack_from(data, offset)
+                    name: bytes = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + name_size]
+                    offset += EVENT_HEADER.size + name_size
+                    if mask & IN_IGNORED:
+                        self.watches.pop(watch, None)
+                    elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and watch in self.watches:
+                        created.append(os.path.join(self.watches[watch], name.split(b'\0', 1)[0].decode()))
+        except BlockingIOError:
+            pass
+
+        return created
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits for events, draining any that arrive and watching dirs created since
+        :param timeout: seconds to wait
+        :return: True if events arrived
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+
+        for directory in self.read_events():
+            if not self.is_ignored(directory):
+                self.add_watches(directory)
+
+        return True
+
+    def close(self) -> None:
+        """
+        Closes the inotify file descriptor
+        """
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """
+    Polls a snapshot of what's watched, waking when it differs from the last one seen
+
+    *Attributes:
+        interval (float): Seconds between polls
+        take_snapshot (Callable[[], object]): Returns the current state, compared with ==
+        snapshot (object): Last state seen
+
+    *methods
+        wait(timeout: float) -> bool:
+
+        close() -> None:
+    """
+    def __init__(self, interval: float, take_snapshot: Callable[[], object]):
+        self.interval: float = interval
+        self.take_snapshot: Callable[[], object] = take_snapshot
+        self.snapshot: object = take_snapshot()
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Polls until the snapshot changes or the timeout passes
+        :param timeout: seconds to wait
+        :return: True if the snapshot changed
+        """
+        deadline: float = time.monotonic() + timeout
+        while True:
+            time.sleep(max(0.0, min(self.interval, deadline - time.monotonic())))
+            snapshot: object = self.take_snapshot()
+            if snapshot != self.snapshot:
+                self.snapshot = snapshot
+                return True
+            if time.monotonic() >= deadline:
+                return False
+
+    def close(self) -> None:
+        """
+        Nothing to release
+        """
+        pass
+
+
+class ChannelWatcher:
+    """
+    Blocks until the channel's resolved file set or config changes, debouncing bursts of saves
+
+    *Attributes:
+        channel (Channel): Channel being watched
+        debounce (float): Seconds of quiet required before a change is reported
+        backend (InotifyBackend | PollingBackend): Source of wake ups
+        snapshot (dict): relative path -> (size, mtime) of the last seen file set
+        config_mtime (int): mtime of the channel's config when last seen
+
+    *methods
+        take_snapshot() -> Dict[str, Tuple[int, int]]:
+
+        wait_for_changes() -> List[str]:
+
+        close() -> None:
+    """
+    def __init__(self, channel: Channel, debounce: float = 0.3, poll_interval: float = 1.0, polling: bool = False):
+        self.channel: Channel = channel
+        self.debounce: float = debounce
+        self.snapshot: Dict[str, Tuple[int, int]] = self.take_snapshot()
+        self.config_mtime: int = self.channel.config_file.stat().st_mtime_ns
+
+        self.backend: Union[None, InotifyBackend, PollingBackend] = None
+        if not polling and InotifyBackend.available():
+            try:
+                self.backend = InotifyBackend(
+                    self.channel.channel_config.root,
+                    [self.channel.channel_config.root / 'staging', self.channel.channel_config.out_dir]
+                )
+            except OSError:
+                pass
+        if self.backend is None:
+            self.backend = PollingBackend(
+                poll_interval,
+                lambda: (self.channel.config_file.stat().st_mtime_ns, self.take_snapshot())
+            )
+
+    def take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Resolves the channel's file set
+        :return: relative path -> (size, mtime)
+        """
+        return {
+            channel_file.relative: (channel_file.size, channel_file.mtime)
+            for channel_file in self.channel.collect_channel_files()
+        }
+
+    def wait_for_changes(self) -> List[str]:
+        """
+        Blocks until files in the channel's file set are added, removed or modified
+        :return: sorted relative paths that changed, the config file's name if it changed
+        """
+        while True:
+            if not self.backend.wait(3600):
+                continue
+            # let a burst of saves settle before looking at the file set
+            while self.backend.wait(self.debounce):
+                pass
+
+            changed: List[str] = []
+            config_mtime: int = self.channel.config_file.stat().st_mtime_ns
+            if config_mtime != self.config_mtime:
+                self.config_mtime = config_mtime
+                changed.append(self.channel.config_file.name)
+                self.channel.reload_config()
+
+            snapshot: Dict[str, Tuple[int, int]] = self.take_snapshot()
+            changed += sorted(
+                relative for relative in set(snapshot) | set(self.snapshot)
+                if snapshot.get(relative) != self.snapshot.get(relative)
+            )
+            self.snapshot = snapshot
+
+            if len(changed) > 0:
+                return changed
+
+    def close(self) -> None:
+        """
+        Releases the wake up backend
+        """
+        self.backend.close()
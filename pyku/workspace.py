@@ -0,0 +1,371 @@
+# coding=utf-8
+"""
+Usage:
+    Builds several channels at once, one process each, then deploys every channel to the devices in its own config
+
+    python3 -m pyku deploy -c channels/kids -c channels/sports
+    python3 -m pyku deploy -w pyku_workspace.yml
+
+    pyku_workspace.yml lists channel roots relative to itself, globs are allowed:
+
+    Channels:
+      - channels/*
+      - legacy/main
+    BuildWorkers: 4
+
+    Each channel's Rokus decide which devices get that variant, a device listed by two channels is an error since a
+    device holds one dev channel. Channels with StreamUpload or ImageProfile auto deploy through
+    utils.deploy_channel_to_devices one channel at a time, StreamUpload channels aren't built up front.
+
+ToDos:
+"""
+# standard lib imports
+import io
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple, Union
+# third party lib imports
+import click
+import yaml
+# project imports
+from pyku.channel import Channel
+from pyku.constants import DEPLOY_STATE, PKKU_CONFIG
+from pyku.device_cache import DeviceCache
+from pyku.discovery import device_target, target_matches
+from pyku.planner import DeployPlanner
+from pyku.roku import Roku
+import pyku.utils as utils
+
+
+class Workspace:
+    """
+    Channels deployed together
+
+    *Attributes:
+        file (Union[None, Path]): Workspace file the channels were read from
+        channel_paths (List[Path]): Channel roots, in the order listed
+        build_workers (int): Processes building archives, 0 uses the cpu count
+
+    *methods
+        from_file(workspace_file: Path) -> Workspace: | static
+    """
+    def __init__(self, channel_paths: List[Path], build_workers: int = 0, file: Union[None, Path] = None):
+        self.file: Union[None, Path] = file
+        self.channel_paths: List[Path] = []
+        self.build_workers: int = build_workers
+
+        seen: set = set()
+        for channel_path in channel_paths:
+            if channel_path.resolve() not in seen:
+                seen.add(channel_path.resolve())
+                self.channel_paths.append(channel_path)
+
+    @staticmethod
+    def from_file(workspace_file: Path) -> 'Workspace':
+        """
+        Reads a workspace file, globbed entries only match dirs with a pyku_config.yml
+        :param workspace_file: Path to pyku_workspace.yml
+        :return:
+        :exception click.ClickException when a listed channel doesn't exist
+        """
+        with workspace_file.open('r') as workspace:
+            data: dict = yaml.full_load(workspace) or {}
+
+        root: Path = workspace_file.parent
+        channel_paths: List[Path] = []
+        for entry in data.get('Channels', []):
+            if any(character in str(entry) for character in '*?['):
+                channel_paths += sorted(path for path in root.glob(str(entry)) if (path / PKKU_CONFIG).is_file())
+                continue
+
+            channel_path: Path = root / str(entry)
+            if not channel_path.is_dir():
+                raise click.ClickException(f'{str(workspace_file)} lists {entry}, which is not a dir')
+            channel_paths.append(channel_path)
+
+        return Workspace(channel_paths, data.get('BuildWorkers', 0), workspace_file)
+
+
+class ChannelBuild(NamedTuple):
+    """
+    What a build process sends back
+
+    *Attributes:
+        channel_path (str): Channel root
+        channel_archive (Union[None, str]): Archive built
+        archive_key (Union[None, str]): Hash of the inputs the archive was built from
+        archive_from_cache (bool): If the cached archive was reused
+        output (str): What the build echoed
+        error (Union[None, str]): Why the build failed
+    """
+    channel_path: str
+    channel_archive: Union[None, str]
+    archive_key: Union[None, str]
+    archive_from_cache: bool
+    output: str
+    error: Union[None, str]
+
+
+def deploys_per_channel(channel: Channel) -> bool:
+    """
+    Checks if a channel needs more than its prebuilt archive uploaded, StreamUpload builds while uploading and
+    ImageProfile auto builds an archive per device resolution
+    """
+    return channel.channel_config is not None and \
+        (channel.channel_config.stream_upload or channel.channel_config.image_profile == 'auto')
+
+
+def build_channel_process(channel_path: str) -> ChannelBuild:
+    """
+    Builds a channel's archive, run in its own process so builds share no state, its output is captured and sent
+    back with the result
+    :param channel_path: channel root
+    :return:
+    """
+    output: io.StringIO = io.StringIO()
+    channel: Channel = Channel(channel_path)
+    error: Union[None, str] = None
+
+    with redirect_stdout(output):
+        try:
+            channel.build_channel_archive()
+        except Exception as build_error:
+            error = str(build_error) or type(build_error).__name__
+
+    return ChannelBuild(
+        channel_path,
+        str(channel.channel_archive) if channel.channel_archive is not None else None,
+        channel.archive_key,
+        channel.archive_from_cache,
+        output.getvalue(),
+        error
+    )
+
+
+class WorkspaceBuild:
+    """
+    Builds a workspace's channels in a process pool while the caller selects devices, StreamUpload channels are
+    left to build as they're uploaded
+
+    *Attributes:
+        channels (List[Channel]): Channels being built
+        workers (int): Processes in the pool
+
+    *methods
+        start() -> None:
+
+        wait() -> List[str]:
+    """
+    def __init__(self, channels: List[Channel], workers: int = 0):
+        self.channels: List[Channel] = [channel for channel in channels if not channel.channel_config.stream_upload]
+        self.workers: int = max(1, min(workers or os.cpu_count() or 1, len(self.channels)))
+        self._executor: Union[None, ProcessPoolExecutor] = None
+        self._futures: Dict[Future, Channel] = {}
+
+    def start(self) -> None:
+        """
+        Starts a build per channel
+        """
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._futures = {
+            self._executor.submit(build_channel_process, str(channel.channel_path)): channel
+            for channel in self.channels
+        }
+
+    def wait(self) -> List[str]:
+        """
+        Waits for every build, echoing each one's output as it finishes and taking on its archive
+        :return: errors, one per failed channel
+        """
+        errors: List[str] = []
+        try:
+            for future in as_completed(self._futures):
+                channel: Channel = self._futures[future]
+                try:
+                    build: ChannelBuild = future.result()
+                except Exception as error:
+                    errors.append(f'{str(channel)} | build failed: {error}')
+                    continue
+
+                for line in build.output.splitlines():
+                    click.echo(f'{str(channel)} | {line}')
+                if build.error is not None:
+                    errors.append(f'{str(channel)} | build failed: {build.error}')
+                    continue
+
+                channel.channel_archive = Path(build.channel_archive) if build.channel_archive else None
+                channel.archive_key = build.archive_key
+                channel.archive_from_cache = build.archive_from_cache
+                if channel.archive_from_cache:
+                    click.echo(f'{str(channel)} | reusing cached archive {build.channel_archive}')
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+        return errors
+
+
+def select_workspace_devices(
+    channels: List[Channel],
+    device_cache: DeviceCache,
+    refresh_devices: bool = False,
+    devices: Union[None, List[str]] = None
+) -> List[Tuple[Channel, Roku]]:
+    """
+    Pairs every channel with the devices its config lists, without prompting
+    :param channels: workspace channels
+    :param device_cache: DeviceCache used instead of fetching device-info for cached devices
+    :param refresh_devices: flag to fetch device-info even when devices are cached
+    :param devices: ip addresses, serial numbers or names, only these devices are deployed to when given
+    :return: (channel, device) per deploy
+    :exception click.ClickException when two channels list the same device
+    """
+    targets: List[dict] = [device_target(device) for device in devices or []]
+    pairs: List[Tuple[Channel, Roku]] = []
+    owners: Dict[str, Channel] = {}
+
+    for channel in channels:
+        if len(utils.get_config_rokus(channel)) == 0:
+            click.echo(f'{str(channel)} | no rokus in config, skipping')
+            continue
+
+        for selected in utils.get_selected_from_config(channel, device_cache, refresh_devices):
+            if targets and not any(target_matches(target, selected) for target in targets):
+                continue
+
+            owner: Union[None, Channel] = owners.get(selected.location, None)
+            if owner is not None:
+                raise click.ClickException(
+                    f'{selected.friendly_model_name} @ {selected.location} is listed by both {str(owner)} and '
+                    f'{str(channel)}, a device holds one dev channel'
+                )
+            owners[selected.location] = channel
+            pairs.append((channel, selected))
+
+    return pairs
+
+
+def deploy_workspace_to_devices(
+    pairs: List[Tuple[Channel, Roku]],
+    jobs: int = 1,
+    force: bool = False
+) -> List[Tuple[Channel, Roku, list]]:
+    """
+    Deploys each channel's archive to its devices, up to jobs at a time across every channel, echoing each
+    device's installer messages as soon as its deploy finishes. Channels with StreamUpload or ImageProfile auto
+    then deploy one at a time the way deploy does.
+    :param pairs: (channel, device) as returned by select_workspace_devices, channels with a built archive unless
+        they use StreamUpload
+    :param jobs: max number of concurrent deploys
+    :param force: flag to upload even to devices that already run the archive
+    :return: (channel, device, installer messages) in the order of pairs
+    """
+    planners: Dict[str, DeployPlanner] = {}
+    if not force:
+        for channel, _ in pairs:
+            if str(channel.channel_path) not in planners:
+                planners[str(channel.channel_path)] = DeployPlanner(channel.channel_config.cache_dir / DEPLOY_STATE)
+    results: dict = {}
+    shared: List[int] = [index for index, (channel, _) in enumerate(pairs) if not deploys_per_channel(channel)]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(shared) or 1))) as executor:
+        futures: dict = {
+            executor.submit(
+                utils.deploy_to_device,
+                pairs[index][0],
+                pairs[index][1],
+                planners.get(str(pairs[index][0].channel_path), None)
+            ): index
+            for index in shared
+        }
+        for future in as_completed(futures):
+            index: int = futures[future]
+            channel, selected = pairs[index]
+            try:
+                result_msgs: list = future.result()
+            except Exception as error:
+                result_msgs = [{'status': 'error', 'msg': str(error)}]
+            results[index] = result_msgs
+            for msg in result_msgs:
+                click.echo(f'{str(channel)} -> {selected.friendly_model_name} | Status {msg["status"]} | {msg["msg"]}')
+
+    by_channel: Dict[str, List[int]] = {}
+    for index, (channel, _) in enumerate(pairs):
+        if index not in shared:
+            by_channel.setdefault(str(channel.channel_path), []).append(index)
+    for indexes in by_channel.values():
+        channel: Channel = pairs[indexes[0]][0]
+        click.echo(f'{str(channel)} | deploying to {len(indexes)} device(s)')
+        try:
+            channel_results: list = utils.deploy_channel_to_devices(
+                channel,
+                [pairs[index][1] for index in indexes],
+                jobs,
+                planners.get(str(channel.channel_path), None)
+            )
+        except Exception as error:
+            # e.g. a streamed build over its SizeBudget
+            click.echo(f'{str(channel)} | build failed: {error}')
+            channel_results = [(pairs[index][1], [{'status': 'error', 'msg': str(error)}]) for index in indexes]
+        for index, (_, result_msgs) in zip(indexes, channel_results):
+            results[index] = result_msgs
+
+    for planner in planners.values():
+        planner.save()
+
+    return [(pairs[index][0], pairs[index][1], results[index]) for index in sorted(results)]
+
+
+def deploy_workspace(
+    workspace: Workspace,
+    jobs: int = 4,
+    force: bool = False,
+    refresh_devices: bool = False,
+    devices: Union[None, List[str]] = None
+) -> bool:
+    """
+    Builds every channel in parallel processes while devices are selected, then deploys each channel to its devices
+    :param workspace: Workspace to deploy
+    :param jobs: max number of devices deployed to at once
+    :param force: flag to upload even to devices that already run the archive
+    :param refresh_devices: flag to rescan instead of using cached devices
+    :param devices: ip addresses, serial numbers or names to limit the deploy to
+    :return: True if every channel built and every device deployed successfully
+    :exception click.ClickException when a channel has no config
+    """
+    channels: List[Channel] = [Channel(str(channel_path)) for channel_path in workspace.channel_paths]
+    for channel in channels:
+        if not channel.has_config:
+            raise click.ClickException(
+                f'{str(channel.channel_path)} has no {PKKU_CONFIG}, deploy it on its own first to create one'
+            )
+
+    build: WorkspaceBuild = WorkspaceBuild(channels, workspace.build_workers)
+    click.echo(f'creating {len(build.channels)} archive(s)')
+    build.start()
+    device_cache: DeviceCache = DeviceCache()
+    try:
+        pairs: List[Tuple[Channel, Roku]] = select_workspace_devices(channels, device_cache, refresh_devices, devices)
+    finally:
+        errors: List[str] = build.wait()
+        device_cache.finish()
+
+    for error in errors:
+        click.echo(error)
+    built: List[Tuple[Channel, Roku]] = [(channel, selected) for channel, selected in pairs
+                                         if channel.channel_archive is not None or
+                                         channel.channel_config.stream_upload]
+    results: List[Tuple[Channel, Roku, list]] = deploy_workspace_to_devices(built, jobs, force)
+
+    click.echo('summary')
+    all_succeeded: bool = len(errors) == 0 and len(built) == len(pairs)
+    for channel, selected, result_msgs in results:
+        succeeded: bool = utils.deploy_succeeded(result_msgs)
+        all_succeeded = all_succeeded and succeeded
+        click.echo(f'{str(channel)} -> {selected.friendly_model_name} @ {selected.location} | '
+                   f'{"ok" if succeeded else "failed"}')
+
+    return all_succeeded and len(results) > 0
@@ -27,8 +27,13 @@ setup(
     install_requires=[
         'click',
         'roku_scanner',
-        'PyInquirer'
+        'PyInquirer',
+        'PyYAML',
+        'requests'
     ],
+    extras_require={
+        'images': ['Pillow']
+    },
     entry_points={
         'console_scripts': [
             'pyku=pyku.__main__.cli'
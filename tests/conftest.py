@@ -0,0 +1,42 @@
+# coding=utf-8
+"""
+Usage:
+    Shared fixtures, channels are copies of tests/mockDevChannel so tests never write into the fixture
+
+ToDos:
+"""
+# standard lib imports
+import shutil
+from pathlib import Path
+from typing import Callable
+# third party lib imports
+import pytest
+import yaml
+# project imports
+from pyku.channel import Channel
+from pyku.constants import PKKU_CONFIG
+
+MOCK_CHANNEL: Path = Path(__file__).parent / 'mockDevChannel'
+
+
+@pytest.fixture
+def make_channel(tmp_path: Path) -> Callable[..., Channel]:
+    """
+    Returns a factory copying the mock channel into tmp_path with a fresh pyku_config.yml, keyword arguments are
+    config keys, e.g. make_channel(StreamUpload=True)
+    """
+    def factory(name: str = 'channel', **config) -> Channel:
+        root: Path = tmp_path / name
+        shutil.copytree(str(MOCK_CHANNEL), str(root), ignore=shutil.ignore_patterns('staging', PKKU_CONFIG))
+        data: dict = {
+            'Root': str(root),
+            'OutDir': str(root / 'out'),
+            'Files': ['manifest', 'components/**/*', 'images/*', 'source/*'],
+            **config
+        }
+        with (root / PKKU_CONFIG).open('w') as config_file:
+            yaml.dump(data, config_file)
+
+        return Channel(str(root))
+
+    return factory
@@ -0,0 +1,31 @@
+# coding=utf-8
+# third party lib imports
+import pytest
+# project imports
+from pyku.analyze import ArchiveAnalysis, FileReport, analyze_channel
+
+SPLASH: str = 'images/rsgde_splash_hd.jpg'
+
+
+def image_report(analysis: ArchiveAnalysis) -> FileReport:
+    return next(report for report in analysis.files if report.relative == SPLASH)
+
+
+def test_sizes_match_the_source_files(make_channel):
+    channel = make_channel()
+    analysis: ArchiveAnalysis = analyze_channel(channel)
+
+    assert analysis.image_profile is None
+    assert image_report(analysis).size == (channel.channel_path / SPLASH).stat().st_size
+    assert analysis.to_dict()['raw_size'] == sum(channel_file.size for channel_file in channel.collect_channel_files())
+
+
+def test_images_are_measured_transcoded(make_channel):
+    pytest.importorskip('PIL')
+    channel = make_channel(ImageProfile='sd')
+    analysis: ArchiveAnalysis = analyze_channel(channel)
+
+    assert analysis.image_profile == 'sd'
+    assert analysis.to_dict()['image_profile'] == 'sd'
+    assert image_report(analysis).size < (channel.channel_path / SPLASH).stat().st_size
+    assert SPLASH not in [report.relative for report in analysis.unreferenced]
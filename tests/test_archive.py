@@ -0,0 +1,176 @@
+# coding=utf-8
+# standard lib imports
+import os
+import threading
+import zipfile
+from pathlib import Path
+from typing import List
+# third party lib imports
+import pytest
+# project imports
+import pyku.archive as archive
+from pyku.fileset import ChannelFile
+from pyku.streaming import ArchiveBroadcast
+
+
+def build(channel) -> bytes:
+    channel.build_channel_archive()
+
+    return channel.channel_archive.read_bytes()
+
+
+def stream(channel) -> bytes:
+    channel.channel_config.out_dir.mkdir(parents=True, exist_ok=True)
+    broadcast: ArchiveBroadcast = ArchiveBroadcast(1, channel.channel_config.out_dir / channel.archive_file_name())
+    received: List[bytes] = []
+    upload: threading.Thread = threading.Thread(target=lambda: received.extend(broadcast.readers[0]))
+    upload.start()
+    channel.stream_channel_archive(broadcast)
+    upload.join()
+
+    assert b''.join(received) == channel.channel_archive.read_bytes()
+    return b''.join(received)
+
+
+def assert_valid(archive_bytes: bytes, archive_path: Path) -> None:
+    with zipfile.ZipFile(archive_path) as built:
+        assert built.testzip() is None
+        assert 'manifest' in built.namelist()
+        assert len(archive_bytes) == archive_path.stat().st_size
+
+
+def assert_matches_sources(channel) -> None:
+    """
+    Reopens the built archive and checks every entry's CRC and contents against the channel's files
+    """
+    with zipfile.ZipFile(channel.channel_archive) as built:
+        assert built.testzip() is None
+        assert {name: built.read(name) for name in built.namelist()} == {
+            channel_file.relative: channel_file.path.read_bytes() for channel_file in channel.collect_channel_files()
+        }
+
+
+@pytest.mark.parametrize('config, streamed', [
+    ({}, False),
+    ({'DirectBuild': True}, False),
+    ({'CompressionLevels': {'default': 9, '.brs': 0}, 'DirectBuild': True}, False),
+    ({}, True),
+    ({'DirectBuild': True}, True)
+], ids=['staged', 'direct', 'mixed-levels', 'staged-streamed', 'direct-streamed'])
+def test_every_build_path_writes_a_valid_archive(make_channel, config: dict, streamed: bool):
+    channel = make_channel(CacheArchives=False, **config)
+
+    stream(channel) if streamed else build(channel)
+
+    assert_matches_sources(channel)
+
+
+@pytest.mark.parametrize('streamed', [False, True], ids=['direct', 'direct-streamed'])
+def test_entry_cache_rebuild_writes_a_valid_archive(make_channel, streamed: bool):
+    channel = make_channel(CacheArchives=False, DirectBuild=True)
+    channel.entry_cache = {}
+    build(channel)
+
+    main: Path = channel.channel_path / 'source' / 'main.brs'
+    main.write_text(main.read_text() + '\n\' rebuilt\n')
+    stream(channel) if streamed else build(channel)
+
+    assert_matches_sources(channel)
+
+
+def test_staged_and_direct_archives_are_identical(make_channel):
+    staged = make_channel('staged', CacheArchives=False)
+    direct = make_channel('direct', CacheArchives=False, DirectBuild=True)
+
+    staged_bytes: bytes = build(staged)
+    direct_bytes: bytes = build(direct)
+
+    assert staged_bytes == direct_bytes
+    assert_valid(staged_bytes, staged.channel_archive)
+
+
+def test_rebuilds_are_reproducible(make_channel):
+    channel = make_channel(CacheArchives=False, DirectBuild=True)
+
+    first: bytes = build(channel)
+    (channel.channel_path / 'source' / 'main.brs').touch()
+
+    assert build(channel) == first
+
+
+def test_stored_and_deflated_levels(make_channel):
+    channel = make_channel(CacheArchives=False, DirectBuild=True, CompressionLevels={'default': 9, '.brs': 0})
+    build(channel)
+
+    with zipfile.ZipFile(channel.channel_archive) as built:
+        assert built.testzip() is None
+        types: dict = {info.filename: info.compress_type for info in built.infolist()}
+    assert types['source/main.brs'] == zipfile.ZIP_STORED
+    assert zipfile.ZIP_DEFLATED in types.values()
+
+
+def test_falls_back_to_public_api_without_zipfile_internals(make_channel, monkeypatch):
+    channel = make_channel(CacheArchives=False, DirectBuild=True)
+    build(channel)
+    with zipfile.ZipFile(channel.channel_archive) as built:
+        expected: dict = {name: built.read(name) for name in built.namelist()}
+
+    monkeypatch.setattr(archive, 'ZIPFILE_INTERNALS', archive.ZIPFILE_INTERNALS + ['not_a_zipfile_attribute'])
+    archive_bytes: bytes = build(channel)
+
+    assert_valid(archive_bytes, channel.channel_archive)
+    assert_matches_sources(channel)
+    with zipfile.ZipFile(channel.channel_archive) as built:
+        assert {name: built.read(name) for name in built.namelist()} == expected
+
+    stream(channel)
+    assert_matches_sources(channel)
+
+
+def test_entry_cache_keeps_one_entry_per_file(tmp_path):
+    source: Path = tmp_path / 'a.brs'
+    engine: archive.ArchiveEngine = archive.ArchiveEngine(workers=1, entry_cache={})
+
+    for version in range(5):
+        source.write_text('sub main()\n' + '  print "hello"\n' * (version + 1) + 'end sub\n')
+        os.utime(str(source), ns=(version * 10 ** 9, version * 10 ** 9))
+        engine.write_archive([ChannelFile.from_path(source, 'a.brs')], tmp_path / 'channel.zip')
+
+    assert list(engine.entry_cache) == ['a.brs']
+    with zipfile.ZipFile(tmp_path / 'channel.zip') as built:
+        assert built.read('a.brs') == source.read_bytes()
+
+
+def test_entry_cache_reuses_unchanged_files(tmp_path):
+    source: Path = tmp_path / 'a.brs'
+    source.write_text('sub main()\nend sub\n' * 50)
+    engine: archive.ArchiveEngine = archive.ArchiveEngine(workers=1, entry_cache={})
+    channel_file: ChannelFile = ChannelFile.from_path(source, 'a.brs')
+
+    first: archive.ArchiveEntry = engine.prepare_entry(channel_file)
+    assert engine.prepare_entry(channel_file).payload is first.payload
+
+
+def test_worker_count_doesnt_change_the_archive(tmp_path):
+    channel_files: List[ChannelFile] = []
+    for index in range(60):
+        source: Path = tmp_path / 'source' / f'file{index:02d}.brs'
+        source.parent.mkdir(exist_ok=True)
+        source.write_text(f'sub file{index}()\n' + '  print "line"\n' * index + 'end sub\n')
+        channel_files.append(ChannelFile.from_path(source, f'source/{source.name}'))
+
+    archive.ArchiveEngine(workers=1).write_archive(channel_files, tmp_path / 'serial.zip')
+    archive.ArchiveEngine(workers=8).write_archive(list(reversed(channel_files)), tmp_path / 'threaded.zip')
+
+    assert (tmp_path / 'serial.zip').read_bytes() == (tmp_path / 'threaded.zip').read_bytes()
+    with zipfile.ZipFile(tmp_path / 'threaded.zip') as built:
+        assert built.namelist() == sorted(channel_file.relative for channel_file in channel_files)
+
+
+def test_compression_levels_by_extension():
+    engine: archive.ArchiveEngine = archive.ArchiveEngine({'default': 6, 'BRS': 9, '.json': 0})
+
+    assert engine.compression_level('source/main.brs') == 9
+    assert engine.compression_level('data/feed.JSON') == 0
+    assert engine.compression_level('components/a.xml') == 6
+    assert engine.compression_level('images/icon.png') == 0
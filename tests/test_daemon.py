@@ -0,0 +1,121 @@
+# coding=utf-8
+# standard lib imports
+import random
+import socket
+import threading
+from pathlib import Path
+from typing import Iterator, List, Tuple
+# third party lib imports
+import pytest
+# project imports
+from benchmarks.simulator import SimulatedDevice, SimulatorServer
+from pyku.client import DaemonClient, read_message, send_message
+from pyku.daemon import DaemonServer, PykuDaemon
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason='pyku serve needs Unix sockets')
+
+
+@pytest.fixture
+def daemon(tmp_path: Path, monkeypatch) -> Iterator[Tuple[DaemonClient, PykuDaemon]]:
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    pyku: PykuDaemon = PykuDaemon(tmp_path / 'run' / 'pyku.sock')
+    server: DaemonServer = DaemonServer(pyku)
+    thread: threading.Thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield DaemonClient(pyku.socket_path), pyku
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def ecp_device() -> Iterator[SimulatorServer]:
+    """
+    A simulated device on the ECP port, configs name devices by ip address so it gets a loopback address of its own
+    """
+    server: SimulatorServer = SimulatorServer(
+        SimulatedDevice(0),
+        f'127.{random.randint(1, 254)}.{random.randint(1, 254)}.{random.randint(1, 254)}',
+        8060
+    )
+    thread: threading.Thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def raw_request(client: DaemonClient, line: bytes) -> List[dict]:
+    with client.connect() as connection, connection.makefile('rwb') as stream:
+        stream.write(line)
+        stream.flush()
+        messages: List[dict] = []
+        while True:
+            message = read_message(stream)
+            if message is None:
+                return messages
+            messages.append(message)
+
+
+def test_no_daemon(tmp_path: Path):
+    client: DaemonClient = DaemonClient(tmp_path / 'pyku.sock')
+
+    assert client.connect() is None
+    assert client.request('deploy', {}) is None
+    assert client.status() is None
+    assert client.stop() is False
+
+
+def test_socket_is_private_to_its_user(daemon):
+    client, pyku = daemon
+
+    assert pyku.socket_path.stat().st_mode & 0o777 == 0o600
+    with pytest.raises(Exception, match='already running'):
+        DaemonServer(PykuDaemon(pyku.socket_path))
+
+
+def test_status_and_bad_requests(daemon, tmp_path: Path):
+    client, pyku = daemon
+
+    status: dict = client.status()
+    assert status['socket'] == str(pyku.socket_path) and status['requests'] == 0
+
+    assert raw_request(client, b'not json\n') == [{'output': 'malformed request\n', 'exit': 2}]
+    assert raw_request(client, b'[1, 2]\n') == [{'output': 'malformed request\n', 'exit': 2}]
+    with client.connect() as connection, connection.makefile('rwb') as stream:
+        send_message(stream, {'command': 'build', 'args': {}, 'cwd': str(tmp_path)})
+        assert read_message(stream) == {'output': 'unknown command build\n'}
+        assert read_message(stream) == {'exit': 2}
+
+
+def test_commands_stream_output_and_exit_codes(daemon, tmp_path: Path, capsys):
+    client, pyku = daemon
+
+    exit_code = client.request('deploy', {'channel': str(tmp_path)})
+
+    assert exit_code == 1
+    assert capsys.readouterr().out == 'deploy\ncannot deploy a channel without pyku_config.yml, run deploy with ' \
+                                      '--no-daemon first\n'
+    assert client.request('keypress', {'channel': str(tmp_path)}) == 2
+    assert client.status()['requests'] == 2
+
+
+def test_keypress_reuses_the_warm_selection(daemon, ecp_device: SimulatorServer, make_channel):
+    client, pyku = daemon
+    ip_address: str = ecp_device.server_address[0]
+    channel = make_channel(Rokus=[{'ip_address': ip_address, 'password': 'rokudev'}])
+    args: dict = {'channel': str(channel.channel_path), 'script': 'home down*2', 'delay': 0}
+
+    assert client.request('keypress', args) == 0
+    assert client.request('keypress', {**args, 'script': 'select'}) == 0
+
+    assert ecp_device.device.keys == ['home', 'down', 'down', 'select']
+    assert list(pyku.selections) == [(str(channel.channel_path), (), False)]
+    assert client.status()['devices'] == [f'http://{ip_address}:8060/']
+
+
+def test_stop(daemon):
+    client, pyku = daemon
+
+    assert client.stop() is True
@@ -0,0 +1,78 @@
+# coding=utf-8
+# standard lib imports
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import List
+# project imports
+from pyku.debugger import DebugConsoleStreamer, DeviceConsole
+from pyku.roku import Roku
+
+
+def console_roku(serial_number: str, name: str) -> Roku:
+    roku: Roku = Roku(location='http://127.0.0.1:8060/', discovery_data={})
+    roku.load_device_info({'serial-number': serial_number, 'friendly-device-name': name})
+
+    return roku
+
+
+def test_ring_buffer_drops_the_oldest_lines(tmp_path: Path):
+    console: DeviceConsole = DeviceConsole('den', '127.0.0.1', tmp_path / 'den.log', buffer_lines=3)
+    for index in range(5):
+        console.push(f'line {index}')
+
+    assert console.dropped == 2
+    assert console.drain() == ['line 2', 'line 3', 'line 4']
+    assert console.drain() == []
+    console.close()
+
+
+def test_console_lines_are_echoed_and_logged(tmp_path: Path, capsys):
+    server: socket.socket = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    sent: threading.Event = threading.Event()
+
+    def serve() -> None:
+        connection, _ = server.accept()
+        connection.sendall(b'------ Running dev channel ------\r\nprint 1\n')
+        connection.sendall(b'split ')
+        time.sleep(0.05)
+        connection.sendall(b'line\nno newline')
+        connection.close()
+        sent.set()
+
+    thread: threading.Thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    streamer: DebugConsoleStreamer = DebugConsoleStreamer(
+        [console_roku('X00000000001', 'Den')],
+        tmp_path / 'logs',
+        port=server.getsockname()[1],
+        connect_timeout=1
+    )
+    streamer.start()
+    assert sent.wait(2)
+    time.sleep(0.2)
+    streamer.stop()
+    server.close()
+
+    expected: List[str] = ['------ Running dev channel ------', 'print 1', 'split line', 'no newline',
+                           'debug console disconnected, reconnecting']
+    assert capsys.readouterr().out.splitlines()[:5] == [f'[Den] {line}' for line in expected]
+    logged: List[str] = (tmp_path / 'logs' / 'X00000000001.log').read_text().splitlines()
+    assert [line.split(' ', 2)[2] for line in logged][:5] == expected
+
+
+def test_unreachable_console_is_reported(tmp_path: Path, capsys):
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        port: int = unused.getsockname()[1]
+    streamer: DebugConsoleStreamer = DebugConsoleStreamer([console_roku('X00000000002', 'Office')], tmp_path, port=port)
+
+    started: float = time.perf_counter()
+    streamer.start()
+    assert time.perf_counter() - started < 1
+    streamer.stop()
+
+    assert capsys.readouterr().out.startswith('[Office] unable to connect to debug console, retrying')
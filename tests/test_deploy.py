@@ -0,0 +1,36 @@
+# coding=utf-8
+# standard lib imports
+import time
+# project imports
+from benchmarks.simulator import SimulatorFleet
+import pyku.utils as utils
+
+
+def test_jobs_deploy_devices_concurrently_in_selection_order(make_channel):
+    channel = make_channel()
+    channel.build_channel_archive()
+
+    with SimulatorFleet(4, install_time=0.5) as fleet:
+        rokus: list = list(reversed(fleet.rokus()))
+        started: float = time.perf_counter()
+        results = utils.deploy_archive_to_devices(channel, rokus, 4)
+        elapsed: float = time.perf_counter() - started
+
+        assert [roku for roku, _ in results] == rokus
+        assert all(utils.deploy_succeeded(result_msgs) for _, result_msgs in results)
+        assert [server.device.installs for server in fleet.servers] == [1, 1, 1, 1]
+        # one device at a time would take four install times
+        assert elapsed < 1.5
+
+
+def test_one_failing_device_doesnt_stop_the_others(make_channel):
+    channel = make_channel()
+    channel.build_channel_archive()
+
+    with SimulatorFleet(3) as fleet:
+        rokus: list = fleet.rokus()
+        rokus[1].password = 'wrong'
+        results = utils.deploy_archive_to_devices(channel, rokus, 3)
+
+        assert [utils.deploy_succeeded(result_msgs) for _, result_msgs in results] == [True, False, True]
+        assert [server.device.installs for server in fleet.servers] == [1, 0, 1]
@@ -0,0 +1,54 @@
+# coding=utf-8
+# standard lib imports
+import sys
+# third party lib imports
+import pytest
+# project imports
+from benchmarks.simulator import SimulatedDevice, SimulatorFleet
+from pyku.device import DeviceHandle, DeviceRecord
+from pyku.device_cache import DeviceCache
+from pyku.roku import Roku
+
+LOCATION: str = 'http://192.168.1.20:8060/'
+
+
+def test_device_info_is_decoded_on_first_read():
+    record: DeviceRecord = DeviceRecord(LOCATION, SimulatedDevice(3, is_tv=True).device_info(), 'uuid:roku:ecp:x')
+
+    assert record._values is None
+    assert record.serial_number == 'SIM000000003'
+    assert record._source is None
+    assert record.is_tv is True
+    assert record.is_stick is False
+    assert record.wifi_mac is None
+    assert record.model_name is sys.intern('Roku TV')
+    assert record.get_ip_address() == '192.168.1.20'
+    with pytest.raises(AttributeError):
+        record.not_a_device_info_field
+
+
+def test_records_round_trip_through_roku_and_the_cache(tmp_path):
+    with SimulatorFleet(1) as fleet:
+        roku: Roku = fleet.rokus()[0]
+    record: DeviceRecord = DeviceRecord.from_roku(roku)
+    expanded: Roku = record.to_roku()
+
+    assert expanded.location == roku.location
+    assert expanded.serial_number == roku.serial_number
+    assert expanded.developer_enabled == roku.developer_enabled
+    assert record.get_device_info().items() <= roku.get_device_info().items()
+
+    cache: DeviceCache = DeviceCache(tmp_path / 'devices.json')
+    cache.store(roku)
+    cached: DeviceRecord = DeviceRecord.from_cache_entry(next(iter(cache.entries.values())))
+    assert cached.get_device_info() == record.get_device_info()
+
+
+def test_handle_keeps_what_commands_need():
+    tv: DeviceRecord = DeviceRecord(LOCATION, SimulatedDevice(3, is_tv=True).device_info())
+    player: DeviceRecord = DeviceRecord(LOCATION, SimulatedDevice(0).device_info())
+
+    assert 'volumeup' in DeviceHandle.from_roku(tv).allowed_commands
+    assert 'volumeup' not in DeviceHandle.from_roku(player).allowed_commands
+    assert DeviceHandle.from_roku(player).password is None
+    assert DeviceHandle.from_roku(player).get_ip_address() == '192.168.1.20'
@@ -0,0 +1,120 @@
+# coding=utf-8
+# standard lib imports
+import json
+import time
+# project imports
+from pyku.device_cache import DeviceCache
+from pyku.roku import Roku
+
+LOCATION: str = 'http://192.168.1.20:8060/'
+DEVICE_INFO: dict = {'serial-number': 'X00000000001', 'friendly-device-name': 'Living Room', 'udn': 'abc'}
+
+
+def make_roku(usn: str, location: str = LOCATION, device_info: dict = DEVICE_INFO) -> Roku:
+    roku: Roku = Roku(location=location, discovery_data={'USN': usn, 'Cache-Control': 'max-age=3600'})
+    roku.load_device_info(dict(device_info))
+
+    return roku
+
+
+def test_configured_and_discovered_device_share_an_entry(tmp_path):
+    cache: DeviceCache = DeviceCache(tmp_path / 'devices.json')
+
+    cache.store(make_roku(''))
+    cache.store(make_roku('uuid:roku:ecp:X00000000001'))
+
+    assert list(cache.entries) == [f'uuid:roku:ecp:X00000000001|{LOCATION}']
+    assert len(cache.load_rokus()) == 1
+
+
+def test_new_device_at_a_location_replaces_the_old_one(tmp_path):
+    cache: DeviceCache = DeviceCache(tmp_path / 'devices.json')
+
+    cache.store(make_roku('uuid:roku:ecp:X00000000001'))
+    cache.store(make_roku('uuid:roku:ecp:X00000000002', device_info={'serial-number': 'X00000000002'}))
+
+    rokus: list = cache.load_rokus()
+    assert len(rokus) == 1
+    assert rokus[0].serial_number == 'X00000000002'
+
+
+def test_devices_at_different_locations_are_kept(tmp_path):
+    cache: DeviceCache = DeviceCache(tmp_path / 'devices.json')
+
+    cache.store(make_roku('uuid:roku:ecp:X00000000001'))
+    cache.store(make_roku('', 'http://192.168.1.21:8060/', {'serial-number': 'X00000000002'}))
+
+    assert sorted(roku.location for roku in cache.load_rokus()) == [LOCATION, 'http://192.168.1.21:8060/']
+
+
+def test_old_cache_with_duplicate_keys_loads_one_device_per_location(tmp_path):
+    cache_file = tmp_path / 'devices.json'
+    entry: dict = {
+        'location': LOCATION,
+        'discovery_data': {'USN': ''},
+        'device_info': dict(DEVICE_INFO, **{'friendly-device-name': 'Old'}),
+        'fetched_at': time.time() - 10,
+        'max_age': 3600
+    }
+    newer: dict = dict(entry, discovery_data={'USN': 'uuid:roku:ecp:X00000000001'}, device_info=DEVICE_INFO,
+                       fetched_at=time.time())
+    cache_file.write_text(json.dumps({f'|{LOCATION}': entry, f'uuid:roku:ecp:X00000000001|{LOCATION}': newer}))
+
+    rokus: list = DeviceCache(cache_file).load_rokus()
+
+    assert len(rokus) == 1
+    assert rokus[0].friendly_device_name == 'Living Room'
+
+
+def test_save_round_trips(tmp_path):
+    cache: DeviceCache = DeviceCache(tmp_path / 'pyku' / 'devices.json')
+    cache.store(make_roku('uuid:roku:ecp:X00000000001'))
+    cache.save()
+
+    assert DeviceCache(tmp_path / 'pyku' / 'devices.json').entries == cache.entries
+
+
+def test_configured_devices_dont_stand_in_for_discovery(tmp_path):
+    cache: DeviceCache = DeviceCache(tmp_path / 'devices.json')
+
+    cache.store(make_roku(''))
+    assert cache.load_rokus(discovered_only=True) == []
+
+    cache.store(make_roku('uuid:roku:ecp:X00000000001'))
+    cache.store(make_roku(''))
+    assert len(cache.load_rokus(discovered_only=True)) == 1
+
+
+def test_rescan_caches_answering_devices(tmp_path, monkeypatch):
+    def discover(engine, targets, on_device):
+        on_device(make_roku('uuid:roku:ecp:X00000000002', 'http://192.168.1.21:8060/',
+                            {'serial-number': 'X00000000002'}), None)
+        return []
+
+    monkeypatch.setattr('pyku.device_cache.DiscoveryEngine.discover', discover)
+    cache: DeviceCache = DeviceCache(tmp_path / 'devices.json')
+    cache.store(make_roku('uuid:roku:ecp:X00000000001'))
+    for entry in cache.entries.values():
+        entry['fetched_at'] = time.time() - 7200
+    monkeypatch.setattr(cache, 'revalidate', lambda entry: None)
+
+    assert cache.has_stale_entries()
+    cache.rescan()
+    cache.finish()
+
+    assert sorted(roku.serial_number for roku in cache.load_rokus()) == ['X00000000001', 'X00000000002']
+
+
+def test_load_without_revalidating_leaves_stale_entries_to_rescan(tmp_path, monkeypatch):
+    cache: DeviceCache = DeviceCache(tmp_path / 'devices.json')
+    cache.store(make_roku('uuid:roku:ecp:X00000000001'))
+    for entry in cache.entries.values():
+        entry['fetched_at'] = time.time() - 7200
+    revalidated: list = []
+    monkeypatch.setattr(cache, 'revalidate', revalidated.append)
+
+    assert len(cache.load_rokus(discovered_only=True, revalidate=False)) == 1
+    assert revalidated == []
+
+    cache.load_rokus()
+    assert len(revalidated) == 1
@@ -0,0 +1,114 @@
+# coding=utf-8
+# standard lib imports
+import socket
+import threading
+import time
+from typing import Iterator, List, Tuple
+# third party lib imports
+import pytest
+# project imports
+from benchmarks.simulator import SimulatorFleet
+from pyku.discovery import DiscoveryEngine, device_target, parse_ssdp_response
+from pyku.roku import Roku
+import pyku.utils as utils
+
+
+def unfetched(location: str) -> Roku:
+    return Roku(location=location, discovery_data={'LOCATION': location})
+
+
+def closed_port_location() -> str:
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{unused.getsockname()[1]}/'
+
+
+def test_device_info_fetch_drops_slow_and_offline_devices():
+    with SimulatorFleet(3) as fleet, SimulatorFleet(1, latency=3) as slow:
+        rokus: List[Roku] = [unfetched(server.location) for server in fleet.servers]
+        rokus.insert(1, unfetched(slow.servers[0].location))
+        rokus.append(unfetched(closed_port_location()))
+
+        started: float = time.perf_counter()
+        reachable: List[Roku] = utils.fetch_device_info_for_rokus(rokus, timeout=0.5, workers=8)
+
+        # the slow device's timeout runs alongside the other fetches, not after them
+        assert time.perf_counter() - started < 2
+        assert [roku.location for roku in reachable] == [server.location for server in fleet.servers]
+        assert [roku.serial_number for roku in reachable] == [server.device.serial_number for server in fleet.servers]
+
+
+@pytest.fixture
+def responder() -> Iterator[Tuple[tuple, List[str], List[bytes]]]:
+    """
+    A stand in for the SSDP multicast group on loopback, answers every M-SEARCH with one response per location
+    :return: (address, locations to answer with, M-SEARCH requests received)
+    """
+    locations: List[str] = []
+    searches: List[bytes] = []
+    server: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+    server.settimeout(0.1)
+    running: threading.Event = threading.Event()
+    running.set()
+
+    def serve() -> None:
+        while running.is_set():
+            try:
+                data, address = server.recvfrom(4096)
+            except socket.timeout:
+                continue
+            searches.append(data)
+            for location in list(locations):
+                server.sendto(f'HTTP/1.1 200 OK\r\nCache-Control: max-age=3600\r\nST: roku:ecp\r\n'
+                              f'location: {location}\r\nUSN: uuid:roku:ecp:{location}\r\n\r\n'.encode(), address)
+
+    thread: threading.Thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield server.getsockname(), locations, searches
+    running.clear()
+    thread.join()
+    server.close()
+
+
+def test_parse_ssdp_response():
+    response: bytes = b'HTTP/1.1 200 OK\r\nlocation: http://192.168.1.20:8060/\r\nST: roku:ecp\r\n\r\n'
+    headers: dict = parse_ssdp_response(response)
+
+    assert headers == {'LOCATION': 'http://192.168.1.20:8060/', 'ST': 'roku:ecp'}
+    assert parse_ssdp_response(b'M-SEARCH * HTTP/1.1\r\nLOCATION: x\r\n\r\n') is None
+    assert parse_ssdp_response(b'HTTP/1.1 200 OK\r\nST: roku:ecp\r\n\r\n') is None
+    assert parse_ssdp_response(b'\xff\xfe') is None
+
+
+def test_device_target():
+    assert device_target('192.168.1.20') == {'ip_address': '192.168.1.20'}
+    assert device_target('Living Room') == {'serial_number': 'Living Room', 'name': 'Living Room'}
+
+
+def test_devices_are_streamed_as_they_answer(responder):
+    address, locations, searches = responder
+    with SimulatorFleet(3) as fleet:
+        locations += [server.location for server in fleet.servers] + [closed_port_location()]
+        answered: list = []
+        engine: DiscoveryEngine = DiscoveryEngine(timeout=1.5, fetch_timeout=0.5, search_address=address)
+
+        rokus: List[Roku] = engine.discover(None, lambda roku, error: answered.append((roku.location, error)))
+
+        assert sorted(roku.serial_number for roku in rokus) == [server.device.serial_number for server in fleet.servers]
+        assert len(answered) == 4
+        assert [location for location, error in answered if error is not None] == [locations[-1]]
+        assert searches[0].startswith(b'M-SEARCH * HTTP/1.1\r\n') and b'ST:roku:ecp' in searches[0]
+
+
+def test_discovery_stops_once_every_target_answered(responder):
+    address, locations, _ = responder
+    with SimulatorFleet(2) as fleet:
+        locations += [server.location for server in fleet.servers]
+        engine: DiscoveryEngine = DiscoveryEngine(timeout=10, search_address=address)
+
+        started: float = time.perf_counter()
+        rokus: List[Roku] = engine.discover([{'serial_number': fleet.servers[0].device.serial_number}])
+
+        assert time.perf_counter() - started < 2
+        assert fleet.servers[0].device.serial_number in [roku.serial_number for roku in rokus]
@@ -0,0 +1,55 @@
+# coding=utf-8
+# standard lib imports
+from typing import List
+# third party lib imports
+import pytest
+# project imports
+from benchmarks.simulator import SimulatorFleet, SimulatorRequestHandler
+from pyku.ecp import EcpClient, allowed_commands, parse_key_script, text_to_keys
+
+
+def test_parse_key_script():
+    assert parse_key_script('home wait:2 down*3, select "a b" enter # comment') == [
+        'home', 'wait:2', 'down', 'down', 'down', 'select', 'Lit_a', 'Lit_%20', 'Lit_b', 'enter'
+    ]
+    assert parse_key_script("'x' Lit_y") == ['Lit_x', 'Lit_y']
+    with pytest.raises(ValueError):
+        parse_key_script('home "unclosed')
+
+
+def test_text_to_keys_quotes_characters():
+    assert text_to_keys('a/é') == ['Lit_a', 'Lit_%2F', 'Lit_%C3%A9']
+
+
+def test_keys_are_sent_in_order_over_one_connection(monkeypatch):
+    connections: List[tuple] = []
+    setup = SimulatorRequestHandler.setup
+
+    def record_connection(handler: SimulatorRequestHandler) -> None:
+        connections.append(handler.client_address)
+        setup(handler)
+
+    monkeypatch.setattr(SimulatorRequestHandler, 'setup', record_connection)
+    with SimulatorFleet(1) as fleet:
+        connections.clear()
+        client: EcpClient = EcpClient(fleet.servers[0].location, allowed_commands(False, False))
+        keys: List[str] = parse_key_script('home down*3 wait:0.01 "hi" select')
+
+        assert client.send_keys(keys, delay=0) == 7
+        client.keypress('back')
+        client.close()
+
+        assert fleet.servers[0].device.keys == ['home', 'down', 'down', 'down', 'Lit_h', 'Lit_i', 'select', 'back']
+        assert len(connections) == 1
+
+
+def test_unknown_key_sends_nothing():
+    with SimulatorFleet(1) as fleet:
+        client: EcpClient = EcpClient(fleet.servers[0].location, allowed_commands(False, False))
+
+        with pytest.raises(Exception, match='unknown command volumeup, wait:soon'):
+            client.send_keys(['home', 'volumeup', 'wait:soon'], delay=0)
+        assert fleet.servers[0].device.keys == []
+
+        EcpClient(fleet.servers[0].location, allowed_commands(True, False)).keypress('volumeup')
+        assert fleet.servers[0].device.keys == ['volumeup']
@@ -0,0 +1,111 @@
+# coding=utf-8
+# standard lib imports
+import glob
+import os
+from pathlib import Path
+from typing import List, Set
+# third party lib imports
+import pytest
+# project imports
+from pyku.constants import STANDARD_CONFIG
+from pyku.fileset import FileSetResolver
+
+TREE: List[str] = [
+    'manifest',
+    'README.md',
+    'source/main.brs',
+    'source/.hidden.brs',
+    'source/notes.md',
+    'components/a.xml',
+    'components/.a.xml.swp',
+    'components/sub/b.xml',
+    'components/sub/deep/c.brs',
+    'components/sub/.cache/x.bin',
+    'images/icon.png',
+    'images/.DS_Store',
+    'images/nested/n.png',
+    'images/nested/.hidden.png',
+    'other/unused.txt',
+    '.git/config'
+]
+
+
+@pytest.fixture
+def root(tmp_path: Path) -> Path:
+    for relative in TREE:
+        path: Path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(relative)
+
+    return tmp_path
+
+
+def glob_file_set(root: Path, patterns: List[str]) -> Set[str]:
+    """
+    The file set as staging resolved it before FileSetResolver, glob.glob per pattern with matched dirs walked
+    """
+    found: Set[str] = set()
+    for pattern in patterns:
+        for path in glob.glob(str(root / pattern)):
+            if os.path.isfile(path):
+                found.add(Path(path).relative_to(root).as_posix())
+            elif os.path.isdir(path):
+                for directory, _, files in os.walk(path):
+                    found.update((Path(directory) / file).relative_to(root).as_posix() for file in files)
+
+    return found
+
+
+def resolve(root: Path, includes: List[str], excludes: List[str] = None) -> List[str]:
+    return [channel_file.relative for channel_file in FileSetResolver(root, includes, excludes).resolve()]
+
+
+@pytest.mark.parametrize('patterns', [
+    STANDARD_CONFIG['Files'],
+    ['manifest', 'source', 'components', 'images'],
+    ['source/*.brs', 'components/*/*.xml'],
+    ['*'],
+    ['images/nested']
+])
+def test_matches_glob(root: Path, patterns: List[str]):
+    assert set(resolve(root, patterns)) == glob_file_set(root, patterns)
+
+
+def test_wildcards_skip_hidden_names_but_matched_dirs_keep_them(root: Path):
+    relatives: List[str] = resolve(root, STANDARD_CONFIG['Files'])
+
+    assert 'source/.hidden.brs' not in relatives
+    assert 'images/.DS_Store' not in relatives
+    assert '.git/config' not in relatives
+    assert 'images/nested/.hidden.png' in relatives
+    assert 'components/sub/.cache/x.bin' in relatives
+
+
+def test_sorted_and_unique(root: Path):
+    relatives: List[str] = resolve(root, STANDARD_CONFIG['Files'] + ['source/*', 'components'])
+
+    assert relatives == sorted(set(relatives))
+
+
+def test_exclude(root: Path):
+    relatives: List[str] = resolve(root, ['**/*'], ['**/*.md', 'components/sub/deep', 'images/nested/*.png'])
+
+    assert 'README.md' not in relatives
+    assert 'source/notes.md' not in relatives
+    assert 'components/sub/deep/c.brs' not in relatives
+    assert 'images/nested/n.png' not in relatives
+    assert 'components/sub/b.xml' in relatives
+    assert 'other/unused.txt' in relatives
+
+
+def test_channel_leaves_out_staging_and_out_dir(make_channel):
+    channel = make_channel(Files=['*'])
+    (channel.channel_path / 'out').mkdir()
+    (channel.channel_path / 'out' / 'channel.zip').write_text('')
+    (channel.channel_path / 'staging' / 'source').mkdir(parents=True)
+    (channel.channel_path / 'staging' / 'source' / 'main.brs').write_text('')
+
+    relatives: List[str] = [channel_file.relative for channel_file in channel.collect_channel_files()]
+
+    assert 'manifest' in relatives
+    assert not any(relative.split('/')[0] in ('out', 'staging') for relative in relatives)
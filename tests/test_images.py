@@ -0,0 +1,83 @@
+# coding=utf-8
+# standard lib imports
+from pathlib import Path
+from typing import Dict, List
+# third party lib imports
+import pytest
+# project imports
+from benchmarks.simulator import SimulatorFleet
+from pyku.fileset import ChannelFile
+from pyku.images import ImageTranscoder, design_height, is_transcodable, profile_for_device_info
+import pyku.utils as utils
+
+
+def test_design_height():
+    assert design_height({'ui_resolutions': 'sd,hd'}) == 720
+    assert design_height({'ui_resolutions': ' FHD '}) == 1080
+    assert design_height({}) == 1080
+    assert design_height(None) == 1080
+
+
+def test_profile_for_device_info():
+    assert profile_for_device_info({'ui-resolution': '720p'}) == 'hd'
+    assert profile_for_device_info({'ui-resolution': '1080p'}) == 'fhd'
+    assert profile_for_device_info({'ui-resolution': '480i'}) == 'sd'
+    assert profile_for_device_info({}) is None
+
+
+def test_is_transcodable():
+    assert is_transcodable('images/poster.JPG')
+    assert is_transcodable('components/art/icon.png')
+    assert not is_transcodable('images/frame.9.png')
+    assert not is_transcodable('source/images/icon.png')
+    assert not is_transcodable('images/clip.gif')
+
+
+def test_images_are_scaled_and_cached(tmp_path: Path, capsys):
+    image = pytest.importorskip('PIL.Image')
+    root: Path = tmp_path / 'channel'
+    (root / 'images').mkdir(parents=True)
+    image.effect_noise((1920, 1080), 64).convert('RGB').save(root / 'images' / 'poster.jpg', quality=95)
+    image.linear_gradient('L').resize((600, 300)).save(root / 'images' / 'icon.png')
+    (root / 'images' / 'broken.png').write_bytes(b'not a png')
+    (root / 'images' / 'frame.9.png').write_bytes(b'nine patch')
+    channel_files: List[ChannelFile] = [
+        ChannelFile.from_path(root / 'images' / name, f'images/{name}')
+        for name in ['broken.png', 'frame.9.png', 'icon.png', 'poster.jpg']
+    ]
+
+    transcoded: Dict[str, ChannelFile] = {
+        channel_file.relative: channel_file
+        for channel_file in ImageTranscoder(tmp_path / '.pyku', 'hd', 1080, workers=2).transcode(channel_files)
+    }
+
+    assert list(transcoded) == [channel_file.relative for channel_file in channel_files]
+    with image.open(transcoded['images/poster.jpg'].path) as poster:
+        assert poster.size == (1280, 720)
+    with image.open(transcoded['images/icon.png'].path) as icon:
+        assert icon.size == (400, 200)
+    assert transcoded['images/broken.png'].path.read_bytes() == b'not a png'
+    assert transcoded['images/frame.9.png'].path == root / 'images' / 'frame.9.png'
+    assert capsys.readouterr().out == 'images | 3 transcoded, 0 cached for hd\n'
+
+    ImageTranscoder(tmp_path / '.pyku', 'hd', 1080).transcode(channel_files)
+    assert capsys.readouterr().out == 'images | 0 transcoded, 3 cached for hd\n'
+
+
+def test_auto_profile_deploys_an_archive_per_resolution(make_channel):
+    pytest.importorskip('PIL')
+    channel = make_channel(ImageProfile='auto')
+    channel.build_channel_archive()
+    designed_size: int = channel.channel_archive.stat().st_size
+
+    with SimulatorFleet(3) as fleet:
+        for server, ui_resolution in zip(fleet.servers, ['1080p', '720p', '480p']):
+            server.device.ui_resolution = ui_resolution
+        results = utils.deploy_channel_to_devices(channel, fleet.rokus(), 3)
+
+        assert all(utils.deploy_succeeded(result_msgs) for _, result_msgs in results)
+        received: List[int] = [server.device.received_bytes for server in fleet.servers]
+        # the mock channel is designed for hd, only the sd device gets smaller images
+        assert received[0] == received[1] == designed_size
+        assert received[2] < designed_size
+        assert (channel.channel_config.out_dir / f'{channel}_sd.zip').exists()
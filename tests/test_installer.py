@@ -0,0 +1,139 @@
+# coding=utf-8
+# standard lib imports
+import io
+import socket
+import zipfile
+from pathlib import Path
+from typing import List
+from urllib.parse import urlparse
+# third party lib imports
+import pytest
+import requests
+# project imports
+from benchmarks.simulator import SimulatorFleet, SimulatorRequestHandler
+from pyku.installer import MultipartFileBody, PluginInstallerClient
+from tests.conftest import MOCK_CHANNEL
+
+
+@pytest.fixture
+def archive(tmp_path: Path) -> Path:
+    archive_path: Path = tmp_path / 'channel.zip'
+    with zipfile.ZipFile(archive_path, 'w') as zip_file:
+        zip_file.write(MOCK_CHANNEL / 'manifest', 'manifest')
+
+    return archive_path
+
+
+def client_for(fleet: SimulatorFleet, password: str = 'rokudev') -> PluginInstallerClient:
+    return PluginInstallerClient(urlparse(fleet.rokus()[0].location).netloc, 'rokudev', password)
+
+
+def statuses(result_msgs: list) -> List[str]:
+    return [msg['status'] for msg in result_msgs]
+
+
+def test_replace_reuses_the_nonce(archive: Path):
+    with SimulatorFleet(1) as fleet:
+        client: PluginInstallerClient = client_for(fleet)
+
+        assert 'error' not in statuses(client.replace(archive))
+        assert 'error' not in statuses(client.replace(archive))
+        assert fleet.servers[0].device.installs == 2
+        assert len(fleet.servers[0].device.nonces) == 1
+
+
+def test_wrong_password_is_a_401_error(archive: Path):
+    with SimulatorFleet(1) as fleet:
+        result_msgs: list = client_for(fleet, 'wrong').replace(archive)
+
+        assert [(msg['status'], msg['http_status']) for msg in result_msgs] == [('error', 401)]
+        assert fleet.servers[0].device.installs == 0
+
+
+def test_upload_answered_401_authenticates_again(archive: Path, monkeypatch):
+    authorized = SimulatorRequestHandler.authorized
+    rejected: list = []
+
+    def reject_first_upload(handler: SimulatorRequestHandler) -> bool:
+        if handler.command == 'POST' and not rejected:
+            rejected.append(handler.path)
+            return False
+        return authorized(handler)
+
+    monkeypatch.setattr(SimulatorRequestHandler, 'authorized', reject_first_upload)
+    with SimulatorFleet(1) as fleet:
+        client: PluginInstallerClient = client_for(fleet)
+
+        # requests' digest auth resends a seekable body once with the new nonce
+        assert 'error' not in statuses(client.replace(archive))
+        assert rejected == ['/plugin_install']
+        assert fleet.servers[0].device.installs == 1
+
+
+def test_unreachable_device(archive: Path):
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        port: int = unused.getsockname()[1]
+    client: PluginInstallerClient = PluginInstallerClient(f'127.0.0.1:{port}', 'rokudev', 'rokudev')
+
+    result_msgs: list = client.replace(archive)
+
+    assert statuses(result_msgs) == ['error']
+    assert 'unable to reach' in result_msgs[0]['msg']
+
+
+def test_failed_upload_authenticates_again(archive: Path, monkeypatch):
+    with SimulatorFleet(1) as fleet:
+        client: PluginInstallerClient = client_for(fleet)
+        post = client.session.post
+
+        def reset(*args, **kwargs) -> requests.Response:
+            raise requests.ConnectionError('connection reset')
+
+        monkeypatch.setattr(client.session, 'post', reset)
+
+        result_msgs: list = client.replace(archive)
+        assert statuses(result_msgs) == ['error']
+        assert 'Replace request failed: connection reset' == result_msgs[0]['msg']
+        assert client._local.authenticated is False
+
+        monkeypatch.setattr(client.session, 'post', post)
+        assert 'error' not in statuses(client.replace(archive))
+        assert fleet.servers[0].device.installs == 1
+
+
+@pytest.mark.parametrize('source', ['path', 'bytes'])
+def test_file_body_reads_and_seeks_across_parts(tmp_path: Path, source: str):
+    content: bytes = bytes(range(256)) * 40
+    archive_path: Path = tmp_path / 'channel.zip'
+    archive_path.write_bytes(content)
+    body: MultipartFileBody = MultipartFileBody(
+        [('mysubmit', 'Replace'), ('extra', 'field')],
+        'archive',
+        archive_path if source == 'path' else io.BytesIO(content)
+    )
+    whole: bytes = body.read()
+    assert len(whole) == len(body) and content in whole
+
+    # every segment boundary, and a byte either side of it
+    boundaries: List[int] = []
+    start: int = 0
+    for part in body.parts:
+        start += part[1] if isinstance(part, tuple) else len(part)
+        boundaries.append(start)
+    for boundary in boundaries[:-1]:
+        for offset in (boundary - 1, boundary, boundary + 1):
+            assert body.seek(offset) == offset
+            assert body.read(64) == whole[offset:offset + 64]
+            assert body.tell() == min(offset + 64, len(whole))
+
+    body.seek(0)
+    assert b''.join(iter(lambda: body.read(7), b'')) == whole
+
+    body.seek(10)
+    assert body.seek(-5, io.SEEK_CUR) == 5
+    assert body.seek(-3, io.SEEK_END) == len(whole) - 3
+    assert body.read() == whole[-3:]
+    assert body.seek(len(whole) + 100) == len(whole)
+    assert body.read() == b''
+    body.close()
@@ -0,0 +1,59 @@
+# coding=utf-8
+# standard lib imports
+import sys
+import threading
+# third party lib imports
+import click
+import pytest
+# project imports
+from pyku.pipeline import BackgroundBuild, DeferredOutput
+
+
+def test_build_output_is_held_until_wait(make_channel, capsys, monkeypatch):
+    channel = make_channel(CacheArchives=False)
+    build_archive = channel.build_channel_archive
+    selecting: threading.Event = threading.Event()
+
+    def build_while_selecting() -> None:
+        click.echo('build started')
+        selecting.wait(5)
+        build_archive()
+
+    monkeypatch.setattr(channel, 'build_channel_archive', build_while_selecting)
+    stdout = sys.stdout
+    build: BackgroundBuild = BackgroundBuild(channel)
+    build.start()
+    click.echo('Select Device(s)')
+    selecting.set()
+    assert capsys.readouterr().out == 'Select Device(s)\n'
+
+    build.wait()
+
+    assert sys.stdout is stdout
+    assert capsys.readouterr().out.startswith('build started\n')
+    assert channel.channel_archive.exists()
+
+
+def test_wait_raises_what_the_build_raised(make_channel, capsys):
+    channel = make_channel(CacheArchives=False, SizeBudget=100)
+    stdout = sys.stdout
+    build: BackgroundBuild = BackgroundBuild(channel)
+    build.start()
+
+    with pytest.raises(click.ClickException, match='SizeBudget'):
+        build.wait()
+    assert sys.stdout is stdout
+
+
+def test_deferred_output_passes_other_threads_through(capsys):
+    output: DeferredOutput = DeferredOutput(sys.stdout)
+    output.thread_id = threading.get_ident()
+    output.write('held\n')
+    writer: threading.Thread = threading.Thread(target=lambda: output.write('direct\n'))
+    writer.start()
+    writer.join()
+
+    assert capsys.readouterr().out == 'direct\n'
+    output.release()
+    assert capsys.readouterr().out == 'held\n'
+    assert output.encoding == sys.stdout.encoding
@@ -0,0 +1,75 @@
+# coding=utf-8
+# standard lib imports
+import zipfile
+from pathlib import Path
+# project imports
+from benchmarks.simulator import SimulatorFleet
+from pyku.channel import Channel
+from pyku.planner import PLAN_REPLACE, PLAN_SKIP, DeployPlanner
+import pyku.utils as utils
+from tests.conftest import MOCK_CHANNEL
+
+
+def make_archive(tmp_path: Path) -> Path:
+    archive: Path = tmp_path / 'dev.zip'
+    with zipfile.ZipFile(archive, 'w') as zip_file:
+        zip_file.write(MOCK_CHANNEL / 'manifest', 'manifest')
+
+    return archive
+
+
+def test_plan_skips_only_the_recorded_archive_on_an_unchanged_device(tmp_path):
+    with SimulatorFleet(1) as fleet:
+        roku = fleet.rokus()[0]
+        roku.deploy_archive(make_archive(tmp_path))
+        planner = DeployPlanner(tmp_path / 'deploy_state.json')
+
+        assert planner.plan(roku, 'a') == PLAN_REPLACE
+
+        planner.record(roku, 'a')
+        assert planner.plan(roku, 'a') == PLAN_SKIP
+        assert planner.plan(roku, 'b') == PLAN_REPLACE
+
+        fleet.servers[0].device.delete()
+        assert planner.plan(roku, 'a') == PLAN_REPLACE
+
+
+def test_record_survives_save(tmp_path):
+    with SimulatorFleet(1) as fleet:
+        roku = fleet.rokus()[0]
+        roku.deploy_archive(make_archive(tmp_path))
+        planner = DeployPlanner(tmp_path / '.pyku' / 'deploy_state.json')
+        planner.record(roku, 'a')
+        planner.save()
+
+        assert DeployPlanner(tmp_path / '.pyku' / 'deploy_state.json').plan(roku, 'a') == PLAN_SKIP
+
+
+def test_deploys_record_the_archive_digest(make_channel):
+    channel = make_channel()
+    channel.build_channel_archive()
+
+    with SimulatorFleet(2) as fleet:
+        planner = DeployPlanner(channel.channel_config.cache_dir / 'deploy_state.json')
+        results = utils.deploy_archive_to_devices(channel, fleet.rokus(), 2, planner)
+        assert all(utils.deploy_succeeded(result_msgs) for _, result_msgs in results)
+        assert {record['digest'] for record in planner.devices.values()} == {channel.archive_digest()}
+
+        results = utils.deploy_archive_to_devices(channel, fleet.rokus(), 2, planner)
+        assert [result_msgs[0]['status'] for _, result_msgs in results] == ['skipped', 'skipped']
+        assert [server.device.installs for server in fleet.servers] == [1, 1]
+
+
+def test_streamed_deploys_record_the_archive_digest(make_channel):
+    channel = make_channel(StreamUpload=True)
+
+    with SimulatorFleet(2) as fleet:
+        planner = DeployPlanner(channel.channel_config.cache_dir / 'deploy_state.json')
+        utils.stream_archive_to_devices(channel, fleet.rokus(), 2, planner)
+        assert {record['digest'] for record in planner.devices.values()} == {channel.archive_digest()}
+
+        # the rebuild comes from the archive cache, so the planner can skip both devices
+        results = utils.stream_archive_to_devices(Channel(str(channel.channel_path)), fleet.rokus(), 2, planner)
+        assert [result_msgs[0]['status'] for _, result_msgs in results] == ['skipped', 'skipped']
+        assert [server.device.installs for server in fleet.servers] == [1, 1]
+
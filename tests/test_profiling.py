@@ -0,0 +1,89 @@
+# coding=utf-8
+# standard lib imports
+import json
+import threading
+from pathlib import Path
+from typing import Iterator, List
+# third party lib imports
+import pytest
+# project imports
+from benchmarks.simulator import SimulatorFleet
+from pyku.profiling import NO_SPAN, PROFILER, Profiler
+import pyku.utils as utils
+
+MS: int = 10 ** 6
+
+
+@pytest.fixture
+def shared_profiler() -> Iterator[Profiler]:
+    PROFILER.enable()
+    yield PROFILER
+    PROFILER.enabled = False
+    PROFILER.spans = []
+
+
+def test_nothing_is_recorded_while_disabled():
+    profiler: Profiler = Profiler()
+
+    assert profiler.span('staging') is NO_SPAN
+    with profiler.span('staging'):
+        pass
+    profiler.record('upload', 0, 1)
+
+    assert profiler.spans == []
+
+
+def test_summary_totals_phases_and_devices():
+    profiler: Profiler = Profiler()
+    profiler.enable()
+    origin: int = profiler.origin
+    profiler.record('staging', origin, origin + 4 * MS)
+    profiler.record('upload', origin + 4 * MS, origin + 6 * MS, '10.0.0.2')
+    profiler.record('upload', origin + 4 * MS, origin + 9 * MS, '10.0.0.3')
+
+    summary: dict = profiler.summary()
+
+    assert summary['wall_ms'] == 9
+    assert summary['phases']['staging'] == {'count': 1, 'total_ms': 4, 'min_ms': 4, 'max_ms': 4}
+    assert summary['phases']['upload'] == {'count': 2, 'total_ms': 7, 'min_ms': 2, 'max_ms': 5}
+    assert summary['devices'] == {
+        '10.0.0.2': {'upload': {'count': 1, 'total_ms': 2, 'min_ms': 2, 'max_ms': 2}},
+        '10.0.0.3': {'upload': {'count': 1, 'total_ms': 5, 'min_ms': 5, 'max_ms': 5}}
+    }
+
+
+def test_chrome_trace_puts_devices_and_threads_on_their_own_tracks(tmp_path: Path):
+    profiler: Profiler = Profiler()
+    profiler.enable()
+    with profiler.span('staging'):
+        pass
+    worker: threading.Thread = threading.Thread(target=lambda: profiler.record('zip', profiler.origin, profiler.origin))
+    worker.start()
+    worker.join()
+    with profiler.span('upload', '10.0.0.2'):
+        pass
+
+    summary_file, trace_file = profiler.write(tmp_path / 'profiles', 'deploy')
+    trace: dict = json.loads(trace_file.read_text())
+    tracks: List[str] = [event['args']['name'] for event in trace['traceEvents'] if event['ph'] == 'M']
+    phases: List[dict] = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+
+    assert summary_file.name.startswith('deploy-') and json.loads(summary_file.read_text())['phases']
+    assert len(tracks) == 3 and 'device 10.0.0.2' in tracks
+    assert [event['name'] for event in phases] == ['zip', 'staging', 'upload']
+    assert all(event['ts'] >= 0 and event['dur'] >= 0 for event in phases)
+    assert [event['cat'] for event in phases if event['name'] == 'upload'] == ['device']
+
+
+def test_deploy_records_phases_per_device(make_channel, shared_profiler: Profiler):
+    channel = make_channel()
+
+    with SimulatorFleet(2) as fleet:
+        channel.build_channel_archive()
+        utils.deploy_archive_to_devices(channel, fleet.rokus(), 2)
+        hosts: List[str] = [f'127.0.0.1:{server.server_address[1]}' for server in fleet.servers]
+
+    summary: dict = shared_profiler.summary()
+    assert 'build' in summary['phases']
+    assert summary['phases']['replace upload']['count'] == 2
+    assert all(summary['devices'][host]['replace upload']['count'] == 1 for host in hosts)
@@ -0,0 +1,35 @@
+# coding=utf-8
+# third party lib imports
+import click
+import pytest
+# project imports
+from benchmarks.simulator import SimulatorFleet
+import pyku.utils as utils
+
+
+def test_build_over_budget_fails_and_isnt_cached(make_channel):
+    channel = make_channel(SizeBudget=1000)
+
+    with pytest.raises(click.ClickException, match='SizeBudget of 1000'):
+        channel.build_channel_archive()
+
+    assert list(channel.channel_config.cache_dir.glob('archives/*.zip')) == []
+
+
+def test_build_under_budget(make_channel):
+    channel = make_channel(SizeBudget=10 * 1024 * 1024)
+
+    channel.build_channel_archive()
+
+    assert channel.channel_archive.exists()
+
+
+def test_streamed_upload_over_budget_installs_nothing(make_channel):
+    channel = make_channel(SizeBudget=1000, StreamUpload=True)
+
+    with SimulatorFleet(2) as fleet:
+        with pytest.raises(click.ClickException, match='SizeBudget of 1000'):
+            utils.stream_archive_to_devices(channel, fleet.rokus(), 2)
+
+        assert [server.device.installs for server in fleet.servers] == [0, 0]
+    assert not (channel.channel_config.out_dir / channel.archive_file_name()).exists()
@@ -0,0 +1,116 @@
+# coding=utf-8
+# standard lib imports
+import os
+from pathlib import Path
+from typing import List
+# third party lib imports
+import pytest
+# project imports
+from pyku.fileset import ChannelFile, FileSetResolver
+from pyku.staging import FileIndex, list_dir_files, sync_staging_dir
+
+
+@pytest.fixture
+def source(tmp_path: Path) -> Path:
+    root: Path = tmp_path / 'channel'
+    for relative in ['manifest', 'source/main.brs', 'components/a.xml', 'components/sub/b.xml']:
+        (root / relative).parent.mkdir(parents=True, exist_ok=True)
+        (root / relative).write_text(relative)
+
+    return root
+
+
+def sync(source: Path, staging_dir: Path, index: FileIndex, link_mode: str = 'copy') -> dict:
+    channel_files: List[ChannelFile] = FileSetResolver(source, ['**/*']).resolve()
+
+    return sync_staging_dir(channel_files, staging_dir, index, link_mode)
+
+
+def staged_contents(staging_dir: Path) -> dict:
+    return {relative: (staging_dir / relative).read_text() for relative in list_dir_files(staging_dir)}
+
+
+def source_contents(source: Path) -> dict:
+    return {relative: (source / relative).read_text() for relative in list_dir_files(source)}
+
+
+def test_first_sync_copies_everything(source: Path, tmp_path: Path):
+    staging_dir: Path = tmp_path / 'staging'
+    results: dict = sync(source, staging_dir, FileIndex(tmp_path / 'index.json'))
+
+    assert results == {'copied': 4, 'unchanged': 0, 'removed': 0}
+    assert staged_contents(staging_dir) == source_contents(source)
+
+
+def test_add_change_and_remove(source: Path, tmp_path: Path):
+    staging_dir: Path = tmp_path / 'staging'
+    index: FileIndex = FileIndex(tmp_path / 'index.json')
+    sync(source, staging_dir, index)
+
+    (source / 'source' / 'new.brs').write_text('new')
+    (source / 'manifest').write_text('title=changed')
+    (source / 'components' / 'sub' / 'b.xml').unlink()
+    (source / 'components' / 'sub').rmdir()
+    results: dict = sync(source, staging_dir, index)
+
+    assert results == {'copied': 2, 'unchanged': 2, 'removed': 1}
+    assert staged_contents(staging_dir) == source_contents(source)
+    assert not (staging_dir / 'components' / 'sub').exists()
+    assert sorted(index.entries) == sorted(list_dir_files(source))
+
+
+def test_touched_but_unchanged_file_isnt_copied(source: Path, tmp_path: Path):
+    staging_dir: Path = tmp_path / 'staging'
+    index: FileIndex = FileIndex(tmp_path / 'index.json')
+    sync(source, staging_dir, index)
+    staged_mtime: int = (staging_dir / 'manifest').stat().st_mtime_ns
+
+    os.utime(str(source / 'manifest'), ns=(staged_mtime + 10 ** 9, staged_mtime + 10 ** 9))
+    results: dict = sync(source, staging_dir, index)
+
+    assert results == {'copied': 0, 'unchanged': 4, 'removed': 0}
+    assert (staging_dir / 'manifest').stat().st_mtime_ns == staged_mtime
+
+
+def test_same_size_change_is_copied(source: Path, tmp_path: Path):
+    staging_dir: Path = tmp_path / 'staging'
+    index: FileIndex = FileIndex(tmp_path / 'index.json')
+    sync(source, staging_dir, index)
+
+    manifest_mtime: int = (source / 'manifest').stat().st_mtime_ns
+    (source / 'manifest').write_text('MANIFEST')
+    os.utime(str(source / 'manifest'), ns=(manifest_mtime + 10 ** 9, manifest_mtime + 10 ** 9))
+    results: dict = sync(source, staging_dir, index)
+
+    assert results['copied'] == 1
+    assert (staging_dir / 'manifest').read_text() == 'MANIFEST'
+
+
+def test_file_removed_from_staging_is_restaged(source: Path, tmp_path: Path):
+    staging_dir: Path = tmp_path / 'staging'
+    index: FileIndex = FileIndex(tmp_path / 'index.json')
+    sync(source, staging_dir, index)
+
+    (staging_dir / 'source' / 'main.brs').unlink()
+    results: dict = sync(source, staging_dir, index)
+
+    assert results == {'copied': 1, 'unchanged': 3, 'removed': 0}
+    assert staged_contents(staging_dir) == source_contents(source)
+
+
+def test_index_persists(source: Path, tmp_path: Path):
+    staging_dir: Path = tmp_path / 'staging'
+    index: FileIndex = FileIndex(tmp_path / '.pyku' / 'index.json')
+    sync(source, staging_dir, index)
+    index.save()
+
+    results: dict = sync(source, staging_dir, FileIndex(tmp_path / '.pyku' / 'index.json'))
+
+    assert results == {'copied': 0, 'unchanged': 4, 'removed': 0}
+
+
+def test_hardlink_mode(source: Path, tmp_path: Path):
+    staging_dir: Path = tmp_path / 'staging'
+    sync(source, staging_dir, FileIndex(tmp_path / 'index.json'), 'hardlink')
+
+    assert os.path.samefile(str(source / 'manifest'), str(staging_dir / 'manifest'))
@@ -0,0 +1,96 @@
+# coding=utf-8
+"""
+Usage:
+    pytest tests/test_startup.py
+
+    Startup regression check, runs pyku commands from this checkout under python -X importtime in fresh interpreters
+    and fails when a command's imports go over its budget or pull in a module it shouldn't. keypress runs in an
+    empty dir without a daemon, so it stops right after importing what it needs when it finds no devices to send to.
+
+ToDos:
+"""
+# standard lib imports
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, NamedTuple, Tuple
+# third party lib imports
+import pytest
+
+REPO_ROOT: Path = Path(__file__).resolve().parent.parent
+# runs per command, the fastest counts
+REPEAT: int = 3
+
+
+class StartupCase(NamedTuple):
+    """
+    A command whose startup is checked
+
+    *Attributes:
+        name (str): Case name
+        args (List[str]): pyku arguments
+        budget_ms (float): Import time allowed, in milliseconds
+        forbidden (List[str]): Modules the command must not import
+    """
+    name: str
+    args: List[str]
+    budget_ms: float
+    forbidden: List[str]
+
+
+CASES: List[StartupCase] = [
+    StartupCase('cli', ['--help'], 60, [
+        'pyku.utils', 'pyku.channel', 'pyku.roku', 'requests', 'yaml', 'roku_scanner', 'PyInquirer', 'prompt_toolkit'
+    ]),
+    StartupCase('keypress', ['keypress', '-b', 'home', '--skip-discovery', '--no-daemon'], 400, [
+        'PyInquirer', 'prompt_toolkit', 'pyku.debugger', 'pyku.watch'
+    ])
+]
+
+
+def measure(args: List[str], work_dir: Path) -> Tuple[float, List[str]]:
+    """
+    Runs this checkout's pyku once in a fresh interpreter
+    :param args: pyku arguments
+    :param work_dir: dir the command runs in
+    :return: (import ms, imported modules)
+    """
+    env: dict = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([str(REPO_ROOT)] + [path for path in [env.get('PYTHONPATH', '')] if path])
+    env['XDG_CACHE_HOME'] = str(work_dir / 'cache')
+    process: subprocess.CompletedProcess = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'pyku'] + args,
+        cwd=str(work_dir),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    assert process.returncode == 0, process.stderr[-2000:]
+
+    # lines are "import time: self | cumulative | name", nested imports are indented, interpreter startup ends
+    # with site so only top level imports after it are pyku's
+    import_us: int = 0
+    modules: List[str] = []
+    after_site: bool = False
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or line.endswith('| imported package'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not after_site:
+            after_site = name.strip() == 'site'
+            continue
+        modules.append(name.strip())
+        if not name.startswith('  ', 1):
+            import_us += int(cumulative)
+
+    return import_us / 1000, modules
+
+
+@pytest.mark.parametrize('case', CASES, ids=[case.name for case in CASES])
+def test_startup(case: StartupCase, tmp_path: Path):
+    runs: List[Tuple[float, List[str]]] = [measure(case.args, tmp_path) for _ in range(REPEAT)]
+
+    assert sorted(set(runs[0][1]) & set(case.forbidden)) == []
+    assert min(run[0] for run in runs) <= case.budget_ms
@@ -0,0 +1,118 @@
+# coding=utf-8
+# standard lib imports
+import email
+import email.policy
+import io
+from pathlib import Path
+from typing import List
+# third party lib imports
+import requests
+# project imports
+from benchmarks.simulator import SIMULATOR_NONCES, SimulatorFleet, SimulatorRequestHandler
+from pyku.installer import MultipartFileBody, MultipartStreamBody
+from pyku.streaming import ArchiveBroadcast
+import pyku.utils as utils
+
+
+def parse_multipart(content_type: str, body: bytes) -> dict:
+    message = email.message_from_bytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + body,
+                                       policy=email.policy.HTTP)
+    assert message.is_multipart() and not message.defects
+
+    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+            for part in message.iter_parts()}
+
+
+def test_file_body_framing_and_rewind(tmp_path: Path):
+    archive: Path = tmp_path / 'channel.zip'
+    archive.write_bytes(bytes(range(256)) * 1000)
+    body: MultipartFileBody = MultipartFileBody([('mysubmit', 'Replace')], 'archive', archive)
+
+    first: bytes = body.read(100) + body.read()
+    assert len(first) == len(body)
+    body.seek(0)
+    assert body.read() == first
+    body.close()
+
+    assert parse_multipart(body.content_type, first) == {'mysubmit': b'Replace', 'archive': archive.read_bytes()}
+
+
+def test_file_body_releases_an_in_memory_archive():
+    archive: io.BytesIO = io.BytesIO(b'PK' * 1000)
+    body: MultipartFileBody = MultipartFileBody([('mysubmit', 'Replace')], 'archive', archive)
+
+    assert parse_multipart(body.content_type, body.read())['archive'] == archive.getvalue()
+    body.close()
+
+    # a BytesIO can't be resized while a view of its buffer is still exported
+    archive.seek(0, io.SEEK_END)
+    archive.write(b'more')
+
+
+def test_file_body_without_archive():
+    body: MultipartFileBody = MultipartFileBody([('mysubmit', 'Delete')], 'archive', None)
+
+    assert parse_multipart(body.content_type, body.read()) == {'mysubmit': b'Delete', 'archive': b''}
+
+
+def test_stream_body_framing():
+    chunks: List[bytes] = [b'PK' * 500, b'\r\n--', b'x' * 3000]
+    body: MultipartStreamBody = MultipartStreamBody([('mysubmit', 'Replace')], 'archive', 'channel.zip', chunks)
+
+    sent: bytes = b''.join(body)
+
+    assert body.sent_at is not None
+    assert parse_multipart(body.content_type, sent) == {'mysubmit': b'Replace', 'archive': b''.join(chunks)}
+
+
+def test_broadcast_feeds_every_reader_and_the_tee(tmp_path: Path):
+    broadcast: ArchiveBroadcast = ArchiveBroadcast(0, tmp_path / 'channel.zip', chunk_size=4)
+    broadcast.write(b'0123456789')
+    broadcast.finish()
+
+    assert (tmp_path / 'channel.zip').read_bytes() == b'0123456789'
+
+
+def test_streamed_deploy_to_fleet(make_channel):
+    channel = make_channel(StreamUpload=True)
+
+    with SimulatorFleet(3) as fleet:
+        results = utils.deploy_channel_to_devices(channel, fleet.rokus(), 2)
+
+        assert all(utils.deploy_succeeded(result_msgs) for _, result_msgs in results)
+        assert [server.device.installs for server in fleet.servers] == [1, 1, 1]
+        assert {server.device.received_bytes for server in fleet.servers} == {channel.channel_archive.stat().st_size}
+
+
+def test_streamed_upload_answered_401_is_resent_from_the_archive(make_channel, monkeypatch):
+    channel = make_channel(StreamUpload=True)
+    authorized = SimulatorRequestHandler.authorized
+    rejected: list = []
+
+    def reject_first_stream(handler: SimulatorRequestHandler) -> bool:
+        if handler.headers.get('Transfer-Encoding', '').lower() == 'chunked' and not rejected:
+            rejected.append(handler.path)
+            return False
+        return authorized(handler)
+
+    monkeypatch.setattr(SimulatorRequestHandler, 'authorized', reject_first_stream)
+    with SimulatorFleet(2) as fleet:
+        results = utils.deploy_channel_to_devices(channel, fleet.rokus(), 2)
+
+        assert rejected == ['/plugin_install']
+        assert all(utils.deploy_succeeded(result_msgs) for _, result_msgs in results)
+        assert [server.device.installs for server in fleet.servers] == [1, 1]
+
+
+def test_simulator_keeps_only_recent_nonces(make_channel):
+    channel = make_channel()
+    channel.build_channel_archive()
+
+    with SimulatorFleet(1) as fleet:
+        roku = fleet.rokus()[0]
+        for _ in range(SIMULATOR_NONCES * 2):
+            assert requests.post(f'{roku.location}plugin_install').status_code == 401
+
+        assert len(fleet.servers[0].device.nonces) == SIMULATOR_NONCES
+        results = utils.deploy_channel_to_devices(channel, [roku], 1)
+        assert all(utils.deploy_succeeded(result_msgs) for _, result_msgs in results)
@@ -0,0 +1,71 @@
+# coding=utf-8
+# standard lib imports
+import threading
+import time
+from pathlib import Path
+from typing import List
+# third party lib imports
+import pytest
+# project imports
+from pyku.watch import ChannelWatcher, InotifyBackend, PollingBackend
+
+
+def write_burst(root: Path, names: List[str], gap: float) -> threading.Thread:
+    def write() -> None:
+        for name in names:
+            time.sleep(gap)
+            (root / 'source' / name).write_text(name)
+
+    writer: threading.Thread = threading.Thread(target=write)
+    writer.start()
+
+    return writer
+
+
+@pytest.mark.parametrize('polling', [True, False], ids=['polling', 'inotify'])
+def test_burst_of_saves_is_reported_once(make_channel, polling: bool):
+    if not polling and not InotifyBackend.available():
+        pytest.skip('inotify not available')
+    channel = make_channel()
+    watcher: ChannelWatcher = ChannelWatcher(channel, debounce=0.5, poll_interval=0.05, polling=polling)
+    assert isinstance(watcher.backend, PollingBackend) == polling
+
+    writer: threading.Thread = write_burst(channel.channel_path, ['a.brs', 'b.brs', 'c.brs'], 0.1)
+    try:
+        assert watcher.wait_for_changes() == ['source/a.brs', 'source/b.brs', 'source/c.brs']
+    finally:
+        writer.join()
+        watcher.close()
+
+
+def test_polling_wait_times_out_without_changes(make_channel):
+    watcher: ChannelWatcher = ChannelWatcher(make_channel(), poll_interval=0.05, polling=True)
+
+    assert watcher.backend.wait(0.2) is False
+
+
+@pytest.mark.skipif(not InotifyBackend.available(), reason='inotify not available')
+def test_inotify_watches_only_new_dirs(make_channel, monkeypatch):
+    channel = make_channel()
+    backend: InotifyBackend = InotifyBackend(channel.channel_path, [channel.channel_path / 'staging'])
+    watched: List[str] = sorted(backend.watches.values())
+    walked: List[str] = []
+    add_watches = backend.add_watches
+    monkeypatch.setattr(backend, 'add_watches', lambda directory: walked.append(directory) or add_watches(directory))
+
+    try:
+        (channel.channel_path / 'source' / 'main.brs').write_text('changed')
+        assert backend.wait(1) is True
+        assert walked == []
+
+        (channel.channel_path / 'components' / 'new' / 'deep').mkdir(parents=True)
+        (channel.channel_path / 'staging' / 'new').mkdir(parents=True)
+        assert backend.wait(1) is True
+        while backend.wait(0.1):
+            pass
+        assert walked == [str(channel.channel_path / 'components' / 'new')]
+        assert sorted(backend.watches.values()) == sorted(watched + [
+            str(channel.channel_path / 'components' / 'new'), str(channel.channel_path / 'components' / 'new' / 'deep')
+        ])
+    finally:
+        backend.close()
@@ -0,0 +1,44 @@
+# coding=utf-8
+# project imports
+from benchmarks.simulator import SimulatorFleet
+import pyku.utils as utils
+from pyku.workspace import WorkspaceBuild, deploy_workspace_to_devices
+
+
+def test_plain_and_streamed_channels_deploy_together(make_channel):
+    plain = make_channel('plain')
+    streamed = make_channel('streamed', StreamUpload=True)
+
+    build: WorkspaceBuild = WorkspaceBuild([plain, streamed], 2)
+    assert build.channels == [plain]
+    build.start()
+    assert build.wait() == []
+    assert plain.channel_archive is not None and streamed.channel_archive is None
+
+    with SimulatorFleet(3) as fleet:
+        rokus = fleet.rokus()
+        pairs = [(plain, rokus[0]), (streamed, rokus[1]), (streamed, rokus[2])]
+
+        results = deploy_workspace_to_devices(pairs, 2)
+        assert [(channel, selected) for channel, selected, _ in results] == pairs
+        assert all(utils.deploy_succeeded(result_msgs) for _, _, result_msgs in results)
+        assert [server.device.installs for server in fleet.servers] == [1, 1, 1]
+        assert streamed.channel_archive.exists()
+
+        # the streamed channel's unchanged archive now comes from the cache, so every device is skipped
+        results = deploy_workspace_to_devices(pairs, 2)
+        assert [result_msgs[0]['status'] for _, _, result_msgs in results] == ['skipped'] * 3
+
+
+def test_streamed_channel_build_failure_fails_only_its_devices(make_channel):
+    plain = make_channel('plain')
+    plain.build_channel_archive()
+    streamed = make_channel('streamed', StreamUpload=True, SizeBudget=1000)
+
+    with SimulatorFleet(2) as fleet:
+        rokus = fleet.rokus()
+        results = deploy_workspace_to_devices([(plain, rokus[0]), (streamed, rokus[1])], 2, force=True)
+
+        assert [utils.deploy_succeeded(result_msgs) for _, _, result_msgs in results] == [True, False]
+        assert 'SizeBudget' in results[1][2][0]['msg']
+        assert [server.device.installs for server in fleet.servers] == [1, 0]